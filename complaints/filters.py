@@ -0,0 +1,91 @@
+"""
+Recherche des plaintes (?search=).
+
+Une référence ou un numéro de téléphone (chiffres seuls) est d'abord cherché par
+égalité (index btree) ; sinon la recherche porte sur search_vector (index GIN)
+et les résultats sont classés par pertinence (titre avant description).
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+SEARCH_CONFIG = 'simple'
+SEARCH_RANK = 'search_rank'
+
+# Référence : segments séparés par des tirets, avec au moins un chiffre
+REFERENCE_PATTERN = re.compile(r'^(?=.*\d)[A-Za-z0-9_]+(-[A-Za-z0-9_]+)+$')
+PHONE_PATTERN = re.compile(r'^\+?[\d\s().-]{6,}$')
+# '------' ou '(. . )' ont la forme d'un téléphone mais aucun chiffre
+PHONE_MIN_DIGITS = 6
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def normalize_phone(value):
+    """Chiffres seuls, comme la colonne Complaint.phone_normalized"""
+    return re.sub(r'\D', '', value)
+
+
+def build_search_query(term):
+    """
+    Requête tsquery : tous les mots, chacun en préfixe ('plomb' trouve
+    'plomberie'). None si le terme ne contient aucun mot.
+    """
+    words = WORD_PATTERN.findall(term)
+    if not words:
+        return None
+    return SearchQuery(
+        ' & '.join(f'{word}:*' for word in words), search_type='raw', config=SEARCH_CONFIG
+    )
+
+
+class ComplaintSearchFilter(BaseFilterBackend):
+    """
+    Recherche plein texte classée. Le queryset est annoté de `search_rank`,
+    que ComplaintOrderingFilter utilise comme tri par défaut.
+    """
+    search_param = 'search'
+
+    def get_search_term(self, request):
+        return request.query_params.get(self.search_param, '').replace('\x00', '').strip()
+
+    def exact_matches(self, queryset, term):
+        """Référence ou téléphone exact (btree) ; None si le terme n'en a pas la forme"""
+        condition = Q()
+        if REFERENCE_PATTERN.match(term):
+            condition |= Q(reference__in={term, term.upper()})
+        digits = normalize_phone(term)
+        if PHONE_PATTERN.match(term) and len(digits) >= PHONE_MIN_DIGITS:
+            condition |= Q(phone_normalized=digits)
+        if not condition:
+            return None
+        return queryset.filter(condition)
+
+    def filter_queryset(self, request, queryset, view):
+        term = self.get_search_term(request)
+        if not term:
+            return queryset
+
+        exact = self.exact_matches(queryset, term)
+        if exact is not None and exact.exists():
+            return exact.annotate(**{SEARCH_RANK: Value(1.0, output_field=FloatField())})
+
+        query = build_search_query(term)
+        if query is None:
+            return queryset.none()
+        # ts_rank est un real : converti en double precision pour que la valeur
+        # relue dans le curseur de pagination soit exacte
+        return queryset.filter(search_vector=query).annotate(
+            **{SEARCH_RANK: Cast(SearchRank(F('search_vector'), query), FloatField())}
+        )
+
+
+class ComplaintOrderingFilter(OrderingFilter):
+    """OrderingFilter ; sans ?ordering=, une recherche est triée par pertinence"""
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and SEARCH_RANK in queryset.query.annotations:
+            return [f'-{SEARCH_RANK}']
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,188 @@
+"""
+Mesurer la latence de l'autocomplétion (pg_trgm) frappe par frappe
+
+    python manage.py benchmark_autocomplete --schema hopital_central
+    python manage.py benchmark_autocomplete --schema hopital_central --rows 500000
+
+Pour un échantillon de plaintes, chaque préfixe de la référence, du téléphone
+et du lieu (à partir de 2 caractères, puis avec une faute de frappe) est
+recherché comme le ferait un champ de saisie. La recherche icontains
+d'origine est mesurée sur les mêmes saisies pour comparaison.
+
+Le plan (EXPLAIN) des requêtes émises par l'autocomplétion est vérifié pour
+chaque champ : la ligne « plan » indique si l'index GiST trigramme est utilisé
+(-v 2 affiche les plans complets). Sur une petite table, un Seq Scan est le
+choix normal du planificateur : vérifier les plans avec --rows.
+
+Avec --rows, des plaintes synthétiques sont ajoutées pour atteindre ce volume
+dans une transaction annulée à la fin : la base n'est pas modifiée.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django_tenants.utils import schema_context
+
+from complaints.services.instrumentation import QueryCounter
+from tenants.models import Tenant
+
+LOCATIONS = [
+    'Douala Akwa', 'Douala Bonapriso', 'Douala Deido', 'Douala Bonamoussadi',
+    'Yaoundé Bastos', 'Yaoundé Mvog-Ada', 'Yaoundé Biyem-Assi', 'Bafoussam Centre',
+    'Garoua Plateau', 'Kribi Port', 'Limbé Down Beach', 'Buea Molyko',
+]
+
+# Index GiST trigramme attendu dans le plan de chaque champ (Complaint.Meta.indexes)
+TRIGRAM_INDEXES = {
+    'reference': 'complaint_reference_trgm',
+    'phone_number': 'complaint_phone_trgm',
+    'location': 'complaint_location_trgm',
+}
+
+
+class Command(BaseCommand):
+    help = "Latence de l'autocomplétion trigramme par frappe, comparée à icontains"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', dest='schema_name', required=True)
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=0,
+            help="Volume visé (plaintes synthétiques ajoutées puis annulées)",
+        )
+        parser.add_argument('--samples', type=int, default=20, help="Plaintes dont les valeurs sont saisies")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            tenant = Tenant.objects.get(schema_name=options['schema_name'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Unknown tenant schema: {options['schema_name']}")
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                raise CommandError("pg_trgm is not installed in this database: nothing to measure")
+
+        rng = random.Random(options['seed'])
+        with schema_context(tenant.schema_name), transaction.atomic():
+            self.seed(tenant, options['rows'], rng)
+            self.run(tenant, options['samples'], rng)
+            transaction.set_rollback(True)
+
+    def seed(self, tenant, target, rng):
+        from complaints.models import Complaint
+        from complaints.services.references import reserve_references
+
+        missing = target - Complaint.objects.filter(tenant=tenant).count()
+        if missing <= 0:
+            return
+
+        now = timezone.now()
+        complaints = [
+            Complaint(
+                tenant=tenant,
+                reference=reference,
+                title=f"Benchmark complaint {index}",
+                description="Synthetic complaint",
+                location=f"{rng.choice(LOCATIONS)} {rng.randint(1, 400)}",
+                phone_number=f"+237 6{rng.randint(0, 99999999):08d}",
+                submitted_at=now - timezone.timedelta(minutes=index),
+            )
+            for index, reference in enumerate(reserve_references(tenant, missing))
+        ]
+        Complaint.objects.bulk_create(complaints, batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Complaint._meta.db_table}')
+        self.stdout.write(f"{missing} synthetic complaints added (rolled back at the end)")
+
+    @staticmethod
+    def keystrokes(value, rng):
+        """Préfixes successifs de la valeur, puis la valeur avec une faute de frappe"""
+        prefixes = [value[:length] for length in range(2, len(value) + 1)]
+        if len(value) > 3:
+            position = rng.randrange(1, len(value) - 1)
+            prefixes.append(value[:position] + value[position + 1] + value[position] + value[position + 2:])
+        return prefixes
+
+    def measure(self, label, search, inputs):
+        durations = []
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            for term in inputs:
+                started = time.perf_counter()
+                search(term)
+                durations.append((time.perf_counter() - started) * 1000)
+
+        durations.sort()
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        self.stdout.write(
+            f"{label:<28} {len(inputs):>5} keystrokes  p50 {statistics.median(durations):>7.1f} ms  "
+            f"p95 {p95:>7.1f} ms  max {durations[-1]:>7.1f} ms  {counter.queries / len(inputs):.1f} queries/keystroke"
+        )
+
+    def explain(self, field, search, term):
+        """Plans (EXPLAIN) des recherches trigramme sur les plaintes émises par search(term)"""
+        from complaints.models import Complaint
+
+        statements = []
+
+        def capture(execute, sql, params, many, context):
+            # Ni le SET search_path de django-tenants, ni les lectures du catalogue,
+            # ni le comptage des lieux retenus (index B-tree tenant, location)
+            if sql.lstrip().upper().startswith('SELECT') and Complaint._meta.db_table in sql and '%>' in sql:
+                statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            search(term)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for sql, params in statements:
+                cursor.execute(f'EXPLAIN {sql}', params)
+                plans.append('\n'.join(row[0] for row in cursor.fetchall()))
+
+        index = TRIGRAM_INDEXES[field]
+        used = bool(plans) and all(index in plan for plan in plans)
+        self.stdout.write(
+            f"{field + ' plan':<28} {index} {'used' if used else 'NOT USED'} ({term!r})"
+        )
+        if self.verbosity >= 2:
+            for plan in plans:
+                self.stdout.write(plan)
+
+    def run(self, tenant, samples, rng):
+        from complaints.models import Complaint
+        from complaints.services.autocomplete import DEFAULT_LIMIT, autocomplete
+
+        queryset = Complaint.objects.filter(tenant=tenant)
+        total = queryset.count()
+        if not total:
+            self.stdout.write("No complaints in this tenant: nothing to measure")
+            return
+        self.stdout.write(f"{total} complaints in {tenant.schema_name}")
+
+        picked = list(
+            queryset.exclude(phone_number='').exclude(location='')
+            .order_by('?').values('reference', 'phone_number', 'location')[:samples]
+        )
+        for field in ('reference', 'phone_number', 'location'):
+            inputs = [term for row in picked for term in self.keystrokes(row[field], rng)]
+            if not inputs:
+                continue
+            self.measure(
+                f"{field} icontains",
+                lambda term: list(queryset.filter(**{f'{field}__icontains': term})[:DEFAULT_LIMIT]),
+                inputs
+            )
+            def trigram(term, field=field):
+                return autocomplete(queryset, term, (field,), DEFAULT_LIMIT)
+
+            self.measure(f"{field} trigram", trigram, inputs)
+            self.explain(field, trigram, picked[0][field])
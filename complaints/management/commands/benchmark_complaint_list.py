@@ -0,0 +1,149 @@
+"""
+Mesurer le débit de la liste des plaintes (avant / après le chemin rapide)
+
+    python manage.py benchmark_complaint_list --schema hopital_central
+    python manage.py benchmark_complaint_list --schema hopital_central --rows 10000
+
+Avec --rows, des plaintes synthétiques sont ajoutées pour atteindre ce volume
+dans une transaction annulée à la fin : la base n'est pas modifiée.
+"""
+import itertools
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django_tenants.utils import schema_context
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from complaints.services.instrumentation import QueryCounter
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Compare le débit de la liste des plaintes : sérialiseur DRF, select_related, chemin .values()"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', dest='schema_name', required=True)
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=0,
+            help="Volume visé (plaintes synthétiques ajoutées puis annulées)",
+        )
+        parser.add_argument('--repeat', type=int, default=3, help="Mesures par scénario (meilleure retenue)")
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.get(schema_name=options['schema_name'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Unknown tenant schema: {options['schema_name']}")
+
+        with schema_context(tenant.schema_name), transaction.atomic():
+            self.seed(tenant, options['rows'])
+            self.run(tenant, options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, tenant, target):
+        from categories.models import Category
+        from complaints.models import Complaint
+        from complaints.services.references import reserve_references
+        from complaints.services.sla import get_sla_policy
+        from users.models import CustomUser
+
+        missing = target - Complaint.objects.filter(tenant=tenant).count()
+        if missing <= 0:
+            return
+
+        categories = itertools.cycle(list(Category.objects.filter(tenant=tenant)) or [None])
+        agents = itertools.cycle(
+            list(CustomUser.objects.filter(tenant=tenant, role='AGENT')) + [None]
+        )
+        statuses = itertools.cycle(['NEW', 'ASSIGNED', 'IN_PROGRESS', 'RESOLVED', 'CLOSED'])
+        urgencies = itertools.cycle(['LOW', 'MEDIUM', 'HIGH'])
+        policy = get_sla_policy(tenant.id)
+        now = timezone.now()
+
+        complaints = []
+        for index, reference in enumerate(reserve_references(tenant, missing)):
+            category, urgency = next(categories), next(urgencies)
+            submitted_at = now - timezone.timedelta(minutes=index)
+            complaints.append(Complaint(
+                tenant=tenant,
+                reference=reference,
+                title=f"Benchmark complaint {index}",
+                description="Synthetic complaint",
+                status=next(statuses),
+                urgency=urgency,
+                category=category,
+                assigned_user=next(agents),
+                submitted_at=submitted_at,
+                sla_deadline=policy.deadline(submitted_at, category.id if category else None, urgency),
+                location="Benchmark",
+            ))
+        Complaint.objects.bulk_create(complaints, batch_size=1000)
+        self.stdout.write(f"{missing} synthetic complaints added (rolled back at the end)")
+
+    def measure(self, label, func, repeat):
+        best = None
+        for _ in range(repeat):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                rows = func()
+                elapsed = time.perf_counter() - started
+            if best is None or elapsed < best[0]:
+                best = (elapsed, counter.queries, rows)
+
+        elapsed, query_count, rows = best
+        self.stdout.write(
+            f"{label:<34} {rows:>7} rows {elapsed * 1000:>9.1f} ms "
+            f"{query_count:>7} queries {rows / elapsed if elapsed else 0:>10.0f} rows/s"
+        )
+
+    def run(self, tenant, repeat):
+        from complaints.models import Complaint
+        from complaints.serializers import ComplaintListSerializer
+        from complaints.services.complaint_list import list_values, serialize_rows
+        from complaints.views import ComplaintViewSet
+        from users.models import CustomUser
+
+        queryset = Complaint.objects.filter(tenant=tenant).order_by('-submitted_at')
+
+        self.measure(
+            "serializer (before)",
+            lambda: len(ComplaintListSerializer(queryset.all(), many=True).data),
+            repeat
+        )
+        self.measure(
+            "serializer + select_related",
+            lambda: len(ComplaintListSerializer(
+                queryset.select_related('category', 'assigned_user'), many=True
+            ).data),
+            repeat
+        )
+        self.measure(
+            "values() fast path",
+            lambda: len(serialize_rows(list_values(queryset))),
+            repeat
+        )
+
+        user = CustomUser.objects.filter(tenant=tenant, role='TENANT_ADMIN').first()
+        if user is None:
+            self.stdout.write("No TENANT_ADMIN in this tenant: endpoint benchmark skipped")
+            return
+
+        factory = APIRequestFactory()
+        view = ComplaintViewSet.as_view({'get': 'list'})
+
+        def walk_endpoint():
+            url, rows = '/api/complaints/?page_size=100', 0
+            while url:
+                request = factory.get(url)
+                force_authenticate(request, user)
+                response = view(request)
+                rows += len(response.data['results'])
+                url = response.data['next']
+            return rows
+
+        self.measure("endpoint, all pages of 100", walk_endpoint, repeat)
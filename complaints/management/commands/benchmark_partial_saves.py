@@ -0,0 +1,179 @@
+"""
+Mesurer le coût des écritures partielles (FieldTracker) sur les mises à jour fréquentes
+
+    python manage.py benchmark_partial_saves --schema hopital_central
+    python manage.py benchmark_partial_saves --schema hopital_central --iterations 500 --description-size 8000
+
+Chaque scénario est exécuté deux fois sur les mêmes lignes : en réécrivant
+toute la ligne (comportement de save() sans update_fields avant les écritures
+partielles) puis avec save(), qui n'écrit que les champs modifiés. Sont
+mesurés la latence par écriture, le nombre de requêtes et le volume de WAL
+généré (pg_current_wal_insert_lsn, d'autres sessions actives faussent la mesure).
+
+Les descriptions sont agrandies à --description-size caractères (TOAST), le
+tout dans une transaction annulée à la fin : la base n'est pas modifiée.
+"""
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django_tenants.utils import schema_context
+
+from complaints.services.instrumentation import QueryCounter
+from tenants.models import Tenant
+
+
+def full_row_fields(model):
+    """Toutes les colonnes écrites par un save() complet"""
+    return [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and not field.generated
+    ]
+
+
+class Command(BaseCommand):
+    help = "WAL et latence : save() complet contre save() partiel (FieldTracker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', dest='schema_name', required=True)
+        parser.add_argument('--iterations', type=int, default=200, help="Écritures par scénario")
+        parser.add_argument(
+            '--description-size',
+            type=int,
+            default=4000,
+            help="Taille des descriptions (caractères, peu compressibles)",
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.get(schema_name=options['schema_name'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Unknown tenant schema: {options['schema_name']}")
+
+        rng = random.Random(options['seed'])
+        with schema_context(tenant.schema_name), transaction.atomic():
+            self.run(tenant, options['iterations'], options['description_size'], rng)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def wal_position():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_current_wal_insert_lsn()')
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def wal_since(position):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_wal_lsn_diff(pg_current_wal_insert_lsn(), %s)', [position])
+            return int(cursor.fetchone()[0])
+
+    def measure(self, label, write, instances):
+        """Exécute write(instance) pour chaque instance ; retourne le WAL généré"""
+        durations = []
+        counter = QueryCounter()
+        start = self.wal_position()
+        with connection.execute_wrapper(counter):
+            for instance in instances:
+                started = time.perf_counter()
+                write(instance)
+                durations.append((time.perf_counter() - started) * 1000)
+        wal = self.wal_since(start)
+
+        durations.sort()
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        self.stdout.write(
+            f"{label:<34} p50 {statistics.median(durations):>6.2f} ms  p95 {p95:>6.2f} ms  "
+            f"{counter.queries / len(instances):>4.1f} queries  WAL {wal / len(instances):>8.0f} B/write"
+        )
+        return wal
+
+    def compare(self, title, full_write, partial_write, full_instances, partial_instances=None):
+        self.stdout.write(title)
+        full = self.measure('  full row save()', full_write, full_instances)
+        partial = self.measure(
+            '  partial save() (FieldTracker)', partial_write, partial_instances or full_instances
+        )
+        if full:
+            self.stdout.write(f"  WAL reduction: {100 * (1 - partial / full):.0f}%")
+
+    def run(self, tenant, iterations, description_size, rng):
+        from complaints.models import Complaint
+        from notifications.models import Notification
+        from users.models import CustomUser
+
+        ids = list(Complaint.objects.filter(tenant=tenant).values_list('id', flat=True)[:iterations])
+        if not ids:
+            self.stdout.write("No complaints in this tenant: nothing to measure")
+            return
+
+        # Descriptions longues et peu compressibles : stockées hors ligne (TOAST)
+        words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(2000)]
+        for complaint_id in ids:
+            description = ' '.join(rng.choice(words) for _ in range(description_size // 4))
+            Complaint.objects.filter(id=complaint_id).update(description=description[:description_size])
+
+        self.stdout.write(
+            f"{len(ids)} complaints, descriptions of {description_size} characters"
+        )
+
+        # Statut alterné : chaque écriture change réellement la ligne
+        complaint_fields = full_row_fields(Complaint)
+        statuses = ('IN_PROGRESS', 'INVESTIGATION')
+
+        def change_status(complaint, update_fields=None):
+            complaint.status = statuses[1] if complaint.status == statuses[0] else statuses[0]
+            complaint.save(update_fields=update_fields)
+
+        # Relations lues par les signaux préchargées : les deux passes font les mêmes lectures
+        complaints = list(
+            Complaint.objects.filter(id__in=ids).select_related('tenant', 'assigned_user', 'category')
+        )
+        self.compare(
+            "Status change (ComplaintUpdateSerializer, assign)",
+            lambda complaint: change_status(complaint, complaint_fields),
+            change_status,
+            complaints,
+        )
+        self.compare(
+            "Unchanged save (PATCH with the same values)",
+            lambda complaint: complaint.save(update_fields=complaint_fields),
+            lambda complaint: complaint.save(),
+            complaints,
+        )
+
+        user = CustomUser.objects.filter(tenant=tenant).first()
+        if user is None:
+            return
+
+        def unread_notifications():
+            created = Notification.objects.bulk_create([
+                Notification(
+                    user=user,
+                    tenant=tenant,
+                    type='COMPLAINT_UPDATED',
+                    title="Benchmark",
+                    message=' '.join(rng.choice(words) for _ in range(60))
+                )
+                for _ in ids
+            ])
+            return list(Notification.objects.filter(id__in=[notification.id for notification in created]))
+
+        notification_fields = full_row_fields(Notification)
+
+        def mark_read_full_row(notification):
+            notification.is_read = True
+            notification.read_at = timezone.now()
+            notification.save(update_fields=notification_fields)
+
+        self.compare(
+            "Notification.mark_as_read",
+            mark_read_full_row,
+            lambda notification: notification.mark_as_read(),
+            unread_notifications(),
+            unread_notifications(),
+        )
@@ -0,0 +1,78 @@
+"""
+Importer un registre de plaintes (CSV ou NDJSON) dans un tenant
+
+    python manage.py import_complaints registre.csv --schema hopital_central
+    python manage.py import_complaints registre.ndjson --schema hopital_central --user admin@hopital.cm
+    python manage.py import_complaints - --schema hopital_central --format ndjson < registre.ndjson
+    python manage.py import_complaints registre.csv --schema hopital_central --dry-run
+
+Colonnes : title, description (obligatoires), reference, urgency, status,
+location, phone_number, category, subcategory (id ou nom), submitted_at, closed_at.
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django_tenants.utils import schema_context
+
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Importe des plaintes depuis un fichier CSV / NDJSON, par lots (bulk_create)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier à importer ('-' pour l'entrée standard)")
+        parser.add_argument('--schema', dest='schema_name', required=True)
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'ndjson'])
+        parser.add_argument('--user', dest='email', help="Auteur des plaintes et de l'historique (email)")
+        parser.add_argument('--chunk-size', type=int, help="Lignes par lot (COMPLAINT_IMPORT_CHUNK_SIZE par défaut)")
+        parser.add_argument('--dry-run', action='store_true', help="Valider sans rien écrire")
+
+    def handle(self, *args, **options):
+        from complaints.services.bulk_import import detect_format, import_complaints
+        from users.models import CustomUser
+
+        try:
+            tenant = Tenant.objects.get(schema_name=options['schema_name'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Unknown tenant schema: {options['schema_name']}")
+
+        path = options['path']
+        file_format = options['file_format'] or detect_format(filename=path)
+        if file_format is None:
+            raise CommandError("Cannot guess the file format: use --format csv|ndjson")
+
+        user = None
+        if options['email']:
+            try:
+                user = CustomUser.objects.get(email=options['email'], tenant=tenant)
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"Unknown user in {tenant.schema_name}: {options['email']}")
+
+        stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        try:
+            with schema_context(tenant.schema_name):
+                report = import_complaints(
+                    tenant,
+                    stream,
+                    file_format,
+                    user=user,
+                    chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run']
+                )
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if report['errors_truncated']:
+            self.stderr.write("... more errors not shown")
+        if report['aborted']:
+            self.stderr.write(self.style.ERROR(f"Import aborted: {report['aborted']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{tenant.schema_name}: {report['rows']} rows, {report['created']} created, "
+            f"{report['failed']} failed{' (dry run)' if report['dry_run'] else ''} "
+            f"in {report['duration_ms']} ms ({report['rows_per_second']} rows/s)"
+        ))
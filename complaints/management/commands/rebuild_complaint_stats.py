@@ -0,0 +1,42 @@
+"""
+Reconstruire les agrégats journaliers des plaintes (ComplaintDailyStats)
+
+    python manage.py rebuild_complaint_stats
+    python manage.py rebuild_complaint_stats --schema hopital_central
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django_tenants.utils import schema_context
+
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Reconstruit la table ComplaintDailyStats à partir des plaintes de chaque tenant"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schema',
+            dest='schema_name',
+            help="Limiter la reconstruction à un seul tenant (schema_name)",
+        )
+
+    def handle(self, *args, **options):
+        from complaints.services.rollup import rebuild_daily_stats
+
+        tenants = Tenant.objects.exclude(schema_name=settings.PUBLIC_SCHEMA_NAME)
+        if options['schema_name']:
+            tenants = tenants.filter(schema_name=options['schema_name'])
+            if not tenants.exists():
+                raise CommandError(f"Unknown tenant schema: {options['schema_name']}")
+
+        for tenant in tenants:
+            started = time.monotonic()
+            with schema_context(tenant.schema_name):
+                buckets = rebuild_daily_stats(tenant)
+            self.stdout.write(self.style.SUCCESS(
+                f"{tenant.schema_name}: {buckets} buckets rebuilt "
+                f"in {time.monotonic() - started:.2f}s"
+            ))
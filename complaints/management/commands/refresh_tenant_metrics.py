@@ -0,0 +1,79 @@
+"""
+Rafraîchir les snapshots de métriques des tenants (TenantMetricsSnapshot)
+
+    python manage.py refresh_tenant_metrics
+    python manage.py refresh_tenant_metrics --schema hopital_central
+    python manage.py refresh_tenant_metrics --loop --interval 300
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Recalcule, tenant par tenant, les métriques lues par les tableaux de bord plateforme"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schema',
+            dest='schema_name',
+            help="Limiter le rafraîchissement à un seul tenant (schema_name)",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help="Nombre de tenants traités en parallèle (1 par défaut)",
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help="Rafraîchir en continu (planificateur)",
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.TENANT_METRICS_REFRESH_INTERVAL,
+            help="Secondes entre deux passages en mode --loop",
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        if not options['loop']:
+            self.refresh(options)
+            return
+
+        try:
+            while True:
+                started = time.monotonic()
+                self.refresh(options)
+                close_old_connections()
+                time.sleep(max(0, options['interval'] - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
+
+    def refresh(self, options):
+        from complaints.services.platform_snapshot import refresh_tenant_snapshots
+
+        tenants = Tenant.objects.exclude(schema_name=settings.PUBLIC_SCHEMA_NAME)
+        if options['schema_name']:
+            tenants = tenants.filter(schema_name=options['schema_name'])
+            if not tenants.exists():
+                raise CommandError(f"Unknown tenant schema: {options['schema_name']}")
+
+        fanout = refresh_tenant_snapshots(tenants, max_workers=options['workers'])
+
+        for failure in fanout['failed']:
+            self.stderr.write(self.style.ERROR(
+                f"{failure['schema_name']}: {failure['error']}"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(fanout['results'])} tenant snapshot(s) refreshed, "
+            f"{len(fanout['failed'])} failed in {fanout['duration_ms']}ms"
+        ))
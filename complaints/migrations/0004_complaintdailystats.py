@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:59
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('complaints', '0003_complainthistory_slaconfig_alter_complaint_options_and_more'),
+        ('tenants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintDailyStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('urgency', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High')], max_length=10)),
+                ('status_group', models.CharField(choices=[('TO_HANDLE', 'To handle'), ('IN_PROGRESS', 'In progress'), ('RESOLVED', 'Resolved'), ('CLOSED', 'Closed'), ('ARCHIVED', 'Archived')], max_length=20)),
+                ('submitted', models.IntegerField(default=0)),
+                ('closed', models.IntegerField(default=0)),
+                ('sla_met', models.IntegerField(default=0)),
+                ('sla_missed', models.IntegerField(default=0)),
+                ('total_resolution_seconds', models.FloatField(default=0)),
+                ('assigned_user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('category', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='categories.category')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'date'], name='complaints__tenant__a0da3d_idx'), models.Index(fields=['tenant', 'assigned_user', 'date'], name='complaints__tenant__1d20a0_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'date', 'category', 'urgency', 'status_group', 'assigned_user'), name='complaint_daily_stats_unique_bucket', nulls_distinct=False)],
+            },
+        ),
+    ]
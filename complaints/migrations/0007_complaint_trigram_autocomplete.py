@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:26
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('complaints', '0006_complaint_search_vector'),
+        ('tenants', '0003_tenantmetricssnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # pg_trgm dans le schéma public (search_path de chaque tenant), une
+        # seule fois pour toute la base : les opclasses gin_trgm_ops y sont lues
+        migrations.RunSQL(
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='phone_normalized',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.F('phone_number'), models.Value('[^0-9]'), models.Value(''), models.Value('g'), function='REGEXP_REPLACE', output_field=models.CharField(max_length=50)), output_field=models.CharField(max_length=50)),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['tenant', 'phone_normalized'], name='complaints__tenant__609f14_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['reference'], name='complaint_reference_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['phone_normalized'], name='complaint_phone_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['location'], name='complaint_location_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0007_complaint_trigram_autocomplete'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='complaint',
+            name='submitted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0008_complaint_submitted_at_default'),
+        ('tenants', '0003_tenantmetricssnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaintcomment',
+            index=models.Index(fields=['complaint', 'created_at', 'id'], name='complaints__complai_0beadf_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_complaintcomment_latest_index'),
+        ('tenants', '0003_tenantmetricssnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaintattachment',
+            index=models.Index(fields=['complaint', 'uploaded_at', 'id'], name='complaints__complai_373879_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complainthistory',
+            index=models.Index(fields=['complaint', 'created_at', 'id'], name='complaints__complai_075a1f_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('complaints', '0010_timeline_indexes'),
+        ('tenants', '0003_tenantmetricssnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='sync_xid',
+            field=models.BigIntegerField(db_default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='complainthistory',
+            name='sync_xid',
+            field=models.BigIntegerField(db_default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['tenant', 'sync_xid', 'id'], name='complaints__tenant__e985c8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complainthistory',
+            index=models.Index(fields=['tenant', 'sync_xid', 'id'], name='complaints__tenant__66f8ad_idx'),
+        ),
+        # xid (64 bits, croissant) de la transaction qui écrit la ligne, dans le
+        # schéma du tenant ; les lignes existantes gardent 0 (premier appel)
+        migrations.RunSQL(
+            """
+            CREATE OR REPLACE FUNCTION complaints_set_sync_xid() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                NEW.sync_xid := pg_current_xact_id()::text::bigint;
+                RETURN NEW;
+            END;
+            $$;
+            CREATE TRIGGER complaint_sync_xid
+                BEFORE INSERT OR UPDATE ON complaints_complaint
+                FOR EACH ROW EXECUTE FUNCTION complaints_set_sync_xid();
+            CREATE TRIGGER complaint_history_sync_xid
+                BEFORE INSERT ON complaints_complainthistory
+                FOR EACH ROW EXECUTE FUNCTION complaints_set_sync_xid();
+            """,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS complaint_history_sync_xid ON complaints_complainthistory;
+            DROP TRIGGER IF EXISTS complaint_sync_xid ON complaints_complaint;
+            DROP FUNCTION IF EXISTS complaints_set_sync_xid();
+            """,
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:54
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('complaints', '0011_sync_xid'),
+        ('tenants', '0003_tenantmetricssnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='complaint',
+            name='complaint_reference_trgm',
+        ),
+        migrations.RemoveIndex(
+            model_name='complaint',
+            name='complaint_phone_trgm',
+        ),
+        migrations.RemoveIndex(
+            model_name='complaint',
+            name='complaint_location_trgm',
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['tenant', 'location'], name='complaints__tenant__8652f2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['reference'], name='complaint_reference_trgm', opclasses=['gist_trgm_ops(siglen=64)']),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['phone_normalized'], name='complaint_phone_trgm', opclasses=['gist_trgm_ops(siglen=64)']),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location'], name='complaint_location_trgm', opclasses=['gist_trgm_ops(siglen=64)']),
+        ),
+    ]
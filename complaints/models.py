@@ -1,6 +1,8 @@
 import uuid
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.utils import timezone
 from datetime import timedelta
 from model_utils import FieldTracker
@@ -35,8 +37,18 @@ class Complaint(models.Model):
     urgency = models.CharField(max_length=10, choices=URGENCY_CHOICES, default="MEDIUM")
     location = models.CharField(max_length=255, blank=True)
     phone_number = models.CharField(max_length=50, blank=True)
+    # Chiffres seuls du téléphone ('+237 6 00-00' -> '237600000'), calculé par PostgreSQL
+    phone_normalized = models.GeneratedField(
+        expression=models.Func(
+            models.F('phone_number'), models.Value('[^0-9]'), models.Value(''), models.Value('g'),
+            function='REGEXP_REPLACE', output_field=models.CharField(max_length=50)
+        ),
+        output_field=models.CharField(max_length=50),
+        db_persist=True,
+    )
     
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # default plutôt qu'auto_now_add : un import conserve la date d'origine
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)
     closed_at = models.DateTimeField(null=True, blank=True)
     sla_deadline = models.DateTimeField(null=True, blank=True)
     
@@ -71,8 +83,30 @@ class Complaint(models.Model):
     )
     
     updated_at = models.DateTimeField(auto_now=True)
+    # Ordre de synchronisation (/changes/) : xid de la dernière transaction qui
+    # a écrit la ligne, renseigné par un trigger (migration 0011)
+    sync_xid = models.BigIntegerField(db_default=0, editable=False)
+    
+    # Recherche plein texte : colonne générée par PostgreSQL (toujours à jour),
+    # le titre pèse plus que la description. Config 'simple' : plaintes en
+    # français comme en anglais, sans racinisation propre à une langue.
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='simple')
+            + SearchVector('description', weight='B', config='simple')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
     
-    tracker = FieldTracker(fields=['assigned_user', 'status'])
+    # Toutes les colonnes modifiables : le rollup lit les valeurs précédentes
+    # et save() n'écrit que les champs modifiés (voir save)
+    tracker = FieldTracker(fields=[
+        'assigned_user', 'status', 'category', 'urgency',
+        'submitted_at', 'closed_at', 'sla_deadline',
+        'tenant', 'reference', 'title', 'description', 'location',
+        'phone_number', 'subcategory', 'submitted_by',
+    ])
     
     class Meta:
         indexes = [
@@ -80,8 +114,19 @@ class Complaint(models.Model):
             models.Index(fields=["tenant", "status"]),
             models.Index(fields=["tenant", "submitted_at"]),
             models.Index(fields=["tenant", "urgency"]),
+            models.Index(fields=["tenant", "phone_normalized"]),
+            # Nombre de plaintes par lieu proposé à l'autocomplétion
+            models.Index(fields=["tenant", "location"]),
+            # Synchronisation incrémentale (/changes/?since=)
+            models.Index(fields=["tenant", "sync_xid", "id"]),
             models.Index(fields=["assigned_user", "status"]),
             models.Index(fields=["sla_deadline"]),
+            GinIndex(fields=["search_vector"], name="complaint_search_vector_gin"),
+            # Autocomplétion tolérante aux fautes (pg_trgm) : GiST pour parcourir
+            # l'index par distance croissante (k plus proches voisins)
+            GistIndex(fields=["reference"], name="complaint_reference_trgm", opclasses=["gist_trgm_ops(siglen=64)"]),
+            GistIndex(fields=["phone_normalized"], name="complaint_phone_trgm", opclasses=["gist_trgm_ops(siglen=64)"]),
+            GistIndex(fields=["location"], name="complaint_location_trgm", opclasses=["gist_trgm_ops(siglen=64)"]),
         ]
         ordering = ["-submitted_at"]
     
@@ -90,7 +135,8 @@ class Complaint(models.Model):
     
     def save(self, *args, **kwargs):
         # Générer la référence si elle n'existe pas
-        if not self.reference:
+        generated_reference = not self.reference
+        if generated_reference:
             self.reference = self.generate_reference()
         
         # Si c'est une nouvelle plainte, définir submitted_at maintenant
@@ -100,44 +146,50 @@ class Complaint(models.Model):
             self.submitted_at = timezone.now()
         
         # Calculer le SLA deadline si pas déjà défini
-        if not self.sla_deadline and self.category and self.urgency and self.submitted_at:
+        if not self.sla_deadline and self.category_id and self.urgency and self.submitted_at:
             self.calculate_sla_deadline()
         
-        super().save(*args, **kwargs)
+        # Plainte existante sans update_fields : seuls les champs modifiés sont
+        # écrits (description et colonnes TOAST non réécrites), et rien du tout
+        # (ni UPDATE ni signaux) si aucun n'a changé
+        if not is_new and not args and kwargs.get('update_fields') is None:
+            changed = set(self.tracker.changed())
+            if not changed:
+                return
+            kwargs['update_fields'] = changed | {'updated_at'}
+        
+        # Transaction unique : la plainte et ses agrégats (signal post_save)
+        # sont écrits ensemble
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Référence générée déjà prise (ex. saisie manuellement) : on en tire une autre
+                if (
+                    not generated_reference
+                    or attempt == 2
+                    or not Complaint.objects.filter(reference=self.reference).exists()
+                ):
+                    raise
+                self.reference = self.generate_reference()
     
     def generate_reference(self):
-        """Génère une référence unique pour la plainte"""
-        from datetime import datetime
-        year = datetime.now().year
-        
-        # Compter les plaintes du tenant pour cette année
-        count = Complaint.objects.filter(
-            tenant=self.tenant,
-            submitted_at__year=year
-        ).count() + 1
-        
-        return f"{self.tenant.schema_name.upper()}-{year}-{count:05d}"
+        """Génère une référence unique pour la plainte (compteur par tenant et par année)"""
+        from complaints.services.references import next_reference
+        return next_reference(self.tenant)
     
     def calculate_sla_deadline(self):
-        """Calcule la deadline SLA basée sur la config"""
+        """Calcule la deadline SLA basée sur la config (politique SLA du tenant en cache)"""
         if not self.submitted_at:
             # Si submitted_at n'est pas encore défini, on ne peut pas calculer
             return
         
-        try:
-            from complaints.models import SLAConfig
-            sla_config = SLAConfig.objects.get(
-                tenant=self.tenant,
-                category=self.category,
-                urgency_level=self.urgency
-            )
-            self.sla_deadline = self.submitted_at + timedelta(hours=sla_config.delay_hours)
-        except SLAConfig.DoesNotExist:
-            # SLA par défaut si pas de config
-            default_hours = {"LOW": 72, "MEDIUM": 48, "HIGH": 24}
-            self.sla_deadline = self.submitted_at + timedelta(
-                hours=default_hours.get(self.urgency, 48)
-            )
+        from complaints.services.sla import get_sla_policy
+        self.sla_deadline = get_sla_policy(self.tenant_id).deadline(
+            self.submitted_at, self.category_id, self.urgency
+        )
     
     @property
     def is_overdue(self):
@@ -179,7 +231,11 @@ class ComplaintAttachment(models.Model):
     )
     
     class Meta:
-        indexes = [models.Index(fields=["tenant", "complaint"])]
+        indexes = [
+            models.Index(fields=["tenant", "complaint"]),
+            # Fil de la plainte (pagination keyset)
+            models.Index(fields=["complaint", "uploaded_at", "id"]),
+        ]
     
     def __str__(self):
         return f"{self.filename} - {self.complaint.reference}"
@@ -210,7 +266,11 @@ class ComplaintComment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        indexes = [models.Index(fields=["tenant", "complaint"])]
+        indexes = [
+            models.Index(fields=["tenant", "complaint"]),
+            # Derniers commentaires d'une plainte (détail, pagination keyset)
+            models.Index(fields=["complaint", "created_at", "id"]),
+        ]
         ordering = ["created_at"]
     
     def __str__(self):
@@ -280,15 +340,106 @@ class ComplaintHistory(models.Model):
     new_value = models.JSONField(null=True, blank=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Ordre de synchronisation des retraits, comme Complaint.sync_xid
+    sync_xid = models.BigIntegerField(db_default=0, editable=False)
     
     class Meta:
         indexes = [
             models.Index(fields=["tenant", "complaint"]),
             models.Index(fields=["tenant", "created_at"]),
             models.Index(fields=["action"]),
+            # Fil de la plainte (pagination keyset)
+            models.Index(fields=["complaint", "created_at", "id"]),
+            # Retraits de la synchronisation incrémentale
+            models.Index(fields=["tenant", "sync_xid", "id"]),
         ]
         ordering = ["-created_at"]
     
     def __str__(self):
         return f"{self.action} on {self.complaint_reference} at {self.created_at}"
-    
\ No newline at end of file
+    
+
+
+class ComplaintDailyStats(models.Model):
+    """
+    Agrégats journaliers des plaintes, maintenus de façon incrémentale
+    (voir complaints.services.rollup) et reconstruits par
+    `manage.py rebuild_complaint_stats`.
+    """
+    STATUS_GROUP_CHOICES = [
+        ("TO_HANDLE", "To handle"),
+        ("IN_PROGRESS", "In progress"),
+        ("RESOLVED", "Resolved"),
+        ("CLOSED", "Closed"),
+        ("ARCHIVED", "Archived"),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey("tenants.Tenant", on_delete=models.CASCADE)
+    date = models.DateField()
+    # Pas de contrainte FK : une catégorie ou un agent supprimé laisse
+    # un identifiant orphelin, traité comme "sans catégorie / non assigné"
+    category = models.ForeignKey(
+        "categories.Category",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+    urgency = models.CharField(max_length=10, choices=Complaint.URGENCY_CHOICES)
+    status_group = models.CharField(max_length=20, choices=STATUS_GROUP_CHOICES)
+    assigned_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+    
+    # Plaintes soumises ce jour-là
+    submitted = models.IntegerField(default=0)
+    # Plaintes résolues/clôturées ce jour-là (closed_at)
+    closed = models.IntegerField(default=0)
+    sla_met = models.IntegerField(default=0)
+    sla_missed = models.IntegerField(default=0)
+    total_resolution_seconds = models.FloatField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "date", "category", "urgency", "status_group", "assigned_user"],
+                name="complaint_daily_stats_unique_bucket",
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["tenant", "date"]),
+            models.Index(fields=["tenant", "assigned_user", "date"]),
+        ]
+    
+    def __str__(self):
+        return f"{self.tenant_id} - {self.date} - {self.status_group}"
+
+
+class ReferenceSequence(models.Model):
+    """
+    Dernier numéro de référence attribué par tenant et par année
+    (voir complaints.services.references).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey("tenants.Tenant", on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    last_value = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "year"],
+                name="reference_sequence_unique_tenant_year",
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.tenant_id} - {self.year} - {self.last_value}"
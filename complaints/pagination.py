@@ -0,0 +1,264 @@
+"""
+Pagination par clé (keyset) des listes de plaintes.
+
+Les pages sont ordonnées sur (champ de tri, id) et le curseur opaque contient
+les valeurs de la dernière ligne servie : la page suivante est lue par un
+WHERE (champ, id) > (valeur, id) sur l'index, sans OFFSET. La page N coûte
+donc autant que la page 1.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    ?cursor=<opaque>&page_size=<n> ; l'ordre suit ?ordering= (OrderingFilter)
+    parmi les ordering_fields de la vue, départagé par l'id.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 25
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def get_ordering_filter(view):
+        """Backend de tri de la vue (sous-classe d'OrderingFilter), sinon OrderingFilter"""
+        for backend in getattr(view, 'filter_backends', ()):
+            if issubclass(backend, OrderingFilter):
+                return backend()
+        return OrderingFilter()
+
+    def get_ordering(self, request, queryset, view):
+        """Ordre demandé (champs validés par OrderingFilter), puis l'id"""
+        ordering = self.get_ordering_filter(view).get_ordering(request, queryset, view) or ['-pk']
+        ordering = [term for term in ordering if term.lstrip('-') not in ('pk', 'id')]
+        last_desc = ordering[-1].startswith('-') if ordering else True
+        return ordering + ['-id' if last_desc else 'id']
+
+    @staticmethod
+    def _field(queryset, name):
+        """Champ du modèle, ou champ de sortie d'une annotation (ex. pertinence)"""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    # ------------------------------------------------------------
+    # Curseurs
+    # ------------------------------------------------------------
+    def encode_cursor(self, ordering, position, reverse):
+        payload = json.dumps({'o': ordering, 'p': position, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, ordering, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            if payload['o'] != ordering or len(payload['p']) != len(ordering):
+                raise ValueError
+            position = [
+                None if value is None else self._field(queryset, term.lstrip('-')).to_python(value)
+                for term, value in zip(ordering, payload['p'])
+            ]
+            return position, bool(payload['r'])
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _position(self, row, ordering):
+        values = []
+        for term in ordering:
+            field = term.lstrip('-')
+            # Instances de modèle ou lignes .values()
+            value = row[field] if isinstance(row, dict) else getattr(row, field)
+            values.append(None if value is None else str(value.isoformat() if hasattr(value, 'isoformat') else value))
+        return values
+
+    # ------------------------------------------------------------
+    # Filtre keyset
+    # ------------------------------------------------------------
+    @staticmethod
+    def _after(field, value, descending, nullable):
+        """Lignes strictement après `value` sur un champ (NULLS LAST en ASC, FIRST en DESC)"""
+        if descending:
+            if value is None:
+                return Q(**{f'{field}__isnull': False})
+            return Q(**{f'{field}__lt': value})
+        if value is None:
+            return Q(pk__in=[])
+        condition = Q(**{f'{field}__gt': value})
+        if nullable:
+            condition |= Q(**{f'{field}__isnull': True})
+        return condition
+
+    @staticmethod
+    def _equal(field, value):
+        if value is None:
+            return Q(**{f'{field}__isnull': True})
+        return Q(**{field: value})
+
+    def keyset_filter(self, queryset, ordering, position):
+        """
+        (f1, f2, ..., id) > (v1, v2, ..., id0) dans l'ordre donné, plus une borne
+        simple sur le premier champ pour que l'index serve de point de départ.
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for term, value in zip(ordering, position):
+            field = term.lstrip('-')
+            nullable = self._field(queryset, field).null
+            condition |= equal & self._after(field, value, term.startswith('-'), nullable)
+            equal &= self._equal(field, value)
+
+        first_term, first_value = ordering[0], position[0]
+        first_field = first_term.lstrip('-')
+        if first_value is not None:
+            if first_term.startswith('-'):
+                condition &= Q(**{f'{first_field}__lte': first_value})
+            elif not self._field(queryset, first_field).null:
+                condition &= Q(**{f'{first_field}__gte': first_value})
+        elif not first_term.startswith('-'):
+            condition &= Q(**{f'{first_field}__isnull': True})
+
+        return condition
+
+    # ------------------------------------------------------------
+    # API BasePagination
+    # ------------------------------------------------------------
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        self.ordering = self.get_ordering(request, queryset, view)
+        position, reverse = self.decode_cursor(request, self.ordering, queryset)
+        query_ordering = self.get_query_ordering(reverse)
+
+        queryset = queryset.order_by(*query_ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(queryset, query_ordering, position))
+
+        return self.get_page(list(queryset[:self.page_size + 1]), position, reverse)
+
+    def get_query_ordering(self, reverse):
+        """Page précédente : on parcourt l'ordre inverse puis on remet la page à l'endroit"""
+        if not reverse:
+            return self.ordering
+        return [term[1:] if term.startswith('-') else f'-{term}' for term in self.ordering]
+
+    def get_page(self, rows, position, reverse):
+        """Page servie (page_size + 1 lignes lues) et positions des liens suivant / précédent"""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.previous_position = None
+        if rows:
+            if has_more or reverse:
+                self.next_position = self._position(rows[-1], self.ordering)
+            if position is not None and (has_more or not reverse):
+                self.previous_position = self._position(rows[0], self.ordering)
+
+        return rows
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        cursor = self.encode_cursor(self.ordering, position, reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self.get_link(self.next_position, False)
+
+    def get_previous_link(self):
+        return self.get_link(self.previous_position, True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ComplaintKeysetPagination(KeysetPagination):
+    """Liste des plaintes : 25 par page par défaut, 100 au maximum"""
+    page_size = 25
+    max_page_size = 100
+
+
+class ComplaintCommentPagination(KeysetPagination):
+    """Commentaires d'une plainte, du plus récent au plus ancien (ordre fixe)"""
+    page_size = 20
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return list(self.ordering)
+
+    def get_cursor_after(self, comment):
+        """Curseur de la page qui suit `comment` (commentaires plus anciens)"""
+        ordering = list(self.ordering)
+        return self.encode_cursor(ordering, self._position(comment, ordering), False)
+
+
+class TimelinePagination(KeysetPagination):
+    """
+    Fil d'une plainte (complaints.services.timeline) : paginate_queryset reçoit
+    les branches .values() du fil. Le filtre keyset, le tri et la limite sont
+    appliqués à chaque branche puis au UNION ALL : une requête par page.
+    """
+    page_size = 25
+    max_page_size = 100
+    ordering = ('-timestamp', '-entry_id')
+
+    def get_ordering(self, request, queryset, view):
+        return list(self.ordering)
+
+    def paginate_queryset(self, sources, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        self.ordering = self.get_ordering(request, sources[0], view)
+        position, reverse = self.decode_cursor(request, self.ordering, sources[0])
+        query_ordering = self.get_query_ordering(reverse)
+
+        branches = []
+        for branch in sources:
+            branch = branch.order_by(*query_ordering)
+            if position is not None:
+                branch = branch.filter(self.keyset_filter(branch, query_ordering, position))
+            branches.append(branch[:self.page_size + 1])
+
+        combined = branches[0].union(*branches[1:], all=True).order_by(*query_ordering)
+        return self.get_page(list(combined[:self.page_size + 1]), position, reverse)
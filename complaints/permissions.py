@@ -84,4 +84,35 @@ class CanDeleteComplaint(permissions.BasePermission):
         return request.user.role in [
             'SUPER_ADMIN',
             'TENANT_ADMIN'
-        ]
\ No newline at end of file
+        ]
+
+
+class CanImportComplaints(permissions.BasePermission):
+    """
+    Permission pour l'import en masse de plaintes (seulement admins)
+    """
+    
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+        
+        return request.user.role in [
+            'SUPER_ADMIN',
+            'TENANT_ADMIN'
+        ]
+
+
+class CanExportComplaints(permissions.BasePermission):
+    """
+    Permission pour l'export complet des plaintes (admins et auditeurs)
+    """
+    
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+        
+        return request.user.role in [
+            'SUPER_ADMIN',
+            'TENANT_ADMIN',
+            'AUDITOR'
+        ]
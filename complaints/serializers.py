@@ -1,8 +1,11 @@
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from complaints.models import (
     Complaint, ComplaintAttachment, ComplaintComment, 
     SLAConfig, ComplaintHistory
 )
+from complaints.pagination import ComplaintCommentPagination
 from users.serializers import UserSerializer
 
 
@@ -34,6 +37,41 @@ class ComplaintCommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'user']
 
 
+class RelatedNameSerializer(serializers.Serializer):
+    """Relation développée (?expand=) : catégorie, sous-catégorie"""
+    id = serializers.UUIDField(read_only=True)
+    name = serializers.CharField(read_only=True)
+
+
+class RelatedUserSerializer(serializers.Serializer):
+    """Relation développée (?expand=) : utilisateur"""
+    id = serializers.UUIDField(read_only=True)
+    full_name = serializers.CharField(read_only=True)
+    email = serializers.EmailField(read_only=True)
+
+
+class SparseFieldsetMixin:
+    """
+    Ne garde que les champs context['fields'] (tous si None) et remplace les
+    relations context['expand'] par des objets imbriqués
+    """
+    expandable_fields = {}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        expand = self.context.get('expand', ())
+        
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+        
+        if fields is not None:
+            allowed = set(fields) | set(expand)
+            for name in list(self.fields):
+                if name not in allowed:
+                    self.fields.pop(name)
+
+
 class ComplaintListSerializer(serializers.ModelSerializer):
     """Serializer léger pour les listes"""
     category_name = serializers.CharField(source='category.name', read_only=True)
@@ -54,8 +92,19 @@ class ComplaintListSerializer(serializers.ModelSerializer):
         ]
 
 
-class ComplaintDetailSerializer(serializers.ModelSerializer):
-    """Serializer complet pour les détails"""
+class ComplaintDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Serializer complet pour les détails (?fields= / ?expand=).
+    comments : les COMPLAINT_DETAIL_COMMENTS derniers, dans l'ordre chronologique ;
+    comments_next : lien vers les plus anciens (/comments/?cursor=), sinon null.
+    """
+    expandable_fields = {
+        'category': RelatedNameSerializer,
+        'subcategory': RelatedNameSerializer,
+        'submitted_by': RelatedUserSerializer,
+        'assigned_user': RelatedUserSerializer,
+    }
+    
     category_name = serializers.CharField(source='category.name', read_only=True)
     subcategory_name = serializers.CharField(
         source='subcategory.name', 
@@ -71,7 +120,8 @@ class ComplaintDetailSerializer(serializers.ModelSerializer):
     )
     
     attachments = ComplaintAttachmentSerializer(many=True, read_only=True)
-    comments = ComplaintCommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
+    comments_next = serializers.SerializerMethodField()
     
     is_overdue = serializers.BooleanField(read_only=True)
     is_urgent_unhandled = serializers.BooleanField(read_only=True)
@@ -87,12 +137,37 @@ class ComplaintDetailSerializer(serializers.ModelSerializer):
             'assigned_user', 'assigned_user_name',
             'submitted_at', 'closed_at', 'updated_at', 'sla_deadline',
             'is_overdue', 'is_urgent_unhandled', 'resolution_time',
-            'attachments', 'comments'
+            'attachments', 'comments', 'comments_next'
         ]
         read_only_fields = [
             'id', 'reference', 'tenant', 'submitted_at', 
             'updated_at', 'submitted_by'
         ]
+    
+    def _latest_comments(self, obj):
+        """(derniers commentaires du plus récent au plus ancien, il en reste d'autres)"""
+        limit = settings.COMPLAINT_DETAIL_COMMENTS
+        comments = getattr(obj, 'latest_comments', None)
+        if comments is None:
+            # Instance non préchargée (ex. réponse de assign)
+            comments = list(
+                obj.comments.select_related('user')
+                .order_by(*ComplaintCommentPagination.ordering)[:limit + 1]
+            )
+            obj.latest_comments = comments
+        return comments[:limit], len(comments) > limit
+    
+    def get_comments(self, obj):
+        comments, _ = self._latest_comments(obj)
+        return ComplaintCommentSerializer(reversed(comments), many=True).data
+    
+    def get_comments_next(self, obj):
+        comments, has_more = self._latest_comments(obj)
+        if not has_more:
+            return None
+        url = reverse('complaint-comments', kwargs={'pk': obj.pk}, request=self.context.get('request'))
+        cursor = ComplaintCommentPagination().get_cursor_after(comments[-1])
+        return f"{url}?{ComplaintCommentPagination.cursor_query_param}={cursor}"
 
 
 class ComplaintCreateSerializer(serializers.ModelSerializer):
@@ -131,6 +206,65 @@ class ComplaintCreateSerializer(serializers.ModelSerializer):
         return complaint
 
 
+class ComplaintImportRowSerializer(serializers.Serializer):
+    """
+    Une ligne d'import (CSV / NDJSON). La catégorie et la sous-catégorie sont
+    données par id ou par nom et résolues dans les tables du tenant chargées
+    une seule fois pour tout l'import (context['categories'] / ['subcategories']).
+    """
+    reference = serializers.CharField(max_length=64, required=False)
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField()
+    urgency = serializers.ChoiceField(choices=Complaint.URGENCY_CHOICES, default='MEDIUM')
+    status = serializers.ChoiceField(choices=Complaint.STATUS_CHOICES, default='NEW')
+    location = serializers.CharField(max_length=255, default='')
+    phone_number = serializers.CharField(max_length=50, default='')
+    category = serializers.CharField(required=False)
+    subcategory = serializers.CharField(required=False)
+    submitted_at = serializers.DateTimeField(required=False)
+    closed_at = serializers.DateTimeField(required=False)
+    
+    def validate_category(self, value):
+        category = self.context['categories'].get(value.casefold())
+        if category is None:
+            raise serializers.ValidationError(f"Unknown category: {value}")
+        return category
+    
+    def validate(self, attrs):
+        subcategory = attrs.get('subcategory')
+        if subcategory is not None:
+            category = attrs.get('category')
+            subcategories = self.context['subcategories']
+            match = subcategories.get(subcategory.casefold())
+            if match is None and category is not None:
+                match = subcategories.get((category.id, subcategory.casefold()))
+            if match is None or (category is not None and match.category_id != category.id):
+                raise serializers.ValidationError({'subcategory': f"Unknown subcategory: {subcategory}"})
+            attrs['subcategory'] = match
+            attrs.setdefault('category', match.category)
+        
+        closed_at = attrs.get('closed_at')
+        if closed_at and attrs.get('submitted_at') and closed_at < attrs['submitted_at']:
+            raise serializers.ValidationError({'closed_at': "closed_at is before submitted_at"})
+        return attrs
+
+
+class BulkAssignSerializer(serializers.Serializer):
+    """Assignation groupée : plaintes (ids) et agent (user_id)"""
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=settings.COMPLAINT_BULK_MAX_IDS
+    )
+    user_id = serializers.UUIDField()
+
+
+class BulkTransitionSerializer(serializers.Serializer):
+    """Changement de statut groupé : plaintes (ids) et nouveau statut"""
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=settings.COMPLAINT_BULK_MAX_IDS
+    )
+    status = serializers.ChoiceField(choices=Complaint.STATUS_CHOICES)
+
+
 class ComplaintUpdateSerializer(serializers.ModelSerializer):
     """Serializer pour mettre à jour une plainte"""
     
@@ -149,7 +283,7 @@ class ComplaintUpdateSerializer(serializers.ModelSerializer):
         old_values = {
             'status': instance.status,
             'urgency': instance.urgency,
-            'assigned_user_id': str(instance.assigned_user.id) if instance.assigned_user else None,
+            'assigned_user_id': str(instance.assigned_user_id) if instance.assigned_user_id else None,
         }
         
         # Mise à jour
@@ -161,13 +295,18 @@ class ComplaintUpdateSerializer(serializers.ModelSerializer):
             from django.utils import timezone
             instance.closed_at = timezone.now()
         
+        # Rien n'a changé : ni écriture ni historique
+        if not instance.tracker.changed():
+            return instance
+        
+        # Seuls les champs modifiés sont écrits (Complaint.save)
         instance.save()
         
         # Nouvelles valeurs
         new_values = {
             'status': instance.status,
             'urgency': instance.urgency,
-            'assigned_user_id': str(instance.assigned_user.id) if instance.assigned_user else None,
+            'assigned_user_id': str(instance.assigned_user_id) if instance.assigned_user_id else None,
         }
         
         # Déterminer l'action
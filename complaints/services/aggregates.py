@@ -0,0 +1,120 @@
+"""
+Agrégations SQL réutilisables par les services de statistiques
+"""
+from django.db.models import (
+    Aggregate, Count, Q, Avg, Min, Max, F, Func, ExpressionWrapper, fields
+)
+from django.utils import timezone
+
+
+IN_PROGRESS_STATUSES = ['ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
+RESOLVED_STATUSES = ['RESOLVED', 'CLOSED']
+FINISHED_STATUSES = ['RESOLVED', 'CLOSED', 'ARCHIVED']
+
+
+EMPTY_AGENT_METRICS = {
+    'open': 0,
+    'open_overdue': 0,
+    'in_progress': 0,
+    'in_progress_overdue': 0,
+    'resolved': 0,
+    'sla_met': 0,
+    'avg_resolution_seconds': None,
+}
+
+
+def resolution_duration():
+    """Expression SQL équivalente à Complaint.resolution_time (en intervalle)"""
+    return ExpressionWrapper(
+        F('closed_at') - F('submitted_at'),
+        output_field=fields.DurationField()
+    )
+
+
+class EpochSeconds(Func):
+    """EXTRACT(EPOCH FROM <intervalle>) : durée en secondes (float)"""
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = fields.FloatField()
+
+
+class PercentileCont(Aggregate):
+    """Agrégat ordonné PostgreSQL : percentile_cont(p) WITHIN GROUP (ORDER BY expr)"""
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = fields.FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def resolution_seconds():
+    """Temps de résolution en secondes, calculé côté base"""
+    return EpochSeconds(resolution_duration())
+
+
+def get_agent_metrics(qs, now=None):
+    """
+    Compteurs par agent assigné en une seule requête GROUP BY.
+    Retourne {assigned_user_id: {...}} ; les agents sans plainte sont absents.
+    """
+    now = now or timezone.now()
+    is_open = ~Q(status__in=FINISHED_STATUSES)
+    is_in_progress = Q(status__in=IN_PROGRESS_STATUSES)
+    is_resolved = Q(status__in=RESOLVED_STATUSES)
+
+    rows = (
+        qs.filter(assigned_user__isnull=False)
+        .order_by()
+        .values('assigned_user_id')
+        .annotate(
+            open=Count('id', filter=is_open),
+            open_overdue=Count('id', filter=is_open & Q(sla_deadline__lt=now)),
+            in_progress=Count('id', filter=is_in_progress),
+            in_progress_overdue=Count(
+                'id', filter=is_in_progress & Q(sla_deadline__lt=now)
+            ),
+            resolved=Count('id', filter=is_resolved),
+            sla_met=Count(
+                'id', filter=is_resolved & Q(closed_at__lte=F('sla_deadline'))
+            ),
+            avg_resolution_seconds=Avg(
+                resolution_seconds(),
+                filter=is_resolved & Q(closed_at__isnull=False)
+            ),
+        )
+    )
+
+    return {row.pop('assigned_user_id'): row for row in rows}
+
+
+def seconds_to_hours(value):
+    """Convertit une durée en secondes en heures arrondies"""
+    if value is None:
+        return None
+    return round(value / 3600, 1)
+
+
+def get_resolution_time_stats(qs):
+    """
+    Distribution des temps de résolution (heures) calculée dans PostgreSQL :
+    moyenne, min, max et percentiles p50/p90/p99, sans charger les plaintes.
+    """
+    seconds = resolution_seconds()
+    stats = qs.filter(
+        status__in=RESOLVED_STATUSES,
+        closed_at__isnull=False
+    ).aggregate(
+        count=Count('id'),
+        average=Avg(seconds),
+        min=Min(seconds),
+        max=Max(seconds),
+        p50=PercentileCont(seconds, 0.5),
+        p90=PercentileCont(seconds, 0.9),
+        p99=PercentileCont(seconds, 0.99),
+    )
+
+    return {
+        key: value if key == 'count' else seconds_to_hours(value)
+        for key, value in stats.items()
+    }
@@ -0,0 +1,98 @@
+"""
+Autocomplétion tolérante aux fautes sur la référence, le téléphone (chiffres
+seuls) et le lieu des plaintes, via pg_trgm.
+
+Chaque champ est lu sur son index GiST trigramme : l'opérateur <% (similarité
+de mot, seuil pg_trgm.word_similarity_threshold) filtre par l'index, qui est
+parcouru par distance croissante (<<->) et s'arrête aux k premiers candidats.
+Un préfixe commun à presque toutes les lignes (« DEMO-2026- », « 237 ») ne
+fait donc plus trier toute la table.
+"""
+from django.contrib.postgres.search import TrigramWordDistance, TrigramWordSimilarity
+from django.db.models import Count
+
+from complaints.filters import normalize_phone
+
+AUTOCOMPLETE_FIELDS = ('reference', 'phone_number', 'location')
+MIN_LENGTH = 2
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+# Plaintes les plus proches parmi lesquelles sont choisis les lieux distincts
+LOCATION_CANDIDATES = 200
+
+
+def _complaint_matches(queryset, field, column, term, limit):
+    """Plaintes dont `column` ressemble au terme : une entrée par plainte"""
+    rows = (
+        queryset.filter(**{f'{column}__trigram_word_similar': term})
+        .annotate(similarity=TrigramWordSimilarity(term, column))
+        .order_by(TrigramWordDistance(term, column))
+        .values('id', 'reference', 'title', field, 'similarity')[:limit]
+    )
+    return [
+        {
+            'field': field,
+            'value': row[field],
+            'similarity': round(row['similarity'], 3),
+            'id': str(row['id']),
+            'reference': row['reference'],
+            'title': row['title'],
+        }
+        for row in rows
+    ]
+
+
+def _location_matches(queryset, term, limit):
+    """Lieux distincts ressemblant au terme, avec leur nombre de plaintes"""
+    nearest = (
+        queryset.filter(location__trigram_word_similar=term)
+        .annotate(similarity=TrigramWordSimilarity(term, 'location'))
+        .order_by(TrigramWordDistance(term, 'location'))
+        .values_list('location', 'similarity')[:LOCATION_CANDIDATES]
+    )
+    similarities = {}
+    for location, similarity in nearest:
+        similarities.setdefault(location, similarity)
+        if len(similarities) == limit:
+            break
+
+    counts = dict(
+        queryset.filter(location__in=similarities)
+        .values('location')
+        .annotate(complaints=Count('id'))
+        .order_by()
+        .values_list('location', 'complaints')
+    )
+    return [
+        {
+            'field': 'location',
+            'value': location,
+            'similarity': round(similarity, 3),
+            'complaints': counts.get(location, 0),
+        }
+        for location, similarity in sorted(similarities.items(), key=lambda item: (-item[1], item[0]))
+    ]
+
+
+def autocomplete(queryset, term, fields=AUTOCOMPLETE_FIELDS, limit=DEFAULT_LIMIT):
+    """
+    Les `limit` meilleures correspondances du terme, tous champs confondus,
+    par similarité décroissante. Une requête par champ interrogé (deux pour
+    le lieu : les lieux proches, puis leur nombre de plaintes).
+    """
+    term = term.strip()
+    if len(term) < MIN_LENGTH:
+        return []
+
+    results = []
+    if 'reference' in fields:
+        results += _complaint_matches(queryset, 'reference', 'reference', term, limit)
+    if 'phone_number' in fields:
+        digits = normalize_phone(term)
+        if len(digits) >= MIN_LENGTH:
+            results += _complaint_matches(queryset, 'phone_number', 'phone_normalized', digits, limit)
+    if 'location' in fields:
+        results += _location_matches(queryset, term, limit)
+
+    results.sort(key=lambda match: -match['similarity'])
+    return results[:limit]
@@ -0,0 +1,220 @@
+"""
+Actions groupées sur les plaintes : assignation et changement de statut d'une
+liste d'ids, en une transaction.
+
+Les plaintes visibles sont verrouillées (SELECT ... FOR UPDATE) puis modifiées
+par un seul UPDATE ; l'historique et les notifications (une par agent
+concerné) sont insérés par bulk_create et le rollup reçoit un seul delta.
+Le résultat est rendu id par id : updated, unchanged ou not_found.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from complaints.models import Complaint, ComplaintHistory
+from complaints.services.dashboard_cache import bump_data_version
+from complaints.services.rollup import STATE_FIELDS, record_state_changes
+
+# Statuts qui renseignent closed_at (comme ComplaintUpdateSerializer)
+CLOSING_STATUSES = ('CLOSED', 'RESOLVED')
+
+
+def _lock(queryset, ids):
+    """
+    Plaintes visibles parmi `ids`, verrouillées jusqu'à la fin de la transaction
+    (dans l'ordre des ids pour éviter les interblocages), avec leur état rollup
+    """
+    from tenants.models import Tenant
+
+    rows = list(
+        queryset.filter(id__in=ids)
+        .order_by('id')
+        .select_for_update()
+        .values('id', 'reference', *STATE_FIELDS)
+    )
+    timezones = {
+        tenant.id: tenant.get_timezone()
+        for tenant in Tenant.objects.filter(id__in={row['tenant_id'] for row in rows})
+    }
+    for row in rows:
+        row['tzinfo'] = timezones[row['tenant_id']]
+    return rows
+
+
+def _state(row, **changes):
+    state = {field: row[field] for field in ('tzinfo',) + STATE_FIELDS}
+    state.update(changes)
+    return state
+
+
+def _summary(ids, outcome):
+    results = [{'id': str(complaint_id), 'result': outcome.get(complaint_id, 'not_found')} for complaint_id in ids]
+    summary = {'updated': 0, 'unchanged': 0, 'not_found': 0}
+    for result in results:
+        summary[result['result']] += 1
+    summary['results'] = results
+    return summary
+
+
+def _references(rows, limit=5):
+    references = [row['reference'] for row in rows[:limit]]
+    if len(rows) > limit:
+        references.append(f"+{len(rows) - limit}")
+    return ', '.join(references)
+
+
+def _notification(row_group, agent_id, title, message, notification_type):
+    from notifications.models import Notification
+
+    first = row_group[0]
+    return Notification(
+        user_id=agent_id,
+        tenant_id=first['tenant_id'],
+        type=notification_type,
+        title=title,
+        message=message,
+        link=f"/complaints/{first['id']}" if len(row_group) == 1 else "/complaints",
+        complaint_id=first['id'] if len(row_group) == 1 else None
+    )
+
+
+def _finish(rows, changes, history, notifications):
+    """Écritures communes : historique, rollup, notifications, invalidation des caches"""
+    from notifications.models import Notification
+
+    ComplaintHistory.objects.bulk_create(history)
+    record_state_changes(changes)
+    Notification.objects.bulk_create(notifications)
+
+    for tenant_id in {row['tenant_id'] for row in rows}:
+        transaction.on_commit(lambda tenant_id=tenant_id: bump_data_version(tenant_id))
+
+
+def bulk_assign(queryset, ids, agent, user):
+    """
+    Assigne les plaintes à `agent` (statut ASSIGNED), comme l'action assign,
+    pour toutes les plaintes de `queryset` parmi `ids`
+    """
+    ids = list(dict.fromkeys(ids))
+
+    with transaction.atomic():
+        rows = _lock(queryset, ids)
+        # Après le verrou : updated_at ne précède pas l'attente des verrous
+        now = timezone.now()
+        outcome = {row['id']: 'unchanged' for row in rows}
+        changed = [
+            row for row in rows
+            if row['assigned_user_id'] != agent.id or row['status'] != 'ASSIGNED'
+        ]
+        if not changed:
+            return _summary(ids, outcome)
+
+        Complaint.objects.filter(id__in=[row['id'] for row in changed]).update(
+            assigned_user=agent, status='ASSIGNED', updated_at=now
+        )
+
+        history = [
+            ComplaintHistory(
+                tenant_id=row['tenant_id'],
+                complaint_id=row['id'],
+                complaint_reference=row['reference'],
+                action='REASSIGNED' if row['assigned_user_id'] else 'ASSIGNED',
+                user=user,
+                old_value={'assigned_user_id': str(row['assigned_user_id']) if row['assigned_user_id'] else None},
+                new_value={'assigned_user_id': str(agent.id)},
+                description=f"Assigned to {agent.full_name}"
+            )
+            for row in changed
+        ]
+        changes = [
+            (_state(row), _state(row, assigned_user_id=agent.id, status='ASSIGNED'))
+            for row in changed
+        ]
+
+        # Une seule notification pour l'agent, pour les plaintes qui lui sont nouvellement assignées
+        new_for_agent = [row for row in changed if row['assigned_user_id'] != agent.id]
+        notifications = []
+        if new_for_agent:
+            notifications.append(_notification(
+                new_for_agent,
+                agent.id,
+                "Nouvelle plainte assignée" if len(new_for_agent) == 1 else "Nouvelles plaintes assignées",
+                f"{len(new_for_agent)} plainte(s) vous ont été assignée(s) : {_references(new_for_agent)}",
+                'COMPLAINT_ASSIGNED'
+            ))
+
+        _finish(rows, changes, history, notifications)
+        outcome.update({row['id']: 'updated' for row in changed})
+
+    return _summary(ids, outcome)
+
+
+def bulk_transition(queryset, ids, new_status, user):
+    """
+    Passe les plaintes de `queryset` parmi `ids` au statut `new_status`
+    (closed_at renseigné à la clôture / résolution, comme une mise à jour)
+    """
+    ids = list(dict.fromkeys(ids))
+    closing = new_status in CLOSING_STATUSES
+
+    with transaction.atomic():
+        rows = _lock(queryset, ids)
+        now = timezone.now()
+        outcome = {row['id']: 'unchanged' for row in rows}
+        changed = [row for row in rows if row['status'] != new_status]
+        if not changed:
+            return _summary(ids, outcome)
+
+        updates = {'status': new_status, 'updated_at': now}
+        if closing:
+            updates['closed_at'] = Coalesce('closed_at', Value(now))
+        Complaint.objects.filter(id__in=[row['id'] for row in changed]).update(**updates)
+
+        history = [
+            ComplaintHistory(
+                tenant_id=row['tenant_id'],
+                complaint_id=row['id'],
+                complaint_reference=row['reference'],
+                action='STATUS_CHANGED',
+                user=user,
+                old_value={'status': row['status']},
+                new_value={'status': new_status},
+                description=f"Status changed from {row['status']} to {new_status}"
+            )
+            for row in changed
+        ]
+        changes = [
+            (
+                _state(row),
+                _state(
+                    row,
+                    status=new_status,
+                    closed_at=(row['closed_at'] or now) if closing else row['closed_at']
+                )
+            )
+            for row in changed
+        ]
+
+        # Une notification par agent assigné (hors auteur du changement)
+        by_agent = defaultdict(list)
+        for row in changed:
+            if row['assigned_user_id'] and row['assigned_user_id'] != user.id:
+                by_agent[row['assigned_user_id']].append(row)
+        notifications = [
+            _notification(
+                agent_rows,
+                agent_id,
+                "Plainte mise à jour" if len(agent_rows) == 1 else "Plaintes mises à jour",
+                f"{len(agent_rows)} de vos plaintes sont passées au statut {new_status} : {_references(agent_rows)}",
+                'COMPLAINT_UPDATED'
+            )
+            for agent_id, agent_rows in by_agent.items()
+        ]
+
+        _finish(rows, changes, history, notifications)
+        outcome.update({row['id']: 'updated' for row in changed})
+
+    return _summary(ids, outcome)
@@ -0,0 +1,282 @@
+"""
+Import en masse de plaintes (registres existants) depuis un flux CSV ou NDJSON.
+
+Le flux est lu ligne à ligne et traité par lots de COMPLAINT_IMPORT_CHUNK_SIZE :
+chaque lot est validé, reçoit un bloc de références et ses délais SLA (matrice
+en cache), puis est écrit dans une transaction : bulk_create des plaintes et de
+l'historique, un seul delta pour le rollup journalier. Les lignes invalides
+sont rapportées avec leur numéro de ligne et ignorées ; un lot rejeté à
+l'écriture (IntegrityError) est annulé et rapporté, l'import continue.
+"""
+import csv
+import itertools
+import json
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from complaints.models import Complaint, ComplaintHistory
+from complaints.serializers import ComplaintImportRowSerializer
+from complaints.services.dashboard_cache import bump_data_version
+from complaints.services.references import advance_references, parse_reference, reserve_references
+from complaints.services.rollup import record_complaints_created
+from complaints.services.sla import get_sla_policy
+
+FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/jsonlines': 'ndjson',
+}
+
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+def detect_format(filename=None, content_type=None):
+    """Format d'après l'extension du fichier ou le Content-Type (None si inconnu)"""
+    if filename:
+        for extension, file_format in EXTENSIONS.items():
+            if filename.lower().endswith(extension):
+                return file_format
+    if content_type:
+        return CONTENT_TYPES.get(content_type.split(';')[0].strip().lower())
+    return None
+
+
+def _lines(stream):
+    """Lignes décodées d'un flux binaire (requête, fichier), lues une à une"""
+    for raw in iter(stream.readline, b''):
+        yield raw.decode('utf-8-sig')
+
+
+def iter_records(stream, file_format):
+    """
+    (ligne, enregistrement, erreur) pour chaque ligne de données du flux,
+    sans le charger en mémoire. Les numéros de ligne sont ceux du fichier.
+    """
+    lines = _lines(stream)
+
+    if file_format == 'ndjson':
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, None, {'non_field_errors': [f"Invalid JSON: {e}"]}
+                continue
+            if not isinstance(record, dict):
+                yield number, None, {'non_field_errors': ["Expected a JSON object"]}
+                continue
+            yield number, record, None
+        return
+
+    # CSV : séparateur ',' ou ';' (exports Excel), d'après l'en-tête
+    header = next(lines, '')
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    reader = csv.DictReader(itertools.chain([header], lines), delimiter=delimiter)
+    for record in reader:
+        yield reader.line_num, record, None
+
+
+def _clean(record):
+    """Clés normalisées ; les cellules vides prennent la valeur par défaut du champ"""
+    cleaned = {}
+    for key, value in record.items():
+        if not isinstance(key, str):
+            continue  # colonnes en trop d'une ligne CSV
+        if isinstance(value, str):
+            value = value.strip()
+        if value in ('', None):
+            continue
+        cleaned[key.strip().lower()] = value
+    return cleaned
+
+
+def _lookup_tables(tenant):
+    """Catégories et sous-catégories du tenant, par id et par nom"""
+    from categories.models import Category, SubCategory
+
+    categories = {}
+    for category in Category.objects.filter(tenant=tenant):
+        categories[str(category.id)] = category
+        categories[category.name.casefold()] = category
+
+    subcategories = {}
+    for subcategory in SubCategory.objects.filter(tenant=tenant).select_related('category'):
+        subcategories[str(subcategory.id)] = subcategory
+        subcategories[(subcategory.category_id, subcategory.name.casefold())] = subcategory
+
+    return {'categories': categories, 'subcategories': subcategories}
+
+
+class ImportReport:
+    """Compteurs et erreurs par ligne (les premières COMPLAINT_IMPORT_MAX_ERRORS)"""
+
+    def __init__(self, dry_run=False):
+        self.rows = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.errors_truncated = False
+        self.aborted = None
+        self.dry_run = dry_run
+        self.started = time.monotonic()
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < settings.COMPLAINT_IMPORT_MAX_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+        else:
+            self.errors_truncated = True
+
+    def as_dict(self):
+        duration = time.monotonic() - self.started
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'failed': self.failed,
+            'dry_run': self.dry_run,
+            'aborted': self.aborted,
+            'duration_ms': round(duration * 1000),
+            'rows_per_second': round(self.rows / duration) if duration else None,
+            'errors': self.errors,
+            'errors_truncated': self.errors_truncated,
+        }
+
+
+def _validate_chunk(chunk, validator, seen_references, report):
+    """Lignes valides du lot : [(ligne, données validées)]"""
+    valid = []
+    for line, record, error in chunk:
+        if error:
+            report.add_error(line, error)
+            continue
+        try:
+            valid.append((line, validator.run_validation(_clean(record))))
+        except ValidationError as e:
+            report.add_error(line, as_serializer_error(e))
+
+    # Références fournies (registre d'origine) : uniques dans le fichier et en base
+    provided = [data['reference'] for _, data in valid if data.get('reference')]
+    taken = set(Complaint.objects.filter(reference__in=provided).values_list('reference', flat=True))
+
+    rows = []
+    for line, data in valid:
+        reference = data.get('reference')
+        if reference:
+            if reference in taken or reference in seen_references:
+                report.add_error(line, {'reference': [f"Reference already exists: {reference}"]})
+                continue
+            seen_references.add(reference)
+        rows.append((line, data))
+    return rows
+
+
+def _advance_sequences(tenant, rows):
+    """Compteurs de références portés au-delà des références importées au format du tenant"""
+    highest = {}
+    for _, data in rows:
+        parsed = parse_reference(tenant, data.get('reference'))
+        if parsed:
+            year, number = parsed
+            highest[year] = max(number, highest.get(year, 0))
+    for year, number in highest.items():
+        advance_references(tenant, year, number)
+
+
+def _write_chunk(tenant, rows, user, policy):
+    """Écrit un lot validé en une transaction ; retourne le nombre de plaintes créées"""
+    # Compteurs mis à jour hors de la transaction du lot : leur verrou n'est pas
+    # gardé pendant les écritures (un lot annulé laisse un trou dans la numérotation).
+    # Avancés avant la réservation : le bloc ne recoupe pas les références du lot.
+    _advance_sequences(tenant, rows)
+    references = iter(reserve_references(
+        tenant, sum(1 for _, data in rows if not data.get('reference'))
+    ))
+
+    with transaction.atomic():
+        complaints = []
+        for _, data in rows:
+            complaint = Complaint(tenant=tenant, submitted_by=user, **data)
+            if not complaint.reference:
+                complaint.reference = next(references)
+            # Même règle que Complaint.save : délai SLA si la catégorie est connue
+            if complaint.category_id:
+                complaint.sla_deadline = policy.deadline(
+                    complaint.submitted_at, complaint.category_id, complaint.urgency
+                )
+            complaints.append(complaint)
+
+        Complaint.objects.bulk_create(complaints)
+        ComplaintHistory.objects.bulk_create([
+            ComplaintHistory(
+                tenant=tenant,
+                complaint=complaint,
+                complaint_reference=complaint.reference,
+                action='CREATED',
+                user=user,
+                new_value={
+                    'title': complaint.title,
+                    'status': complaint.status,
+                    'urgency': complaint.urgency
+                },
+                description=f"Complaint imported: {complaint.reference}"
+            )
+            for complaint in complaints
+        ])
+        # bulk_create n'émet pas post_save : agrégats mis à jour en un seul delta
+        record_complaints_created(complaints)
+
+    return len(complaints)
+
+
+def import_complaints(tenant, stream, file_format, user=None, chunk_size=None, dry_run=False):
+    """
+    Importe les plaintes d'un flux binaire CSV / NDJSON pour le tenant.
+    Chaque lot valide est validé (commit) indépendamment ; dry_run valide sans écrire.
+    Retourne le rapport d'import (dict).
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported import format: {file_format}")
+
+    chunk_size = chunk_size or settings.COMPLAINT_IMPORT_CHUNK_SIZE
+    # Un seul sérialiseur pour toutes les lignes : ses champs ne sont construits qu'une fois
+    validator = ComplaintImportRowSerializer(context=_lookup_tables(tenant))
+    policy = get_sla_policy(tenant.id)
+    seen_references = set()
+    report = ImportReport(dry_run=dry_run)
+
+    records = iter_records(stream, file_format)
+    try:
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                break
+            report.rows += len(chunk)
+            rows = _validate_chunk(chunk, validator, seen_references, report)
+            if rows and not dry_run:
+                try:
+                    report.created += _write_chunk(tenant, rows, user, policy)
+                except IntegrityError as e:
+                    # Conflit à l'écriture (référence prise entre-temps) : lot annulé
+                    message = f"Chunk not imported: {str(e).splitlines()[0]}"
+                    for line, _ in rows:
+                        report.add_error(line, {'non_field_errors': [message]})
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Flux illisible : les lots précédents restent importés
+        report.aborted = str(e)
+
+    if report.created:
+        transaction.on_commit(lambda: bump_data_version(tenant.id))
+    return report.as_dict()
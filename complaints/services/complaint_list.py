@@ -0,0 +1,150 @@
+"""
+Chemin rapide de la liste des plaintes : une seule requête .values() (colonnes
+listées et noms joints) et une sérialisation directe des dictionnaires, sans
+instancier de modèles ni passer par les champs DRF.
+
+La sortie est identique à celle de ComplaintListSerializer.
+"""
+from django.utils import timezone
+from rest_framework.settings import api_settings
+
+from complaints.services.aggregates import FINISHED_STATUSES
+
+
+def format_datetime(value):
+    """Même rendu que serializers.DateTimeField (DATETIME_FORMAT du projet)"""
+    if value is None:
+        return None
+    value = timezone.localtime(value)
+    output_format = api_settings.DATETIME_FORMAT
+    if output_format is None or output_format.lower() == 'iso-8601':
+        return value.isoformat()
+    return value.strftime(output_format)
+
+
+def _uuid(value):
+    return str(value) if value is not None else None
+
+
+def _full_name(row, prefix):
+    return f"{row[f'{prefix}__first_name']} {row[f'{prefix}__last_name']}".strip()
+
+
+def _is_overdue(row, now):
+    return bool(
+        row['sla_deadline']
+        and row['status'] not in FINISHED_STATUSES
+        and now > row['sla_deadline']
+    )
+
+
+# Champ de sortie -> (colonnes lues, rendu(row, now)).
+# Un rendu qui retourne SKIP omet le champ (relation absente), comme DRF.
+SKIP = object()
+
+LIST_FIELDS = {
+    'id': (('id',), lambda row, now: _uuid(row['id'])),
+    'reference': (('reference',), lambda row, now: row['reference']),
+    'title': (('title',), lambda row, now: row['title']),
+    'status': (('status',), lambda row, now: row['status']),
+    'urgency': (('urgency',), lambda row, now: row['urgency']),
+    'category': (('category_id',), lambda row, now: _uuid(row['category_id'])),
+    'category_name': (
+        ('category_id', 'category__name'),
+        lambda row, now: SKIP if row['category_id'] is None else row['category__name']
+    ),
+    'assigned_user': (('assigned_user_id',), lambda row, now: _uuid(row['assigned_user_id'])),
+    'assigned_user_name': (
+        ('assigned_user_id', 'assigned_user__first_name', 'assigned_user__last_name'),
+        lambda row, now: SKIP if row['assigned_user_id'] is None else _full_name(row, 'assigned_user')
+    ),
+    'submitted_at': (('submitted_at',), lambda row, now: format_datetime(row['submitted_at'])),
+    'sla_deadline': (('sla_deadline',), lambda row, now: format_datetime(row['sla_deadline'])),
+    'is_overdue': (('sla_deadline', 'status'), _is_overdue),
+    'is_urgent_unhandled': (
+        ('urgency', 'status'),
+        lambda row, now: row['urgency'] == 'HIGH' and row['status'] in ('NEW', 'RECEIVED')
+    ),
+    'location': (('location',), lambda row, now: row['location']),
+}
+
+
+def _related_name(row, relation):
+    if row[f'{relation}_id'] is None:
+        return None
+    return {'id': str(row[f'{relation}_id']), 'name': row[f'{relation}__name']}
+
+
+def _related_user(row, relation):
+    if row[f'{relation}_id'] is None:
+        return None
+    return {
+        'id': str(row[f'{relation}_id']),
+        'full_name': _full_name(row, relation),
+        'email': row[f'{relation}__email'],
+    }
+
+
+# ?expand= : l'identifiant de la relation est remplacé par un objet
+EXPANSIONS = {
+    'category': (
+        ('category_id', 'category__name'),
+        lambda row, now: _related_name(row, 'category')
+    ),
+    'subcategory': (
+        ('subcategory_id', 'subcategory__name'),
+        lambda row, now: _related_name(row, 'subcategory')
+    ),
+    'assigned_user': (
+        ('assigned_user_id', 'assigned_user__first_name', 'assigned_user__last_name', 'assigned_user__email'),
+        lambda row, now: _related_user(row, 'assigned_user')
+    ),
+    'submitted_by': (
+        ('submitted_by_id', 'submitted_by__first_name', 'submitted_by__last_name', 'submitted_by__email'),
+        lambda row, now: _related_user(row, 'submitted_by')
+    ),
+}
+
+
+def _output_fields(fields, expand):
+    fields = list(fields or LIST_FIELDS)
+    return fields + [name for name in expand if name not in fields]
+
+
+def _field_spec(field, expand):
+    return EXPANSIONS[field] if field in expand else LIST_FIELDS[field]
+
+
+def list_columns(fields=None, expand=(), extra=()):
+    """Colonnes à lire pour les champs demandés (+ colonnes supplémentaires, ex. tri)"""
+    columns = []
+    for field in _output_fields(fields, expand):
+        columns.extend(_field_spec(field, expand)[0])
+    columns.extend(extra)
+    return list(dict.fromkeys(columns))
+
+
+def list_values(queryset, fields=None, expand=(), extra=()):
+    """
+    QuerySet de dictionnaires limité aux colonnes nécessaires : seules les
+    relations réellement lues sont jointes (une requête, LEFT JOIN)
+    """
+    return queryset.values(*list_columns(fields, expand, extra))
+
+
+def serialize_rows(rows, fields=None, expand=()):
+    """Sérialise des lignes .values() au format de ComplaintListSerializer"""
+    renderers = [
+        (field, _field_spec(field, expand)[1]) for field in _output_fields(fields, expand)
+    ]
+    now = timezone.now()
+
+    data = []
+    for row in rows:
+        item = {}
+        for field, render in renderers:
+            value = render(row, now)
+            if value is not SKIP:
+                item[field] = value
+        data.append(item)
+    return data
@@ -0,0 +1,128 @@
+"""
+Exécution d'agrégats sur plusieurs schémas tenant en parallèle.
+
+Chaque tenant est traité dans son propre schéma (schema_context), sur un
+thread du pool et donc sur sa propre connexion PostgreSQL. Le temps de
+chaque tenant est borné par un statement_timeout ; les tenants en échec
+ou hors délai sont signalés au lieu de faire échouer tout le calcul.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q, F
+from django.utils import timezone
+from django_tenants.utils import schema_context
+
+from complaints.models import Complaint
+from complaints.services.aggregates import FINISHED_STATUSES, RESOLVED_STATUSES
+from complaints.services.timeseries import get_time_series
+
+logger = logging.getLogger(__name__)
+
+
+def get_tenant_schemas(active_only=True):
+    """Tenants possédant un schéma de données (hors schéma public)"""
+    from tenants.models import Tenant
+
+    tenants = Tenant.objects.exclude(schema_name=settings.PUBLIC_SCHEMA_NAME)
+    if active_only:
+        tenants = tenants.filter(is_active=True)
+    return list(tenants)
+
+
+def _run_in_schema(func, tenant, timeout):
+    try:
+        with schema_context(tenant.schema_name), transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %d' % int(timeout * 1000))
+            return func(tenant)
+    finally:
+        # Les threads du pool ne doivent pas conserver de connexion ouverte
+        connection.close()
+
+
+def run_per_tenant(func, tenants=None, max_workers=None, timeout=None):
+    """
+    Exécute func(tenant) dans le schéma de chaque tenant, en parallèle.
+
+    Retourne {
+        'results': {tenant.id: valeur},
+        'failed': [{'tenant_id', 'tenant_name', 'schema_name', 'error'}],
+        'duration_ms': durée totale,
+    }
+    """
+    tenants = get_tenant_schemas() if tenants is None else list(tenants)
+    max_workers = max_workers or settings.CROSS_TENANT_MAX_WORKERS
+    timeout = timeout or settings.CROSS_TENANT_TIMEOUT
+
+    started = time.monotonic()
+    results = {}
+    failed = []
+
+    if not tenants:
+        return {'results': results, 'failed': failed, 'duration_ms': 0}
+
+    workers = min(max_workers, len(tenants))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cross-tenant')
+    futures = {
+        executor.submit(_run_in_schema, func, tenant, timeout): tenant
+        for tenant in tenants
+    }
+
+    # Délai global : chaque vague de workers dispose de `timeout` secondes
+    waves = -(-len(tenants) // workers)
+    done, not_done = wait(futures, timeout=timeout * waves)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for future, tenant in futures.items():
+        failure = None
+        if future in not_done:
+            failure = 'timeout'
+        elif future.exception() is not None:
+            failure = str(future.exception()).splitlines()[0]
+            logger.warning("Cross-tenant query failed for %s: %s", tenant.schema_name, failure)
+        else:
+            results[tenant.id] = future.result()
+
+        if failure:
+            failed.append({
+                'tenant_id': str(tenant.id),
+                'tenant_name': tenant.name,
+                'schema_name': tenant.schema_name,
+                'error': failure,
+            })
+
+    return {
+        'results': results,
+        'failed': failed,
+        'duration_ms': round((time.monotonic() - started) * 1000),
+    }
+
+
+def get_tenant_metrics(tenant):
+    """Agrégats d'un tenant pour les vues plateforme (à exécuter dans son schéma)"""
+    qs = Complaint.objects.filter(tenant=tenant)
+    now = timezone.now()
+
+    metrics = qs.aggregate(
+        total_complaints=Count('id'),
+        active_complaints=Count('id', filter=~Q(status__in=FINISHED_STATUSES)),
+        resolved=Count('id', filter=Q(status__in=RESOLVED_STATUSES)),
+        sla_met=Count('id', filter=Q(
+            status__in=RESOLVED_STATUSES,
+            closed_at__lte=F('sla_deadline')
+        )),
+        overdue=Count('id', filter=Q(
+            sla_deadline__lt=now,
+            status__in=['NEW', 'RECEIVED', 'ASSIGNED', 'IN_PROGRESS']
+        )),
+    )
+    metrics['monthly_volume'] = [
+        {'month': point['period'].strftime('%Y-%m'), 'count': point['count']}
+        for point in get_time_series(qs, 'submitted_at', 'month', periods=12)
+    ]
+    return metrics
+
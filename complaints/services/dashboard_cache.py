@@ -0,0 +1,106 @@
+"""
+Cache versionné des tableaux de bord, par tenant et par rôle.
+
+Chaque tenant possède un compteur de version incrémenté à chaque écriture
+(plainte, commentaire, historique). Une entrée en cache est fraîche tant que
+sa version est la version courante et qu'elle a moins de DASHBOARD_CACHE_TTL
+secondes. Au-delà, la valeur périmée est servie (jusqu'à
+DASHBOARD_CACHE_MAX_STALE secondes) pendant qu'un seul worker la recalcule
+en arrière-plan (stale-while-revalidate).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django_tenants.utils import schema_context
+
+logger = logging.getLogger(__name__)
+
+PLATFORM = 'platform'
+
+
+def _version_key(tenant_id):
+    return f'dashboard:version:{tenant_id or PLATFORM}'
+
+
+def _entry_key(tenant_id, scope):
+    return f'dashboard:{tenant_id or PLATFORM}:{scope}'
+
+
+def get_data_version(tenant_id):
+    """Version courante des données du tenant (initialisée si absente du cache)"""
+    key = _version_key(tenant_id)
+    version = cache.get(key)
+    if version is None:
+        # Valeur initiale horodatée : évite de retomber sur une ancienne version
+        # si le compteur a été évincé du cache
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(tenant_id):
+    """Invalide les tableaux de bord du tenant et de la plateforme"""
+    for key in {_version_key(tenant_id), _version_key(None)}:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def _compute_and_store(tenant_id, scope, compute):
+    # Version lue AVANT le calcul : une écriture concurrente rendra l'entrée périmée
+    version = get_data_version(tenant_id)
+    value = compute()
+    cache.set(
+        _entry_key(tenant_id, scope),
+        {'value': value, 'version': version, 'computed_at': time.time()},
+        timeout=settings.DASHBOARD_CACHE_MAX_STALE
+    )
+    return value
+
+
+def _schedule_refresh(tenant_id, scope, compute):
+    """Recalcule l'entrée dans un thread, si aucun autre worker ne s'en charge déjà"""
+    lock_key = f'{_entry_key(tenant_id, scope)}:lock'
+    if not cache.add(lock_key, 1, timeout=settings.DASHBOARD_CACHE_LOCK_TIMEOUT):
+        return
+
+    schema_name = connection.schema_name
+
+    def refresh():
+        try:
+            with schema_context(schema_name):
+                _compute_and_store(tenant_id, scope, compute)
+        except Exception:
+            logger.exception("Dashboard cache refresh failed (%s)", scope)
+        finally:
+            cache.delete(lock_key)
+            connection.close()
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def get_or_compute(tenant_id, scope, compute):
+    """
+    Retourne la valeur en cache pour (tenant, scope) ou la calcule via compute().
+    `scope` identifie le contenu (ex. 'role:TENANT_ADMIN' ou 'personal:<user_id>').
+    """
+    if not settings.DASHBOARD_CACHE_ENABLED:
+        return compute()
+
+    entry = cache.get(_entry_key(tenant_id, scope))
+    if entry is None:
+        return _compute_and_store(tenant_id, scope, compute)
+
+    age = time.time() - entry['computed_at']
+    if age > settings.DASHBOARD_CACHE_MAX_STALE:
+        return _compute_and_store(tenant_id, scope, compute)
+
+    if entry['version'] != get_data_version(tenant_id) or age > settings.DASHBOARD_CACHE_TTL:
+        _schedule_refresh(tenant_id, scope, compute)
+
+    return entry['value']
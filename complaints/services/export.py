@@ -0,0 +1,124 @@
+"""
+Export des plaintes en CSV ou NDJSON, diffusé au fil de la lecture.
+
+Les lignes sont lues par lots (.values(), pagination keyset sur l'ordre
+demandé puis l'id) : DISABLE_SERVER_SIDE_CURSORS exclut les curseurs nommés,
+et la mémoire utilisée reste celle d'un lot quel que soit le volume exporté.
+En CSV, les cellules qui commencent comme une formule (=, +, -, @...) sont
+préfixées d'une apostrophe ; le NDJSON garde les valeurs telles quelles.
+"""
+import csv
+import json
+
+from django.utils import timezone
+
+from complaints.pagination import KeysetPagination
+from complaints.services.aggregates import FINISHED_STATUSES, RESOLVED_STATUSES
+from complaints.services.complaint_list import format_datetime
+
+FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Début de cellule lu comme une formule par les tableurs (injection CSV)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_cell(value):
+    """Valeur d'une cellule CSV, préfixée de ' si un tableur la lirait comme une formule"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def sla_outcome(row, now):
+    """met / missed pour une plainte résolue, overdue / on_track sinon"""
+    if row['status'] in RESOLVED_STATUSES:
+        # Même règle que le rollup (sla_met / sla_missed)
+        met = row['closed_at'] and row['sla_deadline'] and row['closed_at'] <= row['sla_deadline']
+        return 'met' if met else 'missed'
+    if row['status'] in FINISHED_STATUSES or not row['sla_deadline']:
+        return None
+    return 'overdue' if now > row['sla_deadline'] else 'on_track'
+
+
+def _user_name(row, prefix):
+    if row[f'{prefix}_id'] is None:
+        return None
+    return f"{row[f'{prefix}__first_name']} {row[f'{prefix}__last_name']}".strip()
+
+
+# Colonne exportée -> (colonnes lues, rendu(row, now))
+EXPORT_COLUMNS = {
+    'id': (('id',), lambda row, now: str(row['id'])),
+    'reference': (('reference',), lambda row, now: row['reference']),
+    'title': (('title',), lambda row, now: row['title']),
+    'description': (('description',), lambda row, now: row['description']),
+    'status': (('status',), lambda row, now: row['status']),
+    'urgency': (('urgency',), lambda row, now: row['urgency']),
+    'category': (('category__name',), lambda row, now: row['category__name']),
+    'subcategory': (('subcategory__name',), lambda row, now: row['subcategory__name']),
+    'assigned_user': (
+        ('assigned_user_id', 'assigned_user__first_name', 'assigned_user__last_name'),
+        lambda row, now: _user_name(row, 'assigned_user')
+    ),
+    'assigned_user_email': (('assigned_user__email',), lambda row, now: row['assigned_user__email']),
+    'location': (('location',), lambda row, now: row['location']),
+    'phone_number': (('phone_number',), lambda row, now: row['phone_number']),
+    'submitted_at': (('submitted_at',), lambda row, now: format_datetime(row['submitted_at'])),
+    'sla_deadline': (('sla_deadline',), lambda row, now: format_datetime(row['sla_deadline'])),
+    'closed_at': (('closed_at',), lambda row, now: format_datetime(row['closed_at'])),
+    'sla_outcome': (('status', 'closed_at', 'sla_deadline'), sla_outcome),
+}
+
+
+def iter_rows(queryset, ordering, chunk_size):
+    """
+    Lignes .values() du queryset dans l'ordre donné (terminé par l'id),
+    lues par lots de chunk_size avec un filtre keyset
+    """
+    keyset = KeysetPagination()
+    columns = [column for spec in EXPORT_COLUMNS.values() for column in spec[0]]
+    columns += [term.lstrip('-') for term in ordering]
+    rows = queryset.order_by(*ordering).values(*dict.fromkeys(columns))
+
+    position = None
+    while True:
+        page = rows if position is None else rows.filter(keyset.keyset_filter(rows, ordering, position))
+        chunk = list(page[:chunk_size])
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        position = [chunk[-1][term.lstrip('-')] for term in ordering]
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : retourne la ligne écrite"""
+
+    def write(self, value):
+        return value
+
+
+def stream_export(queryset, ordering, file_format, chunk_size):
+    """Générateur de texte (un morceau par lot) pour StreamingHttpResponse"""
+    renderers = list(EXPORT_COLUMNS.items())
+
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow([name for name, _ in renderers])
+
+    for chunk in iter_rows(queryset, ordering, chunk_size):
+        now = timezone.now()
+        if file_format == 'csv':
+            yield ''.join(
+                writer.writerow([csv_cell(render(row, now)) for _, (_, render) in renderers])
+                for row in chunk
+            )
+        else:
+            yield ''.join(
+                json.dumps({name: render(row, now) for name, (_, render) in renderers}, ensure_ascii=False) + '\n'
+                for row in chunk
+            )
@@ -0,0 +1,115 @@
+"""
+?fields= / ?expand= : champs retournés et relations développées.
+
+Les champs demandés déterminent les colonnes lues (.only() / .values()), les
+jointures (select_related) et les préchargements (prefetch_related) : un champ
+non demandé ne coûte rien côté base.
+"""
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+from complaints.models import ComplaintAttachment, ComplaintComment
+from complaints.pagination import ComplaintCommentPagination
+
+
+def _split(value):
+    return list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+
+
+def parse_fieldset(request, allowed_fields, expandable):
+    """
+    Retourne (fields, expand) : fields vaut None si ?fields= est absent
+    (tous les champs). Lève ValidationError (400) pour un nom inconnu.
+    """
+    fields = request.query_params.get('fields')
+    expand = request.query_params.get('expand')
+
+    fields = _split(fields) if fields else None
+    expand = _split(expand) if expand else []
+
+    errors = {}
+    unknown_fields = [name for name in fields or [] if name not in allowed_fields]
+    if unknown_fields:
+        errors['fields'] = f"Unknown field(s): {', '.join(unknown_fields)}"
+    unknown_expand = [name for name in expand if name not in expandable]
+    if unknown_expand:
+        errors['expand'] = f"Unknown expansion(s): {', '.join(unknown_expand)}"
+    if errors:
+        raise ValidationError(errors)
+
+    return fields, tuple(expand)
+
+
+# Détail d'une plainte : champ -> (colonnes, jointures, préchargements)
+USER_NAME = ('first_name', 'last_name')
+
+# Derniers commentaires seulement (un de plus pour savoir s'il en reste) :
+# la taille du détail ne dépend pas de la longueur de la conversation
+LATEST_COMMENTS = Prefetch(
+    'comments',
+    queryset=ComplaintComment.objects.select_related('user')
+    .order_by(*ComplaintCommentPagination.ordering)[:settings.COMPLAINT_DETAIL_COMMENTS + 1],
+    to_attr='latest_comments'
+)
+
+DETAIL_FIELDS = {
+    'category_name': (('category__name',), ('category',), ()),
+    'subcategory_name': (('subcategory__name',), ('subcategory',), ()),
+    'submitted_by_name': (tuple(f'submitted_by__{c}' for c in USER_NAME), ('submitted_by',), ()),
+    'assigned_user_name': (tuple(f'assigned_user__{c}' for c in USER_NAME), ('assigned_user',), ()),
+    'is_overdue': (('sla_deadline', 'status'), (), ()),
+    'is_urgent_unhandled': (('urgency', 'status'), (), ()),
+    'resolution_time': (('closed_at', 'submitted_at'), (), ()),
+    'attachments': ((), (), (
+        Prefetch('attachments', queryset=ComplaintAttachment.objects.select_related('uploaded_by')),
+    )),
+    'comments': ((), (), (LATEST_COMMENTS,)),
+    'comments_next': ((), (), (LATEST_COMMENTS,)),
+}
+
+DETAIL_EXPANSIONS = {
+    'category': (('category__name',), ('category',)),
+    'subcategory': (('subcategory__name',), ('subcategory',)),
+    'submitted_by': (tuple(f'submitted_by__{c}' for c in USER_NAME + ('email',)), ('submitted_by',)),
+    'assigned_user': (tuple(f'assigned_user__{c}' for c in USER_NAME + ('email',)), ('assigned_user',)),
+}
+
+
+def shape_detail_queryset(queryset, fields, expand, all_fields):
+    """
+    Restreint la requête du détail aux colonnes, jointures et préchargements
+    nécessaires aux champs demandés (tous si fields est None).
+    """
+    model = queryset.model
+    model_fields = {field.name for field in model._meta.concrete_fields}
+    # id et tenant : clé et contrôle de permission (obj.tenant).
+    # Les champs suivis par le FieldTracker (toutes les colonnes modifiables,
+    # pour les écritures partielles) ne peuvent pas être différés : model_utils
+    # recharge alors l'instance en boucle. Restent différés les colonnes
+    # générées, updated_at et les jointures / préchargements non demandés.
+    columns = ['id', 'tenant'] + sorted(model.tracker.fields)
+    joins = []
+    prefetches = []
+
+    for name in (fields if fields is not None else all_fields):
+        if name in model_fields:
+            columns.append(name)
+        elif name in DETAIL_FIELDS:
+            field_columns, field_joins, field_prefetches = DETAIL_FIELDS[name]
+            columns.extend(field_columns)
+            joins.extend(field_joins)
+            prefetches.extend(field_prefetches)
+
+    for name in expand:
+        expand_columns, expand_joins = DETAIL_EXPANSIONS[name]
+        columns.append(name)
+        columns.extend(expand_columns)
+        joins.extend(expand_joins)
+
+    queryset = queryset.only(*dict.fromkeys(columns))
+    if joins:
+        queryset = queryset.select_related(*dict.fromkeys(joins))
+    if prefetches:
+        queryset = queryset.prefetch_related(*dict.fromkeys(prefetches))
+    return queryset
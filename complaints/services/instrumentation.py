@@ -0,0 +1,113 @@
+"""
+Instrumentation des sections de statistiques : durée, nombre de requêtes SQL
+et lignes lues par section.
+
+Les mesures passent par connection.execute_wrapper et ne dépendent donc pas de
+DEBUG. Une section qui dépasse STATS_SECTION_BUDGET_MS est journalisée ; le
+détail peut être collecté pour une requête via collect_timings().
+"""
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def _state():
+    if not hasattr(_local, 'path'):
+        _local.path = []
+        _local.timings = None
+    return _local
+
+
+class QueryCounter:
+    """execute_wrapper qui compte les requêtes et les lignes retournées"""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        rowcount = getattr(context['cursor'], 'rowcount', -1)
+        if rowcount and rowcount > 0:
+            self.rows += rowcount
+        return result
+
+
+@contextmanager
+def profile_section(name):
+    """Mesure le bloc comme une section (imbriquable : 'parent.enfant')"""
+    if not settings.STATS_INSTRUMENTATION_ENABLED:
+        yield
+        return
+
+    state = _state()
+    state.path.append(name)
+    path = '.'.join(state.path)
+    counter = QueryCounter()
+    started = time.monotonic()
+
+    try:
+        with connection.execute_wrapper(counter):
+            yield
+    finally:
+        state.path.pop()
+        duration_ms = round((time.monotonic() - started) * 1000, 1)
+        timing = {
+            'section': path,
+            'duration_ms': duration_ms,
+            'queries': counter.queries,
+            'rows': counter.rows,
+        }
+        if state.timings is not None:
+            state.timings.append(timing)
+        if duration_ms > settings.STATS_SECTION_BUDGET_MS:
+            logger.warning(
+                "Statistics section %s over budget: %sms, %d queries, %d rows",
+                path, duration_ms, counter.queries, counter.rows
+            )
+
+
+@contextmanager
+def collect_timings():
+    """Collecte les mesures des sections exécutées dans le bloc (thread courant)"""
+    state = _state()
+    previous = state.timings
+    state.timings = timings = []
+    try:
+        yield timings
+    finally:
+        state.timings = previous
+
+
+def _section_name(method_name):
+    for prefix in ('_get_', 'get_'):
+        if method_name.startswith(prefix):
+            return method_name[len(prefix):]
+    return method_name
+
+
+def instrument_sections(cls):
+    """Décorateur de classe : mesure chaque méthode get_* / _get_* comme une section"""
+    for attr_name, method in list(vars(cls).items()):
+        if not callable(method) or not attr_name.startswith(('get_', '_get_')):
+            continue
+
+        def wrap(method, name):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                with profile_section(name):
+                    return method(*args, **kwargs)
+            return wrapper
+
+        setattr(cls, attr_name, wrap(method, _section_name(attr_name)))
+    return cls
@@ -0,0 +1,126 @@
+"""
+Snapshots des métriques de chaque tenant (TenantMetricsSnapshot, schéma public).
+
+Les vues plateforme lisent uniquement ces snapshots (une requête indexée,
+quel que soit le nombre de tenants) ; ils sont rafraîchis tenant par tenant
+par `manage.py refresh_tenant_metrics`.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from complaints.services.cross_tenant import get_tenant_metrics, run_per_tenant
+from complaints.services.dashboard_cache import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+
+def _collect_metrics(tenant):
+    started = time.monotonic()
+    metrics = get_tenant_metrics(tenant)
+    metrics['refreshed_at'] = timezone.now()
+    metrics['refresh_duration_ms'] = round((time.monotonic() - started) * 1000)
+    return metrics
+
+
+def refresh_tenant_snapshots(tenants, max_workers=1, timeout=None):
+    """
+    Recalcule les snapshots des tenants donnés (séquentiellement par défaut).
+    Un tenant en échec conserve son dernier snapshot et l'erreur est enregistrée.
+    Retourne le résultat de run_per_tenant.
+    """
+    from tenants.models import TenantMetricsSnapshot
+
+    tenants = list(tenants)
+    fanout = run_per_tenant(_collect_metrics, tenants, max_workers=max_workers, timeout=timeout)
+    errors = {failure['tenant_id']: failure['error'] for failure in fanout['failed']}
+
+    for tenant in tenants:
+        metrics = fanout['results'].get(tenant.id)
+        if metrics is None:
+            TenantMetricsSnapshot.objects.update_or_create(
+                tenant=tenant,
+                defaults={'last_error': errors.get(str(tenant.id), 'unknown error')}
+            )
+            continue
+
+        resolved = metrics['resolved']
+        TenantMetricsSnapshot.objects.update_or_create(
+            tenant=tenant,
+            defaults={
+                'total_complaints': metrics['total_complaints'],
+                'active_complaints': metrics['active_complaints'],
+                'resolved_complaints': resolved,
+                'sla_met': metrics['sla_met'],
+                'overdue': metrics['overdue'],
+                'sla_compliance_rate': round((metrics['sla_met'] / resolved) * 100, 1) if resolved else 0,
+                'monthly_volume': metrics['monthly_volume'],
+                'refreshed_at': metrics['refreshed_at'],
+                'refresh_duration_ms': metrics['refresh_duration_ms'],
+                'last_error': '',
+            }
+        )
+
+    # Les tableaux de bord plateforme en cache sont désormais périmés
+    bump_data_version(None)
+    return fanout
+
+
+def get_platform_snapshots(active_only=True):
+    """
+    Tenants (hors schéma public) et leur snapshot, en une seule requête
+    (LEFT JOIN), triés par nombre de plaintes décroissant.
+    Retourne (snapshots, missing) : missing liste les tenants jamais rafraîchis.
+    """
+    from tenants.models import Tenant
+
+    tenants = (
+        Tenant.objects.exclude(schema_name=settings.PUBLIC_SCHEMA_NAME)
+        .select_related('metrics_snapshot')
+        .order_by(F('metrics_snapshot__total_complaints').desc(nulls_last=True), 'name')
+    )
+    if active_only:
+        tenants = tenants.filter(is_active=True)
+
+    snapshots = []
+    missing = []
+    for tenant in tenants:
+        snapshot = getattr(tenant, 'metrics_snapshot', None)
+        if snapshot is None or snapshot.refreshed_at is None:
+            missing.append(tenant)
+        else:
+            snapshots.append(snapshot)
+    return snapshots, missing
+
+
+def snapshot_freshness(snapshots, missing):
+    """Fraîcheur des snapshots lus : dates extrêmes, tenants manquants ou en échec"""
+    refreshed = [snapshot.refreshed_at for snapshot in snapshots]
+    return {
+        'oldest_refresh': min(refreshed) if refreshed else None,
+        'latest_refresh': max(refreshed) if refreshed else None,
+        'missing_tenants': [
+            {'tenant_id': str(tenant.id), 'tenant_name': tenant.name}
+            for tenant in missing
+        ],
+        'failed_tenants': [
+            {
+                'tenant_id': str(snapshot.tenant_id),
+                'tenant_name': snapshot.tenant.name,
+                'error': snapshot.last_error,
+            }
+            for snapshot in snapshots if snapshot.last_error
+        ],
+    }
+
+
+def merge_snapshot_volume(snapshots, months=12):
+    """Volume mensuel plateforme : somme des volumes des snapshots (derniers mois)"""
+    totals = {}
+    for snapshot in snapshots:
+        for point in snapshot.monthly_volume:
+            totals[point['month']] = totals.get(point['month'], 0) + point['count']
+    return [{'month': month, 'count': totals[month]} for month in sorted(totals)[-months:]]
@@ -0,0 +1,124 @@
+"""
+Attribution des références de plaintes (<SCHEMA>-<ANNÉE>-<NUMÉRO>).
+
+Un compteur par tenant et par année (ReferenceSequence) est incrémenté par une
+seule requête UPDATE ... RETURNING : l'attribution est O(1) et deux écritures
+concurrentes ne peuvent pas obtenir le même numéro. Un bloc de numéros peut
+être réservé d'un coup pour les insertions en masse ; les références importées
+au même format font avancer le compteur (advance_references).
+"""
+import re
+
+from django.db import connection
+from django.db.models import IntegerField, Max
+from django.db.models.functions import Cast, Substr
+from django.utils import timezone
+
+from complaints.models import Complaint, ReferenceSequence
+
+
+def reference_prefix(tenant, year):
+    return f"{tenant.schema_name.upper()}-{year}-"
+
+
+def format_reference(tenant, year, number):
+    return f"{reference_prefix(tenant, year)}{number:05d}"
+
+
+def parse_reference(tenant, reference):
+    """(année, numéro) d'une référence au format du tenant, None sinon"""
+    match = re.fullmatch(rf'{re.escape(tenant.schema_name.upper())}-([0-9]{{4}})-([0-9]+)', reference or '')
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def _current_year(tenant):
+    return timezone.localdate(timezone=tenant.get_timezone()).year
+
+
+def _highest_existing_number(tenant, year):
+    """Plus grand numéro déjà utilisé pour (tenant, année) : amorce du compteur"""
+    prefix = reference_prefix(tenant, year)
+    return Complaint.objects.filter(
+        tenant=tenant,
+        reference__regex=rf'^{prefix}[0-9]+$'
+    ).aggregate(
+        highest=Max(Cast(Substr('reference', len(prefix) + 1), IntegerField()))
+    )['highest'] or 0
+
+
+def _allocate(tenant, year, count):
+    """Réserve `count` numéros et retourne le dernier"""
+    table = connection.ops.quote_name(ReferenceSequence._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET last_value = last_value + %s '
+            f'WHERE tenant_id = %s AND year = %s RETURNING last_value',
+            [count, tenant.id, year]
+        )
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+
+        # Premier numéro de l'année : compteur amorcé après les références existantes
+        cursor.execute(
+            f'INSERT INTO {table} (id, tenant_id, year, last_value) VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT ON CONSTRAINT reference_sequence_unique_tenant_year '
+            f'DO UPDATE SET last_value = {table}.last_value + %s '
+            f'RETURNING last_value',
+            [
+                ReferenceSequence._meta.pk.get_default(), tenant.id, year,
+                _highest_existing_number(tenant, year) + count, count,
+            ]
+        )
+        return cursor.fetchone()[0]
+
+
+def advance_references(tenant, year, number):
+    """
+    Porte le compteur de (tenant, année) à au moins `number` : les références
+    importées au format du tenant ne seront pas réattribuées.
+    """
+    table = connection.ops.quote_name(ReferenceSequence._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET last_value = GREATEST(last_value, %s) '
+            f'WHERE tenant_id = %s AND year = %s RETURNING last_value',
+            [number, tenant.id, year]
+        )
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+
+        cursor.execute(
+            f'INSERT INTO {table} (id, tenant_id, year, last_value) VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT ON CONSTRAINT reference_sequence_unique_tenant_year '
+            f'DO UPDATE SET last_value = GREATEST({table}.last_value, EXCLUDED.last_value) '
+            f'RETURNING last_value',
+            [
+                ReferenceSequence._meta.pk.get_default(), tenant.id, year,
+                max(number, _highest_existing_number(tenant, year)),
+            ]
+        )
+        return cursor.fetchone()[0]
+
+
+def reserve_references(tenant, count=1, year=None):
+    """
+    Réserve un bloc de `count` références consécutives pour le tenant.
+    Les numéros réservés mais inutilisés (rollback) laissent des trous.
+    """
+    if count < 1:
+        return []
+
+    year = year or _current_year(tenant)
+    last = _allocate(tenant, year, count)
+    return [format_reference(tenant, year, number) for number in range(last - count + 1, last + 1)]
+
+
+def next_reference(tenant):
+    """Référence suivante du tenant pour l'année en cours"""
+    return reserve_references(tenant, 1)[0]
@@ -1,21 +1,40 @@
 """
 Service pour gérer les statistiques selon le rôle de l'utilisateur
 """
-from django.db.models import Count, Q, Avg, F, ExpressionWrapper, fields
+from django.conf import settings
+from django.db.models import Count, Q, Avg, Sum, F, ExpressionWrapper, fields
 from django.utils import timezone
 from datetime import timedelta, datetime
-from complaints.models import Complaint, SLAConfig, ComplaintHistory
+from complaints.models import Complaint, SLAConfig, ComplaintHistory, ComplaintDailyStats
 from users.models import CustomUser
+from complaints.services.aggregates import (
+    get_agent_metrics, get_resolution_time_stats, resolution_seconds,
+    seconds_to_hours, EMPTY_AGENT_METRICS
+)
+from complaints.services.timeseries import get_time_series
+from complaints.services.dashboard_cache import get_or_compute
+from complaints.services.instrumentation import instrument_sections
+from complaints.services.platform_snapshot import (
+    get_platform_snapshots, snapshot_freshness, merge_snapshot_volume
+)
 
 
+@instrument_sections
 class RoleBasedStatisticsService:
     """Service pour calculer les statistiques adaptées au rôle"""
     
+    # Rôles dont les stats ne dépendent pas de l'utilisateur connecté
+    SHARED_ROLES = ('SUPER_ADMIN', 'TENANT_ADMIN', 'AUDITOR')
+    
     def __init__(self, user, tenant=None):
         self.user = user
         self.tenant = tenant or user.tenant
         self.role = user.role
     
+    def _daily_stats(self):
+        """Agrégats journaliers du tenant (ComplaintDailyStats)"""
+        return ComplaintDailyStats.objects.filter(tenant=self.tenant)
+    
     def get_dashboard_stats(self):
         """Point d'entrée principal - retourne les stats selon le rôle"""
         
@@ -28,6 +47,13 @@ class RoleBasedStatisticsService:
         }
         
         method = role_methods.get(self.role, self.get_agent_stats)
+        
+        # Les vues tenant/plateforme sont partagées par rôle ; les autres sont personnelles
+        if self.role in self.SHARED_ROLES:
+            scope = f'role:{self.role}'
+        else:
+            scope = f'role:{self.role}:{self.user.id}'
+        
         return {
             'role': self.role,
             'user': {
@@ -35,7 +61,7 @@ class RoleBasedStatisticsService:
                 'name': self.user.full_name,
                 'email': self.user.email,
             },
-            'stats': method(),
+            'stats': get_or_compute(self.tenant.id if self.tenant else None, scope, method),
             'timestamp': timezone.now().isoformat(),
         }
     
@@ -43,66 +69,40 @@ class RoleBasedStatisticsService:
     # SUPER_ADMIN - Vue Plateforme Globale
     # ============================================================
     def get_super_admin_stats(self):
-        """Statistiques pour SUPER_ADMIN - Vue multi-tenants"""
-        from tenants.models import Tenant
-        
-        all_complaints = Complaint.objects.all()
-        total_complaints = all_complaints.count()
-        
-        # Stats par tenant
-        active_tenants = Tenant.objects.filter(is_active=True)
-        tenant_stats = []
-        
-        for tenant in active_tenants:
-            tenant_complaints = all_complaints.filter(tenant=tenant)
-            resolved = tenant_complaints.filter(status__in=['RESOLVED', 'CLOSED'])
-            
-            sla_met = 0
-            if resolved.exists():
-                sla_met = resolved.filter(closed_at__lte=F('sla_deadline')).count()
-            
-            tenant_stats.append({
-                'tenant_id': str(tenant.id),
-                'tenant_name': tenant.name,
-                'schema_name': tenant.schema_name,
-                'total_complaints': tenant_complaints.count(),
-                'active_complaints': tenant_complaints.exclude(
-                    status__in=['RESOLVED', 'CLOSED', 'ARCHIVED']
-                ).count(),
-                'sla_compliance_rate': round((sla_met / resolved.count()) * 100, 1) if resolved.exists() else 0,
-                'overdue': tenant_complaints.filter(
-                    sla_deadline__lt=timezone.now(),
-                    status__in=['NEW', 'RECEIVED', 'ASSIGNED', 'IN_PROGRESS']
-                ).count(),
-                'is_premium': tenant.is_premium,
-            })
-        
-        # Trier par nombre de plaintes
-        tenant_stats.sort(key=lambda x: x['total_complaints'], reverse=True)
+        """Statistiques pour SUPER_ADMIN - Vue multi-tenants (lue dans les snapshots)"""
+        snapshots, missing = get_platform_snapshots()
         
-        # Volume mensuel (12 mois)
-        monthly_volume = self._get_monthly_volume(all_complaints)
+        # Stats par tenant (déjà triées par nombre de plaintes)
+        tenant_stats = [
+            {
+                'tenant_id': str(snapshot.tenant_id),
+                'tenant_name': snapshot.tenant.name,
+                'schema_name': snapshot.tenant.schema_name,
+                'total_complaints': snapshot.total_complaints,
+                'active_complaints': snapshot.active_complaints,
+                'sla_compliance_rate': snapshot.sla_compliance_rate,
+                'overdue': snapshot.overdue,
+                'is_premium': snapshot.tenant.is_premium,
+                'refreshed_at': snapshot.refreshed_at,
+            }
+            for snapshot in snapshots
+        ]
         
         # SLA global
-        all_resolved = all_complaints.filter(status__in=['RESOLVED', 'CLOSED'])
-        total_resolved = all_resolved.count()
-        global_sla_met = 0
-        
-        if total_resolved > 0:
-            global_sla_met = all_resolved.filter(closed_at__lte=F('sla_deadline')).count()
+        total_resolved = sum(s.resolved_complaints for s in snapshots)
+        global_sla_met = sum(s.sla_met for s in snapshots)
         
         return {
             'platform_overview': {
-                'total_tenants': active_tenants.count(),
-                'total_complaints': total_complaints,
-                'total_active_complaints': all_complaints.exclude(
-                    status__in=['RESOLVED', 'CLOSED', 'ARCHIVED']
-                ).count(),
+                'total_tenants': len(snapshots) + len(missing),
+                'total_complaints': sum(s.total_complaints for s in snapshots),
+                'total_active_complaints': sum(s.active_complaints for s in snapshots),
                 'global_sla_compliance': round((global_sla_met / total_resolved) * 100, 1) if total_resolved > 0 else 0,
             },
             'tenant_stats': tenant_stats[:10],  # Top 10
-            'monthly_volume': monthly_volume,
+            'monthly_volume': merge_snapshot_volume(snapshots),
             'alerts': self._get_platform_alerts(tenant_stats),
+            'metrics_freshness': snapshot_freshness(snapshots, missing),
         }
     
     # ============================================================
@@ -111,6 +111,7 @@ class RoleBasedStatisticsService:
     def get_tenant_admin_stats(self):
         """Statistiques pour TENANT_ADMIN - Vue complète"""
         base_qs = Complaint.objects.filter(tenant=self.tenant)
+        stats_qs = self._daily_stats()
         
         # Vue d'ensemble
         overview = self._get_tenant_overview(base_qs)
@@ -118,12 +119,12 @@ class RoleBasedStatisticsService:
         # Performance d'équipe
         team_performance = self._get_team_performance()
         
-        # Tendances
+        # Tendances (lues dans le rollup journalier)
         trends = {
-            'weekly': self._get_weekly_trend(base_qs),
-            'urgency_distribution': self._get_urgency_distribution(base_qs),
-            'status_distribution': self._get_status_distribution(base_qs),
-            'category_stats': self._get_category_stats(base_qs),
+            'weekly': self._get_weekly_trend(stats_qs),
+            'urgency_distribution': self._get_urgency_distribution(stats_qs),
+            'status_distribution': self._get_status_distribution(stats_qs),
+            'category_stats': self._get_category_stats(stats_qs),
         }
         
         # Alertes
@@ -134,7 +135,7 @@ class RoleBasedStatisticsService:
             'team_performance': team_performance,
             'trends': trends,
             'alerts': alerts,
-            'sla_performance': self._get_sla_performance(base_qs),
+            'sla_performance': self._get_sla_performance(stats_qs),
         }
     
     # ============================================================
@@ -248,7 +249,9 @@ class RoleBasedStatisticsService:
             'personal_performance': personal_perf,
             'workload_by_status': workload_by_status,
             'upcoming_deadlines': upcoming_deadlines,
-            'weekly_trend': self._get_weekly_trend(my_complaints),
+            'weekly_trend': self._get_weekly_trend(
+                self._daily_stats().filter(assigned_user=self.user)
+            ),
             'quick_actions': {
                 'urgent_tasks': list(
                     urgent.values('id', 'reference', 'title', 'sla_deadline')[:5]
@@ -293,7 +296,7 @@ class RoleBasedStatisticsService:
             'compliance_indicators': compliance,
             'quality_analysis': quality,
             'audit_trail': audit_trail,
-            'sla_performance': self._get_sla_performance(base_qs),
+            'sla_performance': self._get_sla_performance(self._daily_stats()),
             'agent_performance': self._get_team_performance(),
         }
     
@@ -302,64 +305,51 @@ class RoleBasedStatisticsService:
     # ============================================================
     
     def _get_tenant_overview(self, qs):
-        """Vue d'ensemble tenant"""
+        """Vue d'ensemble tenant (une seule requête agrégée)"""
         now = timezone.now()
         today = now.date()
         week_start = now - timedelta(days=7)
         
-        return {
-            'total_complaints': qs.count(),
-            'today': qs.filter(submitted_at__date=today).count(),
-            'this_week': qs.filter(submitted_at__gte=week_start).count(),
-            'urgent_unhandled': qs.filter(
+        return qs.aggregate(
+            total_complaints=Count('id'),
+            today=Count('id', filter=Q(submitted_at__date=today)),
+            this_week=Count('id', filter=Q(submitted_at__gte=week_start)),
+            urgent_unhandled=Count('id', filter=Q(
                 urgency='HIGH',
                 status__in=['NEW', 'RECEIVED']
-            ).count(),
-            'unassigned': qs.filter(assigned_user__isnull=True).count(),
-            'overdue': qs.filter(
+            )),
+            unassigned=Count('id', filter=Q(assigned_user__isnull=True)),
+            overdue=Count('id', filter=Q(
                 sla_deadline__lt=now,
                 status__in=['NEW', 'RECEIVED', 'ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
-            ).count(),
-        }
+            )),
+        )
     
     def _get_team_performance(self):
-        """Performance de l'équipe"""
+        """Performance de l'équipe (une requête groupée + la liste des agents)"""
         agents = CustomUser.objects.filter(
             tenant=self.tenant,
             role__in=['AGENT', 'TENANT_ADMIN'],
             is_active=True
         )
         
+        metrics = get_agent_metrics(
+            Complaint.objects.filter(tenant=self.tenant)
+        )
+        
         team_data = []
         for agent in agents:
-            assigned = Complaint.objects.filter(
-                tenant=self.tenant,
-                assigned_user=agent
-            )
-            
-            active = assigned.exclude(status__in=['RESOLVED', 'CLOSED', 'ARCHIVED'])
-            resolved = assigned.filter(status__in=['RESOLVED', 'CLOSED'])
-            
-            # SLA compliance
-            sla_met = 0
-            if resolved.exists():
-                sla_met = resolved.filter(closed_at__lte=F('sla_deadline')).count()
-            
-            # Temps moyen de résolution
-            avg_time = None
-            if resolved.exists():
-                times = [c.resolution_time for c in resolved if c.resolution_time]
-                if times:
-                    avg_time = round(sum(times) / len(times), 1)
+            agent_metrics = metrics.get(agent.id, EMPTY_AGENT_METRICS)
+            resolved = agent_metrics['resolved']
             
             team_data.append({
                 'agent_id': str(agent.id),
                 'agent_name': agent.full_name,
-                'active_complaints': active.count(),
-                'resolved_complaints': resolved.count(),
-                'sla_compliance_rate': round((sla_met / resolved.count()) * 100, 1) if resolved.exists() else 0,
-                'avg_resolution_time_hours': avg_time,
-                'overdue': active.filter(sla_deadline__lt=timezone.now()).count(),
+                'active_complaints': agent_metrics['open'],
+                'resolved_complaints': resolved,
+                'sla_compliance_rate': round((agent_metrics['sla_met'] / resolved) * 100, 1) if resolved else 0,
+                'avg_resolution_time_hours': seconds_to_hours(agent_metrics['avg_resolution_seconds']),
+                'overdue': agent_metrics['open_overdue'],
             })
         
         return sorted(team_data, key=lambda x: x['active_complaints'], reverse=True)
@@ -372,13 +362,13 @@ class RoleBasedStatisticsService:
             is_active=True
         )
         
+        metrics = get_agent_metrics(
+            Complaint.objects.filter(tenant=self.tenant)
+        )
+        
         availability = []
         for agent in agents:
-            active_count = Complaint.objects.filter(
-                tenant=self.tenant,
-                assigned_user=agent,
-                status__in=['ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
-            ).count()
+            active_count = metrics.get(agent.id, EMPTY_AGENT_METRICS)['in_progress']
             
             # Déterminer la disponibilité
             if active_count == 0:
@@ -403,18 +393,21 @@ class RoleBasedStatisticsService:
         """Performance personnelle d'un agent"""
         resolved = qs.filter(status__in=['RESOLVED', 'CLOSED'])
         
+        counts = resolved.aggregate(
+            total=Count('id'),
+            sla_met=Count('id', filter=Q(closed_at__lte=F('sla_deadline'))),
+            avg_resolution_seconds=Avg(
+                resolution_seconds(),
+                filter=Q(closed_at__isnull=False)
+            ),
+        )
+        
         # Temps moyen de résolution
-        avg_time = None
-        if resolved.exists():
-            times = [c.resolution_time for c in resolved if c.resolution_time]
-            if times:
-                avg_time = round(sum(times) / len(times), 1)
+        avg_time = seconds_to_hours(counts['avg_resolution_seconds'])
         
         # Taux SLA
-        sla_met = 0
-        if resolved.exists():
-            sla_met = resolved.filter(closed_at__lte=F('sla_deadline')).count()
-            sla_rate = round((sla_met / resolved.count()) * 100, 1)
+        if counts['total'] > 0:
+            sla_rate = round((counts['sla_met'] / counts['total']) * 100, 1)
         else:
             sla_rate = 0
         
@@ -424,7 +417,7 @@ class RoleBasedStatisticsService:
         return {
             'avg_resolution_time_hours': avg_time,
             'sla_compliance_rate': sla_rate,
-            'total_resolved': resolved.count(),
+            'total_resolved': counts['total'],
             'comparison_with_team': {
                 'team_avg_time': team_avg,
                 'better_than_average': avg_time < team_avg if avg_time and team_avg else None,
@@ -433,13 +426,13 @@ class RoleBasedStatisticsService:
     
     def _get_team_average_resolution_time(self):
         """Temps moyen de résolution de l'équipe"""
-        resolved = Complaint.objects.filter(
+        avg_seconds = Complaint.objects.filter(
             tenant=self.tenant,
-            status__in=['RESOLVED', 'CLOSED']
-        )
+            status__in=['RESOLVED', 'CLOSED'],
+            closed_at__isnull=False
+        ).aggregate(avg=Avg(resolution_seconds()))['avg']
         
-        times = [c.resolution_time for c in resolved if c.resolution_time]
-        return round(sum(times) / len(times), 1) if times else None
+        return seconds_to_hours(avg_seconds)
     
     def _get_compliance_indicators(self, qs):
         """Indicateurs de conformité"""
@@ -461,25 +454,17 @@ class RoleBasedStatisticsService:
     
     def _get_quality_analysis(self, qs):
         """Analyse qualité"""
-        resolved = qs.filter(status__in=['RESOLVED', 'CLOSED'])
-        
-        # Distribution des temps
-        if resolved.exists():
-            times = [c.resolution_time for c in resolved if c.resolution_time]
-            if times:
-                avg_time = sum(times) / len(times)
-                min_time = min(times)
-                max_time = max(times)
-            else:
-                avg_time = min_time = max_time = None
-        else:
-            avg_time = min_time = max_time = None
+        # Distribution des temps (calculée dans PostgreSQL)
+        resolution = get_resolution_time_stats(qs)
         
         return {
             'resolution_time_distribution': {
-                'average': round(avg_time, 1) if avg_time else None,
-                'min': round(min_time, 1) if min_time else None,
-                'max': round(max_time, 1) if max_time else None,
+                'average': resolution['average'],
+                'min': resolution['min'],
+                'max': resolution['max'],
+                'p50': resolution['p50'],
+                'p90': resolution['p90'],
+                'p99': resolution['p99'],
             },
             'reopened_complaints': 0,  # À implémenter si nécessaire
             'critical_complaints': qs.filter(
@@ -488,38 +473,36 @@ class RoleBasedStatisticsService:
             ).count(),
         }
     
-    def _get_weekly_trend(self, qs):
-        """Tendance hebdomadaire"""
-        now = timezone.now()
-        days_data = []
-        
-        for i in range(7):
-            day = now - timedelta(days=6-i)
-            day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            count = qs.filter(
-                submitted_at__gte=day_start,
-                submitted_at__lt=day_end
-            ).count()
-            
-            days_data.append({
-                'date': day_start.strftime('%Y-%m-%d'),
-                'day': day_start.strftime('%a'),
-                'count': count
-            })
+    def _get_weekly_trend(self, stats_qs):
+        """Tendance hebdomadaire (à partir du rollup journalier)"""
+        series = get_time_series(
+            stats_qs, 'date', 'day', periods=7,
+            value=Sum('submitted'), tzinfo=self.tenant.get_timezone()
+        )
         
-        return days_data
+        return [
+            {
+                'date': point['period'].strftime('%Y-%m-%d'),
+                'day': point['period'].strftime('%a'),
+                'count': point['count']
+            }
+            for point in series
+        ]
     
-    def _get_urgency_distribution(self, qs):
-        """Distribution par urgence"""
-        total = qs.count()
+    def _get_urgency_distribution(self, stats_qs):
+        """Distribution par urgence (à partir du rollup journalier)"""
+        counts = dict(
+            stats_qs.values('urgency')
+            .annotate(count=Sum('submitted'))
+            .values_list('urgency', 'count')
+        )
+        total = sum(counts.values())
         if total == 0:
             return {}
         
         dist = {}
         for urgency in ['HIGH', 'MEDIUM', 'LOW']:
-            count = qs.filter(urgency=urgency).count()
+            count = counts.get(urgency, 0)
             dist[urgency] = {
                 'count': count,
                 'percentage': round((count / total) * 100, 1)
@@ -527,32 +510,38 @@ class RoleBasedStatisticsService:
         
         return dist
     
-    def _get_status_distribution(self, qs):
-        """Distribution par statut"""
+    def _get_status_distribution(self, stats_qs):
+        """Distribution par statut (à partir du rollup journalier)"""
+        counts = dict(
+            stats_qs.values('status_group')
+            .annotate(count=Sum('submitted'))
+            .values_list('status_group', 'count')
+        )
         return {
-            'to_handle': qs.filter(status__in=['NEW', 'RECEIVED']).count(),
-            'in_progress': qs.filter(status__in=['ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']).count(),
-            'closed': qs.filter(status='CLOSED').count(),
-            'archived': qs.filter(status='ARCHIVED').count(),
+            'to_handle': counts.get('TO_HANDLE', 0),
+            'in_progress': counts.get('IN_PROGRESS', 0),
+            'closed': counts.get('CLOSED', 0),
+            'archived': counts.get('ARCHIVED', 0),
         }
     
-    def _get_category_stats(self, qs):
-        """Stats par catégorie"""
+    def _get_category_stats(self, stats_qs):
+        """Stats par catégorie (à partir du rollup journalier)"""
         return list(
-            qs.values('category__name')
-            .annotate(count=Count('id'))
+            stats_qs.values('category__name')
+            .annotate(count=Sum('submitted'))
+            .filter(count__gt=0)
             .order_by('-count')[:5]
         )
     
-    def _get_sla_performance(self, qs):
-        """Performance SLA"""
-        resolved = qs.filter(status__in=['RESOLVED', 'CLOSED'])
-        total = resolved.count()
+    def _get_sla_performance(self, stats_qs):
+        """Performance SLA (à partir du rollup journalier)"""
+        totals = stats_qs.aggregate(total=Sum('closed'), sla_met=Sum('sla_met'))
+        total = totals['total'] or 0
         
         if total == 0:
             return {'sla_met': 0, 'sla_missed': 0, 'compliance_rate': 0}
         
-        sla_met = resolved.filter(closed_at__lte=F('sla_deadline')).count()
+        sla_met = totals['sla_met']
         
         return {
             'sla_met': sla_met,
@@ -561,34 +550,16 @@ class RoleBasedStatisticsService:
         }
     
     def _get_monthly_volume(self, qs):
-        """Volume mensuel"""
-        now = timezone.now()
-        monthly = []
-        
-        for i in range(12):
-            month_start = (now - timedelta(days=30*i)).replace(day=1, hour=0, minute=0, second=0)
-            if i == 0:
-                month_end = now
-            else:
-                month_end = month_start.replace(day=28) + timedelta(days=4)
-                month_end = month_end.replace(day=1) - timedelta(days=1)
-            
-            count = qs.filter(
-                submitted_at__gte=month_start,
-                submitted_at__lte=month_end
-            ).count()
-            
-            monthly.append({
-                'month': month_start.strftime('%Y-%m'),
-                'count': count
-            })
-        
-        monthly.reverse()
-        return monthly
+        """Volume mensuel (12 derniers mois calendaires, une seule requête)"""
+        return [
+            {'month': point['period'].strftime('%Y-%m'), 'count': point['count']}
+            for point in get_time_series(qs, 'submitted_at', 'month', periods=12)
+        ]
     
     def _get_platform_alerts(self, tenant_stats):
-        """Alertes plateforme"""
+        """Alertes plateforme (à partir des snapshots de métriques)"""
         alerts = []
+        stale_before = timezone.now() - timedelta(seconds=settings.TENANT_METRICS_MAX_AGE)
         
         for t in tenant_stats:
             if t['sla_compliance_rate'] < 70:
@@ -607,6 +578,14 @@ class RoleBasedStatisticsService:
                     'message': f"{t['overdue']} complaints are overdue",
                 })
         
+            if t['refreshed_at'] < stale_before:
+                alerts.append({
+                    'type': 'stale_metrics',
+                    'severity': 'low',
+                    'tenant': t['tenant_name'],
+                    'message': f"Metrics last refreshed at {t['refreshed_at']:%Y-%m-%d %H:%M}",
+                })
+        
         return alerts[:10]  # Top 10 alertes
     
     def _get_tenant_alerts(self, qs):
@@ -0,0 +1,244 @@
+"""
+Table d'agrégats journaliers ComplaintDailyStats : maintenance incrémentale
+à chaque écriture de plainte et reconstruction complète
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum, Q, F, Case, When, Value, CharField, FloatField
+from django.db.models.functions import TruncDate, Coalesce
+from django.utils import timezone
+
+from complaints.models import Complaint, ComplaintDailyStats
+from complaints.services.aggregates import RESOLVED_STATUSES, resolution_seconds
+
+
+STATUS_GROUPS = {
+    'NEW': 'TO_HANDLE',
+    'RECEIVED': 'TO_HANDLE',
+    'ASSIGNED': 'IN_PROGRESS',
+    'IN_PROGRESS': 'IN_PROGRESS',
+    'INVESTIGATION': 'IN_PROGRESS',
+    'ACTION': 'IN_PROGRESS',
+    'RESOLVED': 'RESOLVED',
+    'CLOSED': 'CLOSED',
+    'ARCHIVED': 'ARCHIVED',
+}
+
+DIMENSIONS = ('tenant_id', 'date', 'category_id', 'urgency', 'status_group', 'assigned_user_id')
+MEASURES = ('submitted', 'closed', 'sla_met', 'sla_missed', 'total_resolution_seconds')
+
+STATE_FIELDS = (
+    'tenant_id', 'category_id', 'urgency', 'status', 'assigned_user_id',
+    'submitted_at', 'closed_at', 'sla_deadline',
+)
+
+
+def status_group_expression():
+    """CASE SQL qui projette Complaint.status sur les groupes du rollup"""
+    return Case(
+        *[When(status=status, then=Value(group)) for status, group in STATUS_GROUPS.items()],
+        default=Value('TO_HANDLE'),
+        output_field=CharField()
+    )
+
+
+def complaint_state(complaint, previous=False):
+    """
+    Valeurs utiles au rollup, actuelles ou telles qu'enregistrées en base
+    (via le FieldTracker) si previous=True.
+    """
+    state = {'tzinfo': complaint.tenant.get_timezone()}
+    for attname in STATE_FIELDS:
+        field = attname[:-3] if attname.endswith('_id') else attname
+        if previous and field in complaint.tracker.fields:
+            state[attname] = complaint.tracker.previous(field)
+        else:
+            state[attname] = getattr(complaint, attname)
+    return state
+
+
+def complaint_contribution(state):
+    """
+    Contribution d'une plainte au rollup : {bucket: {mesure: valeur}}.
+    La soumission est comptée au jour de submitted_at, la résolution au jour
+    de closed_at (ou submitted_at à défaut), dans le fuseau du tenant.
+    """
+    if not state or not state['submitted_at']:
+        return {}
+
+    tzinfo = state.get('tzinfo')
+
+    status_group = STATUS_GROUPS.get(state['status'], 'TO_HANDLE')
+
+    def bucket(value):
+        return (
+            state['tenant_id'],
+            timezone.localdate(value, tzinfo),
+            state['category_id'],
+            state['urgency'],
+            status_group,
+            state['assigned_user_id'],
+        )
+
+    contribution = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+    contribution[bucket(state['submitted_at'])]['submitted'] += 1
+
+    if state['status'] in RESOLVED_STATUSES:
+        closed_at = state['closed_at']
+        sla_deadline = state['sla_deadline']
+        measures = contribution[bucket(closed_at or state['submitted_at'])]
+        measures['closed'] += 1
+        if closed_at and sla_deadline and closed_at <= sla_deadline:
+            measures['sla_met'] += 1
+        else:
+            measures['sla_missed'] += 1
+        if closed_at:
+            measures['total_resolution_seconds'] += (
+                closed_at - state['submitted_at']
+            ).total_seconds()
+
+    return contribution
+
+
+def contribution_delta(old, new):
+    """Différence new - old, sans les buckets inchangés"""
+    delta = {}
+    for key in set(old) | set(new):
+        measures = {
+            measure: new.get(key, {}).get(measure, 0) - old.get(key, {}).get(measure, 0)
+            for measure in MEASURES
+        }
+        if any(measures.values()):
+            delta[key] = measures
+    return delta
+
+
+def apply_delta(delta):
+    """
+    Ajoute les deltas aux buckets existants (INSERT ... ON CONFLICT DO UPDATE),
+    dans un ordre stable pour éviter les interblocages entre écritures.
+    """
+    if not delta:
+        return
+
+    table = connection.ops.quote_name(ComplaintDailyStats._meta.db_table)
+    columns = ('id',) + DIMENSIONS + MEASURES
+    placeholders = '(%s)' % ', '.join(['%s'] * len(columns))
+
+    params = []
+    for key in sorted(delta, key=str):
+        params.append(ComplaintDailyStats._meta.pk.get_default())
+        params.extend(key)
+        params.extend(delta[key][measure] for measure in MEASURES)
+
+    updates = ', '.join(
+        f'{measure} = {table}.{measure} + EXCLUDED.{measure}' for measure in MEASURES
+    )
+    sql = (
+        f'INSERT INTO {table} ({", ".join(columns)}) '
+        f'VALUES {", ".join([placeholders] * len(delta))} '
+        f'ON CONFLICT ON CONSTRAINT complaint_daily_stats_unique_bucket '
+        f'DO UPDATE SET {updates}'
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def record_complaint_change(complaint, created):
+    """Répercute une création ou modification de plainte sur le rollup"""
+    old = {} if created else complaint_contribution(complaint_state(complaint, previous=True))
+    new = complaint_contribution(complaint_state(complaint))
+    apply_delta(contribution_delta(old, new))
+
+
+def record_state_changes(changes):
+    """
+    Répercute un lot de changements (ancien état, nouvel état) faits sans
+    signal (bulk_create, UPDATE ensembliste) : deltas additionnés, un seul
+    INSERT ... ON CONFLICT. Un état None signifie « pas de plainte ».
+    """
+    delta = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+    for old, new in changes:
+        for key, measures in contribution_delta(
+            complaint_contribution(old), complaint_contribution(new)
+        ).items():
+            for measure, value in measures.items():
+                delta[key][measure] += value
+    apply_delta(contribution_delta({}, delta))
+
+
+def record_complaints_created(complaints):
+    """Répercute un lot de plaintes créées par bulk_create"""
+    record_state_changes((None, complaint_state(complaint)) for complaint in complaints)
+
+
+def record_complaint_deletion(complaint):
+    """Retire la contribution d'une plainte supprimée"""
+    old = complaint_contribution(complaint_state(complaint))
+    apply_delta(contribution_delta(old, {}))
+
+
+def rebuild_daily_stats(tenant):
+    """
+    Reconstruit entièrement le rollup d'un tenant à partir de la table des plaintes.
+    La table est verrouillée pendant la reconstruction pour ne perdre aucun delta.
+    Retourne le nombre de buckets écrits.
+    """
+    qs = Complaint.objects.filter(tenant=tenant).order_by()
+    tzinfo = tenant.get_timezone()
+    group_by = ('day', 'category_id', 'urgency', 'status_group', 'assigned_user_id')
+    buckets = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'LOCK TABLE %s IN SHARE ROW EXCLUSIVE MODE'
+                % connection.ops.quote_name(ComplaintDailyStats._meta.db_table)
+            )
+
+        submitted_rows = (
+            qs.annotate(
+                day=TruncDate('submitted_at', tzinfo=tzinfo),
+                status_group=status_group_expression()
+            )
+            .values(*group_by)
+            .annotate(submitted=Count('id'))
+        )
+        for row in submitted_rows:
+            key = (tenant.id,) + tuple(row[field] for field in group_by)
+            buckets[key]['submitted'] += row['submitted']
+
+        closed_rows = (
+            qs.filter(status__in=RESOLVED_STATUSES)
+            .annotate(
+                day=TruncDate(Coalesce('closed_at', 'submitted_at'), tzinfo=tzinfo),
+                status_group=status_group_expression()
+            )
+            .values(*group_by)
+            .annotate(
+                closed=Count('id'),
+                sla_met=Count('id', filter=Q(closed_at__lte=F('sla_deadline'))),
+                total_resolution_seconds=Coalesce(
+                    Sum(resolution_seconds()), Value(0.0), output_field=FloatField()
+                ),
+            )
+        )
+        for row in closed_rows:
+            key = (tenant.id,) + tuple(row[field] for field in group_by)
+            buckets[key]['closed'] += row['closed']
+            buckets[key]['sla_met'] += row['sla_met']
+            buckets[key]['sla_missed'] += row['closed'] - row['sla_met']
+            buckets[key]['total_resolution_seconds'] += row['total_resolution_seconds']
+
+        ComplaintDailyStats.objects.filter(tenant=tenant).delete()
+        ComplaintDailyStats.objects.bulk_create(
+            [
+                ComplaintDailyStats(**dict(zip(DIMENSIONS, key)), **measures)
+                for key, measures in buckets.items()
+            ],
+            batch_size=1000
+        )
+
+    return len(buckets)
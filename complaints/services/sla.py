@@ -0,0 +1,141 @@
+"""
+Résolution des délais SLA : la matrice (catégorie, urgence) -> délai en heures
+d'un tenant est chargée en une requête puis gardée en cache dans le processus.
+
+Le cache local est invalidé à chaque écriture de SLAConfig (signal) ; les autres
+processus le détectent via un numéro de version stocké dans le cache Django,
+et au plus tard après SLA_POLICY_CACHE_TTL secondes.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DateTimeField, ExpressionWrapper, F
+from django.utils import timezone
+
+from complaints.models import SLAConfig
+
+
+# SLA par défaut si pas de config pour (catégorie, urgence)
+DEFAULT_DELAY_HOURS = {"LOW": 72, "MEDIUM": 48, "HIGH": 24}
+FALLBACK_DELAY_HOURS = 48
+
+_policies = {}
+_lock = threading.Lock()
+
+
+class SLAPolicy:
+    """Délais SLA d'un tenant, sans requête par plainte"""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def delay_hours(self, category_id, urgency):
+        hours = self.matrix.get((category_id, urgency))
+        if hours is None:
+            hours = DEFAULT_DELAY_HOURS.get(urgency, FALLBACK_DELAY_HOURS)
+        return hours
+
+    def deadline(self, submitted_at, category_id, urgency):
+        return submitted_at + timedelta(hours=self.delay_hours(category_id, urgency))
+
+
+def _version_key(tenant_id):
+    return f'sla_policy:version:{tenant_id}'
+
+
+def load_sla_policy(tenant_id):
+    """Charge la matrice SLA du tenant depuis la base (sans cache)"""
+    rows = SLAConfig.objects.filter(tenant_id=tenant_id).values_list(
+        'category_id', 'urgency_level', 'delay_hours'
+    )
+    return SLAPolicy({(category_id, urgency): hours for category_id, urgency, hours in rows})
+
+
+def get_sla_policy(tenant_id):
+    """Politique SLA du tenant, depuis le cache du processus si elle est à jour"""
+    version = cache.get(_version_key(tenant_id))
+    entry = _policies.get(tenant_id)
+    if (
+        entry is not None
+        and entry[0] == version
+        and time.monotonic() - entry[1] < settings.SLA_POLICY_CACHE_TTL
+    ):
+        return entry[2]
+
+    policy = load_sla_policy(tenant_id)
+    with _lock:
+        _policies[tenant_id] = (version, time.monotonic(), policy)
+    return policy
+
+
+def invalidate_sla_policy(tenant_id):
+    """Oublie la politique du tenant dans ce processus et dans les autres"""
+    with _lock:
+        _policies.pop(tenant_id, None)
+    try:
+        cache.incr(_version_key(tenant_id))
+    except ValueError:
+        cache.add(_version_key(tenant_id), int(time.time() * 1000), timeout=None)
+
+
+def reapply_sla_deadlines(tenant, category_id, urgency, batch_size=1000):
+    """
+    Recalcule sla_deadline des plaintes ouvertes de (catégorie, urgence) avec
+    le délai actuellement configuré, par lots d'UPDATE ensemblistes (un lot
+    par transaction, parcours par clé croissante).
+
+    Seules les plaintes non terminées sont concernées : elles ne contribuent
+    pas aux mesures SLA du rollup journalier, qui reste donc cohérent.
+    Retourne {'updated', 'batches', 'delay_hours', 'duration_ms'}.
+    """
+    from complaints.models import Complaint
+    from complaints.services.aggregates import FINISHED_STATUSES
+    from complaints.services.dashboard_cache import bump_data_version
+
+    started = time.monotonic()
+    delay_hours = load_sla_policy(tenant.id).delay_hours(category_id, urgency)
+    new_deadline = ExpressionWrapper(
+        F('submitted_at') + timedelta(hours=delay_hours),
+        output_field=DateTimeField()
+    )
+
+    open_complaints = Complaint.objects.filter(
+        tenant=tenant,
+        category_id=category_id,
+        urgency=urgency
+    ).exclude(status__in=FINISHED_STATUSES)
+
+    updated = 0
+    batches = 0
+    last_id = None
+    while True:
+        batch = open_complaints.order_by('id')
+        if last_id is not None:
+            batch = batch.filter(id__gt=last_id)
+        ids = list(batch.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        batches += 1
+
+        with transaction.atomic():
+            updated += (
+                open_complaints.filter(id__in=ids)
+                .exclude(sla_deadline=new_deadline)
+                # Le délai fait partie de la plainte : date de modification à jour
+                .update(sla_deadline=new_deadline, updated_at=timezone.now())
+            )
+
+    if updated:
+        bump_data_version(tenant.id)
+
+    return {
+        'updated': updated,
+        'batches': batches,
+        'delay_hours': delay_hours,
+        'duration_ms': round((time.monotonic() - started) * 1000),
+    }
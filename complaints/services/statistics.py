@@ -1,7 +1,17 @@
-from django.db.models import Count, Q, Avg, F, ExpressionWrapper, fields
+from django.db.models import Count, Q, Avg, Sum, F, ExpressionWrapper, fields
 from django.utils import timezone
 from datetime import timedelta, datetime
-from complaints.models import Complaint, SLAConfig, ComplaintHistory
+from complaints.models import Complaint, SLAConfig, ComplaintHistory, ComplaintDailyStats
+from complaints.services.aggregates import (
+    get_agent_metrics, get_resolution_time_stats, resolution_seconds,
+    seconds_to_hours, EMPTY_AGENT_METRICS
+)
+from complaints.services.timeseries import get_time_series
+from complaints.services.dashboard_cache import get_or_compute
+from complaints.services.instrumentation import profile_section
+from complaints.services.platform_snapshot import (
+    get_platform_snapshots, snapshot_freshness, merge_snapshot_volume
+)
 
 
 class ComplaintStatisticsService:
@@ -11,38 +21,94 @@ class ComplaintStatisticsService:
         self.tenant = tenant
         self.user = user
     
-    def get_dashboard_stats(self):
-        """Retourne toutes les stats pour le dashboard"""
-        now = timezone.now()
-        week_start = now - timedelta(days=7)
+    def _timezone(self):
+        """Fuseau du tenant pour découper les séries temporelles"""
+        return self.tenant.get_timezone() if self.tenant else timezone.get_current_timezone()
+    
+    def _daily_stats(self):
+        """Agrégats journaliers du tenant (ComplaintDailyStats)"""
+        return ComplaintDailyStats.objects.filter(tenant=self.tenant)
+    
+    # Sections du dashboard : nom -> méthode qui la calcule.
+    # Les sections personnelles sont mises en cache par utilisateur.
+    DASHBOARD_SECTIONS = {
+        'overview': 'get_overview_stats',
+        'weekly_trend': 'get_weekly_trend',
+        'urgency_distribution': 'get_urgency_distribution',
+        'status_distribution': 'get_status_distribution',
+        'workload': 'get_agent_workload',
+        'sla_performance': 'get_sla_performance',
+        'resolution_time': 'get_resolution_time_stats',
+        'personal_stats': 'get_personal_stats',
+    }
+    PERSONAL_SECTIONS = ('personal_stats',)
+    
+    @classmethod
+    def parse_sections(cls, value):
+        """
+        Sections demandées via ?sections=a,b (toutes si vide).
+        Lève ValueError si une section est inconnue.
+        """
+        if not value:
+            return list(cls.DASHBOARD_SECTIONS)
+        
+        sections = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in sections if name not in cls.DASHBOARD_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown dashboard section(s): {', '.join(unknown)}")
+        return sections
+    
+    def get_section(self, name):
+        """Calcule une section du dashboard, mise en cache individuellement"""
+        compute = getattr(self, self.DASHBOARD_SECTIONS[name])
+        
+        if name in self.PERSONAL_SECTIONS:
+            if not self.user:
+                return None
+            scope = f'section:{name}:{self.user.id}'
+        else:
+            scope = f'section:{name}'
         
-        return {
-            'overview': self.get_overview_stats(),
-            'weekly_trend': self.get_weekly_trend(),
-            'urgency_distribution': self.get_urgency_distribution(),
-            'status_distribution': self.get_status_distribution(),
-            'workload': self.get_agent_workload(),
-            'sla_performance': self.get_sla_performance(),
-            'personal_stats': self.get_personal_stats() if self.user else None,
-        }
+        with profile_section(name):
+            return get_or_compute(self.tenant.id, scope, compute)
+    
+    def get_dashboard_stats(self, sections=None):
+        """
+        Stats du dashboard, limitées aux sections demandées (toutes par défaut).
+        Seules les sections demandées sont calculées.
+        """
+        sections = sections or list(self.DASHBOARD_SECTIONS)
+        return {name: self.get_section(name) for name in sections}
     
     def get_overview_stats(self):
-        """Statistiques générales"""
+        """Statistiques générales (une seule requête agrégée)"""
         base_qs = Complaint.objects.filter(tenant=self.tenant)
         now = timezone.now()
-        
-        total = base_qs.count()
-        
-        # Cette semaine
         week_start = now - timedelta(days=7)
-        this_week = base_qs.filter(submitted_at__gte=week_start).count()
-        
-        # Semaine précédente
         prev_week_start = week_start - timedelta(days=7)
-        prev_week = base_qs.filter(
-            submitted_at__gte=prev_week_start,
-            submitted_at__lt=week_start
-        ).count()
+        
+        # Tous les compteurs en un seul aller-retour via COUNT(*) FILTER (WHERE ...)
+        counts = base_qs.aggregate(
+            total=Count('id'),
+            this_week=Count('id', filter=Q(submitted_at__gte=week_start)),
+            prev_week=Count('id', filter=Q(
+                submitted_at__gte=prev_week_start,
+                submitted_at__lt=week_start
+            )),
+            urgent_unhandled=Count('id', filter=Q(
+                urgency='HIGH',
+                status__in=['NEW', 'RECEIVED']
+            )),
+            unassigned=Count('id', filter=Q(assigned_user__isnull=True)),
+            assigned=Count('id', filter=Q(assigned_user__isnull=False)),
+            overdue=Count('id', filter=Q(
+                sla_deadline__lt=now,
+                status__in=['NEW', 'RECEIVED', 'ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
+            )),
+        )
+        
+        this_week = counts['this_week']
+        prev_week = counts['prev_week']
         
         # Calcul de la tendance
         if prev_week > 0:
@@ -51,51 +117,42 @@ class ComplaintStatisticsService:
             trend_percentage = 100 if this_week > 0 else 0
         
         return {
-            'total_complaints': total,
+            'total_complaints': counts['total'],
             'this_week': this_week,
             'prev_week': prev_week,
             'trend': 'up' if trend_percentage > 0 else 'down',
             'trend_percentage': abs(round(trend_percentage, 1)),
-            'urgent_unhandled': base_qs.filter(
-                urgency='HIGH',
-                status__in=['NEW', 'RECEIVED']
-            ).count(),
-            'unassigned': base_qs.filter(assigned_user__isnull=True).count(),
-            'assigned': base_qs.filter(assigned_user__isnull=False).count(),
-            'overdue': base_qs.filter(
-                sla_deadline__lt=now,
-                status__in=['NEW', 'RECEIVED', 'ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
-            ).count(),
+            'urgent_unhandled': counts['urgent_unhandled'],
+            'unassigned': counts['unassigned'],
+            'assigned': counts['assigned'],
+            'overdue': counts['overdue'],
         }
     
     def get_weekly_trend(self):
-        """Tendance des plaintes sur les 7 derniers jours"""
-        now = timezone.now()
-        days_data = []
-        
-        for i in range(7):
-            day = now - timedelta(days=6-i)
-            day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            count = Complaint.objects.filter(
-                tenant=self.tenant,
-                submitted_at__gte=day_start,
-                submitted_at__lt=day_end
-            ).count()
-            
-            days_data.append({
-                'date': day_start.strftime('%Y-%m-%d'),
-                'day': day_start.strftime('%A'),
-                'count': count
-            })
+        """Tendance des plaintes sur les 7 derniers jours (lue dans le rollup)"""
+        series = get_time_series(
+            self._daily_stats(), 'date', 'day', periods=7,
+            value=Sum('submitted'), tzinfo=self._timezone()
+        )
         
-        return days_data
+        return [
+            {
+                'date': point['period'].strftime('%Y-%m-%d'),
+                'day': point['period'].strftime('%A'),
+                'count': point['count']
+            }
+            for point in series
+        ]
     
     def get_urgency_distribution(self):
-        """Répartition par urgence"""
-        base_qs = Complaint.objects.filter(tenant=self.tenant)
-        total = base_qs.count()
+        """Répartition par urgence (lue dans le rollup)"""
+        urgency_counts = dict(
+            self._daily_stats()
+            .values('urgency')
+            .annotate(count=Sum('submitted'))
+            .values_list('urgency', 'count')
+        )
+        total = sum(urgency_counts.values())
         
         if total == 0:
             return {
@@ -104,13 +161,11 @@ class ComplaintStatisticsService:
                 'LOW': {'count': 0, 'percentage': 0},
             }
         
-        urgency_counts = base_qs.values('urgency').annotate(count=Count('id'))
-        
         result = {}
-        for item in urgency_counts:
-            result[item['urgency']] = {
-                'count': item['count'],
-                'percentage': round((item['count'] / total) * 100, 1)
+        for urgency, count in urgency_counts.items():
+            result[urgency] = {
+                'count': count,
+                'percentage': round((count / total) * 100, 1)
             }
         
         # Assurer que toutes les urgences sont présentes
@@ -121,16 +176,19 @@ class ComplaintStatisticsService:
         return result
     
     def get_status_distribution(self):
-        """Répartition par statut"""
-        base_qs = Complaint.objects.filter(tenant=self.tenant)
+        """Répartition par statut (lue dans le rollup)"""
+        group_counts = dict(
+            self._daily_stats()
+            .values('status_group')
+            .annotate(count=Sum('submitted'))
+            .values_list('status_group', 'count')
+        )
         
         status_groups = {
-            'to_handle': base_qs.filter(status__in=['NEW', 'RECEIVED']).count(),
-            'in_progress': base_qs.filter(
-                status__in=['ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
-            ).count(),
-            'closed': base_qs.filter(status='CLOSED').count(),
-            'archived': base_qs.filter(status='ARCHIVED').count(),
+            'to_handle': group_counts.get('TO_HANDLE', 0),
+            'in_progress': group_counts.get('IN_PROGRESS', 0),
+            'closed': group_counts.get('CLOSED', 0),
+            'archived': group_counts.get('ARCHIVED', 0),
         }
         
         total = sum(status_groups.values())
@@ -147,7 +205,7 @@ class ComplaintStatisticsService:
         return status_groups
     
     def get_agent_workload(self):
-        """Charge de travail par agent"""
+        """Charge de travail par agent (une requête groupée + la liste des agents)"""
         from users.models import CustomUser
         
         agents = CustomUser.objects.filter(
@@ -155,28 +213,20 @@ class ComplaintStatisticsService:
             role__in=['AGENT', 'TENANT_ADMIN']
         )
         
+        metrics = get_agent_metrics(
+            Complaint.objects.filter(tenant=self.tenant)
+        )
+        
         workload_data = []
         
         for agent in agents:
-            assigned_count = Complaint.objects.filter(
-                tenant=self.tenant,
-                assigned_user=agent,
-                status__in=['ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
-            ).count()
-            
-            overdue_count = Complaint.objects.filter(
-                tenant=self.tenant,
-                assigned_user=agent,
-                sla_deadline__lt=timezone.now(),
-                status__in=['ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
-            ).count()
-            
+            agent_metrics = metrics.get(agent.id, EMPTY_AGENT_METRICS)
             workload_data.append({
                 'agent_id': str(agent.id),
                 'agent_name': agent.full_name,
                 'agent_email': agent.email,
-                'assigned_count': assigned_count,
-                'overdue_count': overdue_count,
+                'assigned_count': agent_metrics['in_progress'],
+                'overdue_count': agent_metrics['in_progress_overdue'],
             })
         
         # Trier par charge de travail
@@ -185,13 +235,13 @@ class ComplaintStatisticsService:
         return workload_data
     
     def get_sla_performance(self):
-        """Performance SLA du tenant"""
-        base_qs = Complaint.objects.filter(
-            tenant=self.tenant,
-            status__in=['RESOLVED', 'CLOSED']
+        """Performance SLA du tenant (lue dans le rollup)"""
+        totals = self._daily_stats().aggregate(
+            total_resolved=Sum('closed'),
+            sla_met=Sum('sla_met'),
         )
         
-        total_resolved = base_qs.count()
+        total_resolved = totals['total_resolved'] or 0
         
         if total_resolved == 0:
             return {
@@ -203,7 +253,7 @@ class ComplaintStatisticsService:
             }
         
         # SLA respecté : closed_at <= sla_deadline
-        sla_met = base_qs.filter(closed_at__lte=F('sla_deadline')).count()
+        sla_met = totals['sla_met']
         sla_missed = total_resolved - sla_met
         
         return {
@@ -225,110 +275,65 @@ class ComplaintStatisticsService:
             assigned_user=self.user
         )
         
-        # Plaintes actives
-        active_count = assigned_qs.filter(
-            status__in=['ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
-        ).count()
-        
-        # Plaintes résolues
-        resolved_qs = assigned_qs.filter(status__in=['RESOLVED', 'CLOSED'])
-        resolved_count = resolved_qs.count()
-        
-        # Temps moyen de résolution
-        avg_resolution_time = None
-        if resolved_count > 0:
-            # Calculer la différence en heures
-            resolved_complaints = resolved_qs.filter(closed_at__isnull=False)
-            
-            total_hours = 0
-            count = 0
-            for complaint in resolved_complaints:
-                if complaint.resolution_time:
-                    total_hours += complaint.resolution_time
-                    count += 1
-            
-            if count > 0:
-                avg_resolution_time = round(total_hours / count, 1)
-        
-        # Plaintes en retard
-        overdue_count = assigned_qs.filter(
-            sla_deadline__lt=timezone.now(),
-            status__in=['ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
-        ).count()
+        counts = assigned_qs.aggregate(
+            active=Count('id', filter=Q(
+                status__in=['ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
+            )),
+            resolved=Count('id', filter=Q(status__in=['RESOLVED', 'CLOSED'])),
+            overdue=Count('id', filter=Q(
+                sla_deadline__lt=timezone.now(),
+                status__in=['ASSIGNED', 'IN_PROGRESS', 'INVESTIGATION', 'ACTION']
+            )),
+            # Temps moyen de résolution calculé côté base
+            avg_resolution_seconds=Avg(resolution_seconds(), filter=Q(
+                status__in=['RESOLVED', 'CLOSED'],
+                closed_at__isnull=False
+            )),
+        )
         
         return {
-            'active_complaints': active_count,
-            'resolved_complaints': resolved_count,
-            'overdue_complaints': overdue_count,
-            'avg_resolution_time_hours': avg_resolution_time,
+            'active_complaints': counts['active'],
+            'resolved_complaints': counts['resolved'],
+            'overdue_complaints': counts['overdue'],
+            'avg_resolution_time_hours': seconds_to_hours(counts['avg_resolution_seconds']),
         }
     
+    def get_resolution_time_stats(self):
+        """Distribution des temps de résolution du tenant (heures)"""
+        return get_resolution_time_stats(
+            Complaint.objects.filter(tenant=self.tenant)
+        )
+    
     def get_global_platform_stats(self):
-        """Statistiques globales de la plateforme (pour SUPER_ADMIN)"""
-        from tenants.models import Tenant
-        
-        all_complaints = Complaint.objects.all()
-        total_complaints = all_complaints.count()
+        """Statistiques globales de la plateforme (pour SUPER_ADMIN), lues dans les snapshots"""
+        snapshots, missing = get_platform_snapshots()
         
         # Par tenant
-        tenant_stats = []
-        for tenant in Tenant.objects.filter(is_active=True):
-            tenant_complaints = all_complaints.filter(tenant=tenant)
-            resolved = tenant_complaints.filter(status__in=['RESOLVED', 'CLOSED'])
-            
-            sla_met = 0
-            sla_missed = 0
-            
-            if resolved.exists():
-                sla_met = resolved.filter(closed_at__lte=F('sla_deadline')).count()
-                sla_missed = resolved.count() - sla_met
-            
-            tenant_stats.append({
-                'tenant_id': str(tenant.id),
-                'tenant_name': tenant.name,
-                'total_complaints': tenant_complaints.count(),
-                'sla_met': sla_met,
-                'sla_missed': sla_missed,
-                'sla_met_percentage': round((sla_met / resolved.count()) * 100, 1) if resolved.exists() else 0,
-            })
-        
-        # Volume par mois (12 derniers mois)
-        monthly_volume = []
-        now = timezone.now()
-        
-        for i in range(12):
-            month_start = (now - timedelta(days=30*i)).replace(day=1, hour=0, minute=0, second=0)
-            if i == 0:
-                month_end = now
-            else:
-                month_end = month_start.replace(day=28) + timedelta(days=4)
-                month_end = month_end.replace(day=1) - timedelta(days=1)
-            
-            count = all_complaints.filter(
-                submitted_at__gte=month_start,
-                submitted_at__lte=month_end
-            ).count()
-            
-            monthly_volume.append({
-                'month': month_start.strftime('%Y-%m'),
-                'count': count
-            })
-        
-        monthly_volume.reverse()
+        tenant_stats = [
+            {
+                'tenant_id': str(snapshot.tenant_id),
+                'tenant_name': snapshot.tenant.name,
+                'total_complaints': snapshot.total_complaints,
+                'sla_met': snapshot.sla_met,
+                'sla_missed': snapshot.resolved_complaints - snapshot.sla_met,
+                'sla_met_percentage': snapshot.sla_compliance_rate,
+            }
+            for snapshot in snapshots
+        ]
         
         # SLA global
-        all_resolved = all_complaints.filter(status__in=['RESOLVED', 'CLOSED'])
-        total_resolved = all_resolved.count()
+        total_resolved = sum(s.resolved_complaints for s in snapshots)
         
         if total_resolved > 0:
-            global_sla_met = all_resolved.filter(closed_at__lte=F('sla_deadline')).count()
+            global_sla_met = sum(s.sla_met for s in snapshots)
             global_sla_percentage = round((global_sla_met / total_resolved) * 100, 1)
         else:
             global_sla_percentage = 0
         
         return {
-            'total_complaints': total_complaints,
+            'total_complaints': sum(s.total_complaints for s in snapshots),
             'tenant_stats': tenant_stats,
-            'monthly_volume': monthly_volume,
+            'monthly_volume': merge_snapshot_volume(snapshots),
             'global_sla_percentage': global_sla_percentage,
-        }
\ No newline at end of file
+            'metrics_freshness': snapshot_freshness(snapshots, missing),
+        }
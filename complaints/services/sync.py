@@ -0,0 +1,137 @@
+"""
+Synchronisation incrémentale de la liste des plaintes (GET /api/complaints/changes/).
+
+Le jeton `since` (opaque) contient deux positions keyset (sync_xid, id) : celle
+de la dernière plainte transmise et celle de la dernière entrée d'historique
+« retirée » (suppression, ou réassignation pour un agent). Un appel ne lit que
+ce qui a bougé depuis, sur les index (tenant, sync_xid, id).
+
+sync_xid est l'identifiant de la dernière transaction qui a écrit la ligne
+(trigger). Seules les lignes écrites par une transaction antérieure à
+pg_snapshot_xmin(pg_current_snapshot()) sont servies : ces transactions sont
+toutes terminées, aucune ligne ne peut donc apparaître plus tard derrière la
+position du client, quelle que soit la date (updated_at) posée par l'écriture.
+Une transaction longue retarde la synchronisation, sans rien faire manquer.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from complaints.pagination import KeysetPagination
+from complaints.services.complaint_list import format_datetime
+
+CHANGES_ORDERING = ['sync_xid', 'id']
+REMOVED_ORDERING = ['sync_xid', 'id']
+
+
+def encode_token(changes_position, removed_position):
+    payload = json.dumps({'c': changes_position, 'r': removed_position}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_token(token, queryset, history):
+    """(position plaintes, position retraits) ; ValidationError (400) si le jeton est invalide"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return (
+            _parse_position(payload['c'], queryset, CHANGES_ORDERING),
+            _parse_position(payload['r'], history, REMOVED_ORDERING),
+        )
+    except Exception:
+        raise ValidationError({'since': 'Invalid sync token'})
+
+
+def _parse_position(values, queryset, ordering):
+    if values is None:
+        return None
+    if len(values) != len(ordering):
+        raise ValueError
+    return [queryset.model._meta.get_field(field).to_python(value) for field, value in zip(ordering, values)]
+
+
+def _encode_position(values):
+    if values is None:
+        return None
+    return [value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values]
+
+
+def sync_watermark():
+    """xid de la plus ancienne transaction en cours : les lignes écrites avant sont définitives"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+        return cursor.fetchone()[0]
+
+
+def _page(queryset, ordering, position, watermark, limit):
+    """Lignes après `position` écrites avant `watermark`, limit + 1 lues"""
+    rows = queryset.filter(**{f'{ordering[0]}__lt': watermark}).order_by(*ordering)
+    if position is not None:
+        rows = rows.filter(KeysetPagination().keyset_filter(rows, ordering, position))
+    rows = list(rows[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def removed_entries(history, agent=None):
+    """
+    Entrées d'historique qui retirent une plainte de la liste : suppressions
+    et, pour un agent, plaintes qui ne lui sont plus assignées
+    """
+    if agent is None:
+        return history.filter(action='DELETED')
+    agent_id = str(agent.id)
+    return history.filter(
+        Q(action='DELETED', old_value__assigned_user_id=agent_id)
+        | (Q(old_value__assigned_user_id=agent_id) & ~Q(new_value__assigned_user_id=agent_id))
+    )
+
+
+def complaint_changes(queryset, history, token=None, agent=None, values=None, limit=None):
+    """
+    Plaintes modifiées et retirées depuis `token` (toutes les plaintes et
+    aucun retrait si token est None). `values(queryset)` choisit les colonnes
+    lues (.values()). Retourne (lignes, retraits, nouveau jeton, has_more).
+    """
+    limit = limit or settings.COMPLAINT_SYNC_PAGE_SIZE
+    watermark = sync_watermark()
+    removed_history = removed_entries(history, agent).values(
+        'id', 'complaint_id', 'complaint_reference', 'action', 'old_value', 'created_at', 'sync_xid'
+    )
+    changes_source = values(queryset) if values else queryset.values()
+
+    if token:
+        changes_position, removed_position = decode_token(token, queryset, history)
+        removed, more_removed = _page(removed_history, REMOVED_ORDERING, removed_position, watermark, limit)
+    else:
+        # Premier appel : les retraits antérieurs ne concernent pas le client
+        changes_position = None
+        last = removed_history.filter(sync_xid__lt=watermark).order_by('-sync_xid', '-id').first()
+        removed_position = [last[field] for field in REMOVED_ORDERING] if last else None
+        removed, more_removed = [], False
+
+    rows, more_changes = _page(changes_source, CHANGES_ORDERING, changes_position, watermark, limit)
+
+    if rows:
+        changes_position = [rows[-1][field] for field in CHANGES_ORDERING]
+    if removed:
+        removed_position = [removed[-1][field] for field in REMOVED_ORDERING]
+    token = encode_token(_encode_position(changes_position), _encode_position(removed_position))
+    return rows, removed, token, more_changes or more_removed
+
+
+def serialize_removed(entries):
+    """Retraits au format de l'API (id de la plainte, référence, date, motif)"""
+    data = []
+    for entry in entries:
+        deleted = entry['action'] == 'DELETED'
+        complaint_id = (entry['old_value'] or {}).get('id') if deleted else entry['complaint_id']
+        data.append({
+            'id': str(complaint_id) if complaint_id else None,
+            'reference': entry['complaint_reference'],
+            'removed_at': format_datetime(entry['created_at']),
+            'reason': 'deleted' if deleted else 'unassigned',
+        })
+    return data
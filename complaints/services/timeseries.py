@@ -0,0 +1,72 @@
+"""
+Séries temporelles (jour / semaine / mois) calculées en une seule requête
+GROUP BY date_trunc, complétées par des zéros pour les périodes vides
+"""
+from datetime import date, datetime, timedelta
+
+from django.db.models import Count, DateField, DateTimeField
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def period_start(day, granularity):
+    """Début de la période (jour, lundi de la semaine, 1er du mois) contenant `day`"""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unsupported granularity: {granularity}")
+
+
+def shift_period(start, granularity, count):
+    """Décale un début de période de `count` périodes (négatif pour reculer)"""
+    if granularity == 'day':
+        return start + timedelta(days=count)
+    if granularity == 'week':
+        return start + timedelta(weeks=count)
+    month_index = start.year * 12 + start.month - 1 + count
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_time_series(qs, field, granularity='day', periods=7, value=None, tzinfo=None):
+    """
+    Série des `periods` dernières périodes (la période courante incluse).
+
+    `field` peut être un DateTimeField (tronqué dans le fuseau `tzinfo`)
+    ou un DateField (ex. ComplaintDailyStats.date, déjà en date locale).
+    `value` est l'agrégat à calculer par période (Count('id') par défaut).
+    Retourne [{'period': date, 'count': n}, ...] du plus ancien au plus récent.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    value = value if value is not None else Count('id')
+
+    current = period_start(timezone.localdate(timezone=tzinfo), granularity)
+    buckets = [shift_period(current, granularity, -i) for i in range(periods - 1, -1, -1)]
+    first = buckets[0]
+
+    if isinstance(qs.model._meta.get_field(field), DateTimeField):
+        lower_bound = datetime.combine(first, datetime.min.time(), tzinfo=tzinfo)
+        period = Trunc(field, granularity, output_field=DateField(), tzinfo=tzinfo)
+    else:
+        lower_bound = first
+        period = Trunc(field, granularity, output_field=DateField())
+
+    rows = (
+        qs.filter(**{f'{field}__gte': lower_bound})
+        .order_by()
+        .annotate(period=period)
+        .values('period')
+        .annotate(count=value)
+        .values_list('period', 'count')
+    )
+    counts = {row_period: count or 0 for row_period, count in rows}
+
+    return [{'period': bucket, 'count': counts.get(bucket, 0)} for bucket in buckets]
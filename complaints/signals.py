@@ -0,0 +1,55 @@
+"""
+complaints/signals.py - Maintenir les agrégats journaliers (ComplaintDailyStats),
+la version des données utilisée par le cache des tableaux de bord
+et le cache des politiques SLA
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from complaints.models import Complaint, ComplaintComment, ComplaintHistory, SLAConfig
+from complaints.services.dashboard_cache import bump_data_version
+from complaints.services.rollup import record_complaint_change, record_complaint_deletion
+from complaints.services.sla import invalidate_sla_policy
+
+
+@receiver(post_save, sender=Complaint)
+def update_daily_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Répercuter la création / le changement de statut / la clôture d'une plainte
+    """
+    if raw:
+        return
+    record_complaint_change(instance, created)
+
+
+@receiver(post_delete, sender=Complaint)
+def update_daily_stats_on_delete(sender, instance, **kwargs):
+    """
+    Retirer la contribution d'une plainte supprimée
+    """
+    record_complaint_deletion(instance)
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+@receiver(post_save, sender=ComplaintComment)
+@receiver(post_delete, sender=ComplaintComment)
+@receiver(post_save, sender=ComplaintHistory)
+def bump_dashboard_version(sender, instance, **kwargs):
+    """
+    Invalider les tableaux de bord du tenant une fois l'écriture validée
+    """
+    tenant_id = instance.tenant_id
+    transaction.on_commit(lambda: bump_data_version(tenant_id))
+
+
+@receiver(post_save, sender=SLAConfig)
+@receiver(post_delete, sender=SLAConfig)
+def invalidate_sla_policy_cache(sender, instance, **kwargs):
+    """
+    Recharger la matrice SLA du tenant après création / modification / suppression
+    d'une configuration (SLAConfigViewSet, admin...)
+    """
+    tenant_id = instance.tenant_id
+    transaction.on_commit(lambda: invalidate_sla_policy(tenant_id))
@@ -1,3 +1,414 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from django_tenants.test.cases import FastTenantTestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from complaints.filters import ComplaintSearchFilter
+from complaints.models import Complaint, ComplaintDailyStats
+from complaints.services.autocomplete import autocomplete
+from complaints.services.bulk_actions import bulk_assign, bulk_transition
+from complaints.services.bulk_import import import_complaints
+from complaints.services.export import stream_export
+from complaints.services.references import format_reference, parse_reference
+from complaints.services.rollup import MEASURES, rebuild_daily_stats
+from complaints.views import ComplaintViewSet
+from notifications.models import Notification
+from tenants.models import Tenant
+from users.models import CustomUser
+
+
+def ndjson(*records):
+    return io.BytesIO(b'\n'.join(json.dumps(record).encode() for record in records))
+
+
+class ComplaintImportReferenceTests(FastTenantTestCase):
+    """Références importées au format du tenant et compteur ReferenceSequence"""
+
+    def setUp(self):
+        self.year = timezone.localdate(timezone=self.tenant.get_timezone()).year
+
+    def test_imported_references_advance_the_counter(self):
+        imported = format_reference(self.tenant, self.year, 42)
+        report = import_complaints(
+            self.tenant, ndjson({'title': 'Registre', 'description': 'Ligne 1', 'reference': imported}), 'ndjson'
+        )
+        self.assertEqual((report['created'], report['failed']), (1, 0))
+
+        # Bloc réservé par l'import suivant et référence d'une saisie : après 42, sans collision
+        report = import_complaints(
+            self.tenant, ndjson({'title': 'Registre', 'description': 'Ligne 2'}), 'ndjson'
+        )
+        self.assertEqual((report['created'], report['failed']), (1, 0))
+        complaint = Complaint.objects.create(tenant=self.tenant, title='Saisie', description='Guichet')
+
+        numbers = sorted(
+            parse_reference(self.tenant, reference)[1]
+            for reference in Complaint.objects.values_list('reference', flat=True)
+        )
+        self.assertEqual(numbers, [42, 43, 44])
+        self.assertEqual(parse_reference(self.tenant, complaint.reference), (self.year, 44))
+
+    def test_reference_conflict_is_reported_per_chunk(self):
+        existing = Complaint.objects.create(tenant=self.tenant, title='Saisie', description='Guichet')
+        stream = ndjson(
+            {'title': 'Lot 1', 'description': 'Conflit'},
+            {'title': 'Lot 2', 'description': 'Importée'},
+        )
+        # Référence attribuée entre-temps par une autre écriture
+        with mock.patch(
+            'complaints.services.bulk_import.reserve_references',
+            side_effect=[[existing.reference], ['IMPORT-1']],
+        ):
+            report = import_complaints(self.tenant, stream, 'ndjson', chunk_size=1)
+
+        self.assertEqual((report['rows'], report['created'], report['failed']), (2, 1, 1))
+        self.assertEqual(report['errors'][0]['line'], 1)
+        self.assertTrue(Complaint.objects.filter(reference='IMPORT-1').exists())
+        self.assertFalse(Complaint.objects.filter(title='Lot 1').exists())
+
+    def test_empty_body_is_rejected(self):
+        admin = CustomUser.objects.create_user(
+            email='admin@import.test', role='TENANT_ADMIN', tenant=self.tenant
+        )
+        view = ComplaintViewSet.as_view({'post': 'bulk_import'}, **ComplaintViewSet.bulk_import.kwargs)
+        for content_type in ('text/csv', 'application/x-ndjson'):
+            with self.subTest(content_type=content_type):
+                # Corps vide : DRF ne fournit aucun flux (request.stream est None)
+                request = APIRequestFactory().post('/api/complaints/import/', b'', content_type=content_type)
+                request.tenant = self.tenant
+                force_authenticate(request, admin)
+                response = view(request)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+
+class ComplaintSearchFilterTests(FastTenantTestCase):
+    """Recherche exacte par téléphone (?search=)"""
+
+    def search(self, term):
+        request = Request(APIRequestFactory().get('/api/complaints/', {'search': term}))
+        return set(
+            ComplaintSearchFilter().filter_queryset(request, Complaint.objects.all(), None)
+            .values_list('title', flat=True)
+        )
+
+    def setUp(self):
+        Complaint.objects.create(tenant=self.tenant, title='Sans téléphone', description='Guichet')
+        Complaint.objects.create(
+            tenant=self.tenant, title='Avec téléphone', description='Appel', phone_number='+237 6 99 00 11 22'
+        )
+
+    def test_phone_search_matches_digits(self):
+        self.assertEqual(self.search('699-00-11-22'), set())
+        self.assertEqual(self.search('+237 699 001 122'), {'Avec téléphone'})
+
+    def test_phone_shaped_terms_without_digits_match_nothing(self):
+        for term in ('------', '(. . )', '+ ( ) - .'):
+            with self.subTest(term=term):
+                self.assertEqual(self.search(term), set())
+
+
+class ComplaintAutocompleteTests(FastTenantTestCase):
+    """Autocomplétion trigramme (référence, téléphone, lieu)"""
+
+    def setUp(self):
+        for location in ('Douala Akwa', 'Douala Akwa', 'Douala Deido', 'Kribi Port'):
+            Complaint.objects.create(
+                tenant=self.tenant, title=location, description='Guichet', location=location,
+                phone_number='+237 6 99 00 11 22',
+            )
+
+    def test_locations_are_distinct_with_their_complaint_count(self):
+        matches = autocomplete(Complaint.objects.all(), 'douala akwa', ('location',))
+        self.assertEqual(matches[0]['value'], 'Douala Akwa')
+        self.assertEqual(matches[0]['complaints'], 2)
+        self.assertEqual(len({match['value'] for match in matches}), len(matches))
+        self.assertNotIn('Kribi Port', [match['value'] for match in matches])
+
+    def test_misspelled_reference_is_found(self):
+        reference = Complaint.objects.get(title='Kribi Port').reference
+        typo = reference[:-2] + reference[-1] + reference[-2]
+        matches = autocomplete(Complaint.objects.all(), typo, ('reference',))
+        self.assertIn(reference, [match['value'] for match in matches])
+
+    def test_phone_is_matched_on_digits(self):
+        matches = autocomplete(Complaint.objects.all(), '699 001 1', ('phone_number',))
+        self.assertEqual(len(matches), 4)
+        self.assertEqual({match['value'] for match in matches}, {'+237 6 99 00 11 22'})
+
+
+class ComplaintExportTests(FastTenantTestCase):
+    """Export CSV / NDJSON des plaintes"""
+
+    def export(self, file_format):
+        return ''.join(stream_export(Complaint.objects.all(), ['-submitted_at', 'id'], file_format, 100))
+
+    def setUp(self):
+        Complaint.objects.create(
+            tenant=self.tenant,
+            title='=1+2',
+            description='-2+3',
+            location='@SUM(A1:A2)',
+            phone_number='+237 6 99 00 11 22',
+        )
+
+    def test_csv_cells_are_not_read_as_formulas(self):
+        row = next(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual(row['title'], "'=1+2")
+        self.assertEqual(row['description'], "'-2+3")
+        self.assertEqual(row['location'], "'@SUM(A1:A2)")
+        self.assertEqual(row['phone_number'], "'+237 6 99 00 11 22")
+        self.assertEqual(row['status'], 'NEW')
+
+    def test_ndjson_values_are_unchanged(self):
+        row = json.loads(self.export('ndjson'))
+        self.assertEqual(row['title'], '=1+2')
+        self.assertEqual(row['phone_number'], '+237 6 99 00 11 22')
+
+
+class ComplaintBulkActionTests(FastTenantTestCase):
+    """Assignation et changement de statut groupés (UPDATE unique, sans Complaint.save)"""
+
+    def setUp(self):
+        def user(role, name):
+            return CustomUser.objects.create_user(
+                email=f'{name}@bulk.test', role=role, tenant=self.tenant, first_name=name
+            )
+
+        self.admin = user('TENANT_ADMIN', 'admin')
+        self.agent = user('AGENT', 'agent')
+        self.other_agent = user('AGENT', 'other')
+
+    def complaint(self, **fields):
+        fields.setdefault('description', 'Guichet')
+        return Complaint.objects.create(tenant=self.tenant, title='Plainte', **fields)
+
+    def new_notifications(self, before):
+        return list(Notification.objects.exclude(id__in=before).values_list('user_id', 'type'))
+
+    def rollup(self):
+        rows = ComplaintDailyStats.objects.filter(tenant=self.tenant).values_list(
+            'date', 'category_id', 'urgency', 'status_group', 'assigned_user_id', *MEASURES
+        )
+        # Sommes de durées en flottants : comparées à la milliseconde
+        return {row[:5]: row[5:-1] + (round(row[-1], 3),) for row in rows if any(row[5:])}
+
+    def test_bulk_assign_reports_each_id(self):
+        already = self.complaint(assigned_user=self.agent, status='ASSIGNED')
+        first, second = self.complaint(), self.complaint(assigned_user=self.other_agent, status='ASSIGNED')
+        missing = uuid.uuid4()
+        before = list(Notification.objects.values_list('id', flat=True))
+
+        summary = bulk_assign(
+            Complaint.objects.all(), [already.id, first.id, second.id, missing, first.id], self.agent, self.admin
+        )
+
+        self.assertEqual((summary['updated'], summary['unchanged'], summary['not_found']), (2, 1, 1))
+        self.assertEqual(
+            [(result['id'], result['result']) for result in summary['results']],
+            [(str(already.id), 'unchanged'), (str(first.id), 'updated'),
+             (str(second.id), 'updated'), (str(missing), 'not_found')]
+        )
+        self.assertEqual(
+            set(Complaint.objects.values_list('assigned_user_id', 'status')), {(self.agent.id, 'ASSIGNED')}
+        )
+        # Une seule notification pour l'agent, pour les deux plaintes
+        self.assertEqual(self.new_notifications(before), [(self.agent.id, 'COMPLAINT_ASSIGNED')])
+
+    def test_complaints_outside_the_queryset_are_not_found(self):
+        mine = self.complaint(assigned_user=self.agent, status='ASSIGNED')
+        hidden = self.complaint(assigned_user=self.other_agent, status='ASSIGNED')
+
+        # Queryset d'un agent (ComplaintViewSet.get_queryset) : seulement ses plaintes
+        summary = bulk_transition(
+            Complaint.objects.filter(assigned_user=self.agent), [mine.id, hidden.id], 'IN_PROGRESS', self.agent
+        )
+
+        self.assertEqual(
+            [result['result'] for result in summary['results']], ['updated', 'not_found']
+        )
+        hidden.refresh_from_db()
+        self.assertEqual(hidden.status, 'ASSIGNED')
+
+    def test_closing_again_keeps_closed_at(self):
+        closed_at = timezone.now() - timedelta(days=3)
+        resolved = self.complaint(status='RESOLVED', closed_at=closed_at)
+        open_complaint = self.complaint(status='IN_PROGRESS')
+
+        bulk_transition(Complaint.objects.all(), [resolved.id, open_complaint.id], 'CLOSED', self.admin)
+
+        resolved.refresh_from_db()
+        open_complaint.refresh_from_db()
+        self.assertEqual((resolved.status, resolved.closed_at), ('CLOSED', closed_at))
+        self.assertEqual(open_complaint.status, 'CLOSED')
+        self.assertIsNotNone(open_complaint.closed_at)
+        self.assertGreater(open_complaint.closed_at, closed_at)
+
+    def test_one_notification_per_agent(self):
+        complaints = [
+            self.complaint(assigned_user=self.agent, status='ASSIGNED'),
+            self.complaint(assigned_user=self.agent, status='ASSIGNED'),
+            self.complaint(assigned_user=self.other_agent, status='ASSIGNED'),
+            self.complaint(),
+        ]
+        before = list(Notification.objects.values_list('id', flat=True))
+
+        bulk_transition(Complaint.objects.all(), [c.id for c in complaints], 'RESOLVED', self.admin)
+
+        self.assertEqual(
+            sorted(self.new_notifications(before)),
+            sorted([(self.agent.id, 'COMPLAINT_UPDATED'), (self.other_agent.id, 'COMPLAINT_UPDATED')])
+        )
+
+    def test_rollup_matches_a_rebuild(self):
+        complaints = [self.complaint(urgency=urgency) for urgency in ('LOW', 'MEDIUM', 'HIGH', 'HIGH')]
+        complaints.append(self.complaint(status='RESOLVED', closed_at=timezone.now() - timedelta(hours=5)))
+        ids = [complaint.id for complaint in complaints]
+
+        bulk_assign(Complaint.objects.all(), ids[:3], self.agent, self.admin)
+        bulk_assign(Complaint.objects.all(), ids[1:4], self.other_agent, self.admin)
+        bulk_transition(Complaint.objects.all(), ids[:2], 'RESOLVED', self.admin)
+        bulk_transition(Complaint.objects.all(), ids, 'CLOSED', self.admin)
+        bulk_transition(Complaint.objects.all(), ids[3:], 'IN_PROGRESS', self.admin)
+
+        incremental = self.rollup()
+        rebuild_daily_stats(self.tenant)
+        self.assertEqual(incremental, self.rollup())
+
+
+class ComplaintSyncTests(TransactionTestCase):
+    """
+    Synchronisation incrémentale (/changes/). Écritures validées : les lignes
+    d'une transaction encore ouverte (celle d'un TestCase) ne sont jamais servies.
+    Le flush entre les tests ne vide que les tables du schéma du tenant.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Schéma partagé avec les FastTenantTestCase (créé et migré une fois)
+        schema_name = FastTenantTestCase.get_test_schema_name()
+        cls.tenant = Tenant.objects.filter(schema_name=schema_name).first()
+        if cls.tenant is None:
+            cls.tenant = Tenant(schema_name=schema_name, name='Test')
+            cls.tenant.save(verbosity=0)
+        connection.set_tenant(cls.tenant)
+
+    @classmethod
+    def tearDownClass(cls):
+        connection.set_schema_to_public()
+        super().tearDownClass()
+
+    def setUp(self):
+        def user(role, name):
+            return CustomUser.objects.create_user(
+                email=f'{name}@sync.test', role=role, tenant=self.tenant, first_name=name
+            )
+
+        self.admin = user('TENANT_ADMIN', 'admin')
+        self.agent = user('AGENT', 'agent')
+        self.other_agent = user('AGENT', 'other')
+        self.complaints = [
+            Complaint.objects.create(tenant=self.tenant, title=f'Plainte {index}', description='Guichet')
+            for index in range(3)
+        ]
+        self.assigned = Complaint.objects.create(
+            tenant=self.tenant, title='Assignée', description='Guichet',
+            assigned_user=self.agent, status='ASSIGNED'
+        )
+
+    def tearDown(self):
+        # Utilisateurs du schéma public : non vidés par le flush
+        CustomUser.objects.filter(email__endswith='@sync.test').delete()
+
+    def call(self, action, user, method='get', path='/api/complaints/changes/', data=None, **kwargs):
+        view = ComplaintViewSet.as_view({method: action}, **getattr(getattr(ComplaintViewSet, action), 'kwargs', {}))
+        options = {'format': 'json'} if method == 'post' else {}
+        request = getattr(APIRequestFactory(), method)(path, data, **options)
+        request.tenant = self.tenant
+        force_authenticate(request, user)
+        return view(request, **kwargs)
+
+    def changes(self, user, since=None):
+        response = self.call('changes', user, data={'since': since} if since else None)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def bootstrap(self, user):
+        """Premier appel complet (toutes les pages) : (ids transmis, jeton)"""
+        ids, since = [], None
+        while True:
+            data = self.changes(user, since)
+            ids += [row['id'] for row in data['changes']]
+            since = data['since']
+            if not data['has_more']:
+                return ids, since
+
+    def test_bootstrap_pages_through_every_complaint(self):
+        with override_settings(COMPLAINT_SYNC_PAGE_SIZE=2):
+            ids, since = self.bootstrap(self.admin)
+        self.assertEqual(sorted(ids), sorted(str(complaint.id) for complaint in Complaint.objects.all()))
+
+        data = self.changes(self.admin, since)
+        self.assertEqual((data['changes'], data['removed'], data['has_more']), ([], [], False))
+        self.assertEqual(data['since'], since)
+
+    def test_edit_is_returned_by_the_next_poll(self):
+        _, since = self.bootstrap(self.admin)
+        complaint = self.complaints[1]
+        complaint.title = 'Modifiée'
+        complaint.save()
+
+        data = self.changes(self.admin, since)
+        self.assertEqual([(row['id'], row['title']) for row in data['changes']], [(str(complaint.id), 'Modifiée')])
+        self.assertEqual(self.changes(self.admin, data['since'])['changes'], [])
+
+    def test_deletion_is_returned_as_removed(self):
+        _, since = self.bootstrap(self.admin)
+        complaint = self.complaints[0]
+        response = self.call(
+            'destroy', self.admin, method='delete', path=f'/api/complaints/{complaint.id}/', pk=str(complaint.id)
+        )
+        self.assertEqual(response.status_code, 204)
+
+        data = self.changes(self.admin, since)
+        self.assertEqual(data['changes'], [])
+        self.assertEqual(
+            [(entry['id'], entry['reference'], entry['reason']) for entry in data['removed']],
+            [(str(complaint.id), complaint.reference, 'deleted')]
+        )
+
+    def test_reassignment_is_removed_for_the_previous_agent(self):
+        ids, since = self.bootstrap(self.agent)
+        self.assertEqual(ids, [str(self.assigned.id)])
+
+        response = self.call(
+            'assign', self.admin, method='post', path=f'/api/complaints/{self.assigned.id}/assign/',
+            data={'user_id': str(self.other_agent.id)}, pk=str(self.assigned.id)
+        )
+        self.assertEqual(response.status_code, 200)
+
+        data = self.changes(self.agent, since)
+        self.assertEqual(data['changes'], [])
+        self.assertEqual(
+            [(entry['id'], entry['reason']) for entry in data['removed']],
+            [(str(self.assigned.id), 'unassigned')]
+        )
+        other_ids, _ = self.bootstrap(self.other_agent)
+        self.assertEqual(other_ids, [str(self.assigned.id)])
+
+    def test_invalid_token_is_rejected(self):
+        for since in ('garbage', 'eyJjIjpbIjIwMjYtMDEtMDEiXSwiciI6bnVsbH0'):
+            with self.subTest(since=since):
+                response = self.call('changes', self.admin, data={'since': since})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('since', response.data)
@@ -2,8 +2,9 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 
 from complaints.models import (
     Complaint, ComplaintAttachment, ComplaintComment,
@@ -13,12 +14,40 @@ from complaints.serializers import (
     ComplaintListSerializer, ComplaintDetailSerializer,
     ComplaintCreateSerializer, ComplaintUpdateSerializer,
     ComplaintAttachmentSerializer, ComplaintCommentSerializer,
-    SLAConfigSerializer, ComplaintHistorySerializer
+    SLAConfigSerializer, ComplaintHistorySerializer,
+    BulkAssignSerializer, BulkTransitionSerializer
 )
 from complaints.services.statistics import ComplaintStatisticsService
-from complaints.permissions import IsAgentOrAdmin, IsTenantUser
+from complaints.services.complaint_list import (
+    LIST_FIELDS, EXPANSIONS, list_values, serialize_rows
+)
+from complaints.services.fieldsets import parse_fieldset, shape_detail_queryset
+from complaints.services.autocomplete import (
+    AUTOCOMPLETE_FIELDS, DEFAULT_LIMIT as AUTOCOMPLETE_DEFAULT_LIMIT,
+    MAX_LIMIT as AUTOCOMPLETE_MAX_LIMIT, autocomplete
+)
+from complaints.services.dashboard_cache import get_or_compute
+from complaints.services.bulk_import import FORMATS as IMPORT_FORMATS, detect_format, import_complaints
+from complaints.services.bulk_actions import bulk_assign, bulk_transition
+from complaints.services.export import (
+    CONTENT_TYPES as EXPORT_CONTENT_TYPES, FORMATS as EXPORT_FORMATS, stream_export
+)
+from complaints.services.timeline import serialize_timeline, timeline_sources
+from complaints.services.sync import CHANGES_ORDERING, complaint_changes, serialize_removed
+from complaints.services.instrumentation import collect_timings, profile_section
+from complaints.permissions import (
+    IsAgentOrAdmin, IsTenantUser, CanAssignComplaint, CanImportComplaints,
+    CanExportComplaints
+)
+from complaints.pagination import (
+    ComplaintCommentPagination, ComplaintKeysetPagination, TimelinePagination
+)
+from complaints.filters import ComplaintSearchFilter, ComplaintOrderingFilter
 
+from django.conf import settings
 from django.db import connection
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,28 +58,72 @@ class ComplaintViewSet(viewsets.ModelViewSet):
     ViewSet pour gérer les plaintes (CRUD)
     """
     permission_classes = [permissions.IsAuthenticated, IsTenantUser]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # ?search= : référence / téléphone exacts, sinon plein texte classé par pertinence
+    filter_backends = [DjangoFilterBackend, ComplaintSearchFilter, ComplaintOrderingFilter]
     filterset_fields = ['status', 'urgency', 'assigned_user', 'category']
-    search_fields = ['reference', 'title', 'description', 'phone_number']
     ordering_fields = ['submitted_at', 'updated_at', 'sla_deadline', 'urgency']
     ordering = ['-submitted_at']
+    # Pagination keyset : ?cursor=...&page_size=... (coût constant quelle que soit la page)
+    pagination_class = ComplaintKeysetPagination
     
     def get_queryset(self):
         user = self.request.user
         
         # SUPER_ADMIN voit toutes les plaintes
         if user.role == 'SUPER_ADMIN':
-            return Complaint.objects.all()
+            queryset = Complaint.objects.all()
+        else:
+            # Les autres ne voient que les plaintes de leur tenant
+            # (TENANT_ADMIN, RECEPTION, AUDITOR : tout leur tenant)
+            queryset = Complaint.objects.filter(tenant=user.tenant)
+            
+            # AGENT ne voit que ses plaintes assignées
+            if user.role == 'AGENT':
+                queryset = queryset.filter(assigned_user=user)
         
-        # Les autres ne voient que les plaintes de leur tenant
-        base_qs = Complaint.objects.filter(tenant=user.tenant)
+        # Détail : colonnes, jointures et préchargements selon ?fields= / ?expand=
+        if self.action == 'retrieve':
+            fields, expand = self.get_fieldset()
+            queryset = shape_detail_queryset(
+                queryset, fields, expand, ComplaintDetailSerializer.Meta.fields
+            )
         
-        # AGENT ne voit que ses plaintes assignées
-        if user.role == 'AGENT':
-            return base_qs.filter(assigned_user=user)
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Liste rapide : une requête .values() (colonnes listées + noms joints)
+        sérialisée sans ComplaintListSerializer, sortie identique.
+        ?fields=reference,title&expand=category : seules ces colonnes et
+        jointures sont lues.
+        """
+        fields, expand = parse_fieldset(request, LIST_FIELDS, EXPANSIONS)
+        queryset = self.filter_queryset(self.get_queryset())
         
-        # TENANT_ADMIN, RECEPTION, AUDITOR voient tout leur tenant
-        return base_qs
+        # Colonnes du tri : nécessaires aux curseurs de pagination
+        ordering = self.paginator.get_ordering(request, queryset, self) if self.paginator else []
+        rows = list_values(
+            queryset, fields, expand, extra=[term.lstrip('-') for term in ordering]
+        )
+        
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serialize_rows(page, fields, expand))
+        return Response(serialize_rows(rows, fields, expand))
+    
+    def get_fieldset(self):
+        """(fields, expand) demandés pour le détail"""
+        return parse_fieldset(
+            self.request,
+            ComplaintDetailSerializer.Meta.fields,
+            ComplaintDetailSerializer.expandable_fields
+        )
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'retrieve':
+            context['fields'], context['expand'] = self.get_fieldset()
+        return context
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -76,13 +149,152 @@ class ComplaintViewSet(viewsets.ModelViewSet):
             action='DELETED',
             user=self.request.user,
             old_value={
+                'id': str(instance.id),
                 'title': instance.title,
                 'status': instance.status,
+                'assigned_user_id': str(instance.assigned_user_id) if instance.assigned_user_id else None,
             },
             description=f"Complaint {instance.reference} deleted by {self.request.user.email}"
         )
         instance.delete()
     
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated, IsTenantUser, CanExportComplaints]
+    )
+    def export(self, request):
+        """
+        GET /api/complaints/export/?file_format=csv|ndjson (+ filtres, ?search=, ?ordering= de la liste)
+        Export complet diffusé par lots (keyset) : mémoire constante quel que soit le volume.
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': 'Unknown export format', 'available_formats': list(EXPORT_FORMATS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = self.paginator.get_ordering(request, queryset, self)
+        
+        response = StreamingHttpResponse(
+            stream_export(queryset, ordering, file_format, settings.COMPLAINT_EXPORT_CHUNK_SIZE),
+            content_type=EXPORT_CONTENT_TYPES[file_format]
+        )
+        filename = f"complaints-{connection.schema_name}-{timezone.localdate():%Y%m%d}.{file_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        GET /api/complaints/changes/?since=<token>
+        Plaintes modifiées (format de la liste, ?fields= / ?expand=) et retirées
+        depuis le jeton, et le jeton suivant. Sans since : toutes les plaintes.
+        has_more : rappeler aussitôt avec le nouveau jeton. Les filtres de la
+        liste ne s'appliquent pas (une plainte qui en sort doit être transmise).
+        """
+        fields, expand = parse_fieldset(request, LIST_FIELDS, EXPANSIONS)
+        user = request.user
+        
+        history = ComplaintHistory.objects.all()
+        if user.role != 'SUPER_ADMIN':
+            history = history.filter(tenant=user.tenant)
+        
+        rows, removed, token, has_more = complaint_changes(
+            self.get_queryset(),
+            history,
+            token=request.query_params.get('since'),
+            agent=user if user.role == 'AGENT' else None,
+            values=lambda queryset: list_values(queryset, fields, expand, extra=CHANGES_ORDERING)
+        )
+        return Response({
+            'changes': serialize_rows(rows, fields, expand),
+            'removed': serialize_removed(removed),
+            'since': token,
+            'has_more': has_more,
+        })
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        GET /api/complaints/autocomplete/?q=dem-2026-12
+        GET /api/complaints/autocomplete/?q=douala&fields=location&limit=5
+        Meilleures correspondances (similarité trigramme) sur la référence,
+        le téléphone et le lieu ; assez rapide pour être appelé à chaque frappe.
+        """
+        fields = [name.strip() for name in request.query_params.get('fields', '').split(',') if name.strip()]
+        unknown = [name for name in fields if name not in AUTOCOMPLETE_FIELDS]
+        if unknown:
+            return Response(
+                {
+                    'error': f"Unknown autocomplete field(s): {', '.join(unknown)}",
+                    'available_fields': list(AUTOCOMPLETE_FIELDS)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limit = int(request.query_params.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT))
+        except ValueError:
+            limit = AUTOCOMPLETE_DEFAULT_LIMIT
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+        
+        query = request.query_params.get('q', '')
+        return Response({
+            'query': query,
+            'results': autocomplete(self.get_queryset(), query, fields or AUTOCOMPLETE_FIELDS, limit),
+        })
+    
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        parser_classes=[MultiPartParser],
+        permission_classes=[permissions.IsAuthenticated, IsTenantUser, CanImportComplaints]
+    )
+    def bulk_import(self, request):
+        """
+        POST /api/complaints/import/
+        Corps text/csv ou application/x-ndjson lu en flux, ou fichier multipart
+        'file' (.csv / .ndjson). ?dry_run=1 : validation seule, rien n'est écrit.
+        Retourne le rapport : lignes lues, créées, erreurs par ligne.
+        """
+        file_format = detect_format(content_type=request.content_type)
+        if file_format:
+            # Corps brut : lu ligne à ligne, jamais chargé entièrement
+            # (None si le corps est vide ou sans Content-Length)
+            stream = request.stream
+        else:
+            stream = request.FILES.get('file')
+            if stream is not None:
+                file_format = request.data.get('file_format') or detect_format(filename=stream.name)
+        
+        if stream is None:
+            return Response(
+                {'error': 'Send a text/csv or application/x-ndjson body, or a multipart "file"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if file_format not in IMPORT_FORMATS:
+            return Response(
+                {'error': 'Unknown import format', 'available_formats': list(IMPORT_FORMATS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        report = import_complaints(
+            request.tenant,
+            stream,
+            file_format,
+            user=request.user,
+            dry_run=request.query_params.get('dry_run') in ('1', 'true')
+        )
+        return Response(
+            report,
+            status=status.HTTP_400_BAD_REQUEST if report['aborted'] else status.HTTP_200_OK
+        )
+    
     @action(detail=True, methods=['post'])
     def assign(self, request, pk=None):
         """Assigner une plainte à un agent"""
@@ -108,26 +320,93 @@ class ComplaintViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        old_user = complaint.assigned_user
+        old_user_id = complaint.assigned_user_id
         complaint.assigned_user = agent
         complaint.status = 'ASSIGNED'
-        complaint.save()
         
-        # Créer l'entrée d'historique
-        ComplaintHistory.objects.create(
-            tenant=complaint.tenant,
-            complaint=complaint,
-            complaint_reference=complaint.reference,
-            action='ASSIGNED' if not old_user else 'REASSIGNED',
-            user=request.user,
-            old_value={'assigned_user_id': str(old_user.id) if old_user else None},
-            new_value={'assigned_user_id': str(agent.id)},
-            description=f"Assigned to {agent.full_name}"
-        )
+        # Déjà assignée à cet agent : ni écriture ni historique
+        if complaint.tracker.changed():
+            # Seuls assigned_user / status sont écrits (Complaint.save)
+            complaint.save()
+            
+            # Créer l'entrée d'historique
+            ComplaintHistory.objects.create(
+                tenant=complaint.tenant,
+                complaint=complaint,
+                complaint_reference=complaint.reference,
+                action='ASSIGNED' if not old_user_id else 'REASSIGNED',
+                user=request.user,
+                old_value={'assigned_user_id': str(old_user_id) if old_user_id else None},
+                new_value={'assigned_user_id': str(agent.id)},
+                description=f"Assigned to {agent.full_name}"
+            )
         
         serializer = ComplaintDetailSerializer(complaint)
         return Response(serializer.data)
     
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[permissions.IsAuthenticated, IsTenantUser, CanAssignComplaint]
+    )
+    def bulk_assign(self, request):
+        """
+        POST /api/complaints/bulk_assign/ {"ids": [...], "user_id": "..."}
+        Assigne toutes les plaintes en une transaction ; résultat par id
+        (updated / unchanged / not_found).
+        """
+        serializer = BulkAssignSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        from users.models import CustomUser
+        try:
+            agent = CustomUser.objects.get(
+                id=serializer.validated_data['user_id'],
+                tenant=request.tenant,
+                role__in=['AGENT', 'TENANT_ADMIN']
+            )
+        except CustomUser.DoesNotExist:
+            return Response(
+                {'error': 'Invalid user or user is not an agent'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(bulk_assign(
+            self.get_queryset(), serializer.validated_data['ids'], agent, request.user
+        ))
+    
+    @action(detail=False, methods=['post'])
+    def bulk_transition(self, request):
+        """
+        POST /api/complaints/bulk_transition/ {"ids": [...], "status": "RESOLVED"}
+        Change le statut de toutes les plaintes en une transaction ; résultat
+        par id (updated / unchanged / not_found).
+        """
+        serializer = BulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        return Response(bulk_transition(
+            self.get_queryset(),
+            serializer.validated_data['ids'],
+            serializer.validated_data['status'],
+            request.user
+        ))
+    
+    @action(detail=True, methods=['get'])
+    def comments(self, request, pk=None):
+        """
+        GET /api/complaints/{id}/comments/?cursor=...&page_size=...
+        Commentaires du plus récent au plus ancien, pagination keyset
+        (le détail donne le curseur qui suit ses derniers commentaires)
+        """
+        complaint = self.get_object()
+        paginator = ComplaintCommentPagination()
+        page = paginator.paginate_queryset(
+            complaint.comments.select_related('user'), request, view=self
+        )
+        serializer = ComplaintCommentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
     @action(detail=True, methods=['post'])
     def add_comment(self, request, pk=None):
         """Ajouter un commentaire à une plainte"""
@@ -194,15 +473,29 @@ class ComplaintViewSet(viewsets.ModelViewSet):
     def history(self, request, pk=None):
         """Récupérer l'historique d'une plainte"""
         complaint = self.get_object()
-        history = ComplaintHistory.objects.filter(complaint=complaint)
+        history = ComplaintHistory.objects.filter(complaint=complaint).select_related('user')
         
         serializer = ComplaintHistorySerializer(history, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """
+        GET /api/complaints/{id}/timeline/?cursor=...&page_size=...
+        Historique, commentaires et pièces jointes en un seul fil, du plus
+        récent au plus ancien (une requête UNION par page)
+        """
+        complaint = self.get_object()
+        paginator = TimelinePagination()
+        rows = paginator.paginate_queryset(timeline_sources(complaint), request, view=self)
+        return paginator.get_paginated_response(serialize_timeline(rows, request))
 
 
 class DashboardStatsView(APIView):
     """
     GET /api/dashboard/
+    GET /api/dashboard/?sections=overview,sla_performance
+    GET /api/dashboard/?timings=1 (SUPER_ADMIN : mesures par section sous meta.timings)
     """
     def get(self, request):
         try:
@@ -223,13 +516,24 @@ class DashboardStatsView(APIView):
                     user=user
                 )
 
+                with collect_timings() as timings:
+                    with profile_section('global_platform_stats'):
+                        stats = get_or_compute(
+                            None, 'global', stats_service.get_global_platform_stats
+                        )
+
+                meta = {
+                    "role": user.role,
+                    "tenant": None,
+                    "scope": "global"
+                }
+                # ?timings=1 : détail durée / requêtes / lignes par section
+                if request.query_params.get('timings') in ('1', 'true'):
+                    meta["timings"] = timings
+
                 return Response({
-                    "stats": stats_service.get_global_platform_stats(),
-                    "meta": {
-                        "role": user.role,
-                        "tenant": None,
-                        "scope": "global"
-                    }
+                    "stats": stats,
+                    "meta": meta
                 })
 
             # ========================
@@ -241,17 +545,32 @@ class DashboardStatsView(APIView):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
+            # ?sections=overview,sla_performance : seules ces sections sont calculées
+            try:
+                sections = ComplaintStatisticsService.parse_sections(
+                    request.query_params.get('sections')
+                )
+            except ValueError as e:
+                return Response(
+                    {
+                        'error': str(e),
+                        'available_sections': list(ComplaintStatisticsService.DASHBOARD_SECTIONS)
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             stats_service = ComplaintStatisticsService(
                 tenant=user.tenant,
                 user=user
             )
 
             return Response({
-                "stats": stats_service.get_dashboard_stats(),
+                "stats": stats_service.get_dashboard_stats(sections),
                 "meta": {
                     "role": user.role,
                     "tenant": user.tenant.name,
-                    "schema": connection.schema_name
+                    "schema": connection.schema_name,
+                    "sections": sections
                 }
             })
 
@@ -312,6 +631,41 @@ class SLAConfigViewSet(viewsets.ModelViewSet):
             description=f"SLA Config deleted for {instance.category.name} - {instance.urgency_level}"
         )
         instance.delete()
+    
+    @action(detail=True, methods=['post'])
+    def reapply(self, request, pk=None):
+        """
+        Appliquer le délai de cette config aux plaintes ouvertes existantes
+        POST /api/sla-configs/{id}/reapply/
+        """
+        from complaints.services.sla import reapply_sla_deadlines
+        
+        sla_config = self.get_object()
+        result = reapply_sla_deadlines(
+            sla_config.tenant,
+            sla_config.category_id,
+            sla_config.urgency_level
+        )
+        
+        ComplaintHistory.objects.create(
+            tenant=sla_config.tenant,
+            complaint=None,
+            complaint_reference='SLA_CONFIG',
+            action='UPDATED',
+            user=request.user,
+            new_value={
+                'category': sla_config.category.name,
+                'urgency': sla_config.urgency_level,
+                'delay_hours': result['delay_hours'],
+                'updated_complaints': result['updated'],
+            },
+            description=(
+                f"SLA Config reapplied to {result['updated']} open complaint(s) "
+                f"for {sla_config.category.name} - {sla_config.urgency_level}"
+            )
+        )
+        
+        return Response(result)
 
 
 class ComplaintHistoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -53,6 +53,7 @@ SHARED_APPS = (
     'django.contrib.messages',
     'django.contrib.admin',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'users',
     'rest_framework',
@@ -308,6 +309,71 @@ MIGRATION_EXECUTOR = "standard"
 # Sécurité supplémentaire
 DISABLE_SERVER_SIDE_CURSORS = True
 
+# ============================
+# CACHE
+# ============================
+
+# Redis si REDIS_URL est défini (partagé entre workers), sinon mémoire locale
+# (un cache par process : les versions de données ne sont pas partagées)
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Tableaux de bord : fraîcheur (s), âge maximal servi pendant le recalcul (s)
+DASHBOARD_CACHE_ENABLED = config('DASHBOARD_CACHE_ENABLED', default=True, cast=bool)
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=30, cast=int)
+DASHBOARD_CACHE_MAX_STALE = config('DASHBOARD_CACHE_MAX_STALE', default=300, cast=int)
+DASHBOARD_CACHE_LOCK_TIMEOUT = config('DASHBOARD_CACHE_LOCK_TIMEOUT', default=60, cast=int)
+
+# Politiques SLA gardées en cache dans chaque processus (s), invalidées
+# à chaque modification de SLAConfig
+SLA_POLICY_CACHE_TTL = config('SLA_POLICY_CACHE_TTL', default=300, cast=int)
+
+# Instrumentation des sections de statistiques : durée au-delà de laquelle
+# une section est journalisée (ms)
+STATS_INSTRUMENTATION_ENABLED = config('STATS_INSTRUMENTATION_ENABLED', default=True, cast=bool)
+STATS_SECTION_BUDGET_MS = config('STATS_SECTION_BUDGET_MS', default=250, cast=int)
+
+# Statistiques plateforme : requêtes parallèles sur les schémas tenant
+# (chaque worker ouvre sa propre connexion PostgreSQL)
+CROSS_TENANT_MAX_WORKERS = config('CROSS_TENANT_MAX_WORKERS', default=8, cast=int)
+CROSS_TENANT_TIMEOUT = config('CROSS_TENANT_TIMEOUT', default=10, cast=int)
+
+# Snapshots des métriques tenant (schéma public) : intervalle de rafraîchissement
+# de `refresh_tenant_metrics --loop` et âge au-delà duquel une alerte est levée (s)
+TENANT_METRICS_REFRESH_INTERVAL = config('TENANT_METRICS_REFRESH_INTERVAL', default=300, cast=int)
+TENANT_METRICS_MAX_AGE = config('TENANT_METRICS_MAX_AGE', default=900, cast=int)
+
+# Import en masse des plaintes : lignes par lot (une transaction par lot) et
+# nombre maximal d'erreurs détaillées dans le rapport
+COMPLAINT_IMPORT_CHUNK_SIZE = config('COMPLAINT_IMPORT_CHUNK_SIZE', default=1000, cast=int)
+COMPLAINT_IMPORT_MAX_ERRORS = config('COMPLAINT_IMPORT_MAX_ERRORS', default=1000, cast=int)
+
+# Actions groupées (bulk_assign / bulk_transition) : nombre maximal d'ids par requête
+COMPLAINT_BULK_MAX_IDS = config('COMPLAINT_BULK_MAX_IDS', default=500, cast=int)
+
+# Export des plaintes (/api/complaints/export/) : lignes lues par requête SQL
+COMPLAINT_EXPORT_CHUNK_SIZE = config('COMPLAINT_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Détail d'une plainte : nombre de commentaires récents inclus (les plus
+# anciens via /api/complaints/{id}/comments/?cursor=)
+COMPLAINT_DETAIL_COMMENTS = config('COMPLAINT_DETAIL_COMMENTS', default=20, cast=int)
+
+# Synchronisation incrémentale (/api/complaints/changes/?since=) : lignes par réponse
+COMPLAINT_SYNC_PAGE_SIZE = config('COMPLAINT_SYNC_PAGE_SIZE', default=500, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
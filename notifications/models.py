@@ -7,6 +7,7 @@ import uuid
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+from model_utils import FieldTracker
 
 
 class Notification(models.Model):
@@ -57,6 +58,11 @@ class Notification(models.Model):
     # Dates
     created_at = models.DateTimeField(auto_now_add=True)
     
+    tracker = FieldTracker(fields=[
+        'tenant', 'user', 'type', 'title', 'message',
+        'link', 'complaint_id', 'is_read', 'read_at',
+    ])
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -68,6 +74,16 @@ class Notification(models.Model):
     def __str__(self):
         return f"{self.type} - {self.user.email} - {self.title}"
     
+    def save(self, *args, **kwargs):
+        # Notification existante sans update_fields : seuls les champs
+        # modifiés sont écrits, rien si aucun n'a changé
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            changed = self.tracker.changed()
+            if not changed:
+                return
+            kwargs['update_fields'] = list(changed)
+        super().save(*args, **kwargs)
+    
     def mark_as_read(self):
         """Marquer comme lue"""
         if not self.is_read:
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from django.db.models import Q
+from django.utils import timezone
 
 from notifications.models import Notification
 from notifications.serializers import NotificationSerializer
@@ -56,12 +57,13 @@ class NotificationViewSet(viewsets.ModelViewSet):
         Marquer toutes les notifications comme lues
         POST /api/notifications/mark_all_read/
         """
-        notifications = self.get_queryset().filter(is_read=False)
-        for notif in notifications:
-            notif.mark_as_read()
+        # Un seul UPDATE (is_read, read_at) pour toutes les non lues
+        count = self.get_queryset().filter(is_read=False).update(
+            is_read=True, read_at=timezone.now()
+        )
         
         return Response({
-            'message': f'{notifications.count()} notifications marquées comme lues'
+            'message': f'{count} notifications marquées comme lues'
         })
     
     @action(detail=False, methods=['delete'])
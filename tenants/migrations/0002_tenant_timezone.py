@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='timezone',
+            field=models.CharField(default='UTC', help_text='Fuseau IANA utilisé pour les statistiques (relancer rebuild_complaint_stats après modification)', max_length=64),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_tenant_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantMetricsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_complaints', models.PositiveIntegerField(default=0)),
+                ('active_complaints', models.PositiveIntegerField(default=0)),
+                ('resolved_complaints', models.PositiveIntegerField(default=0)),
+                ('sla_met', models.PositiveIntegerField(default=0)),
+                ('overdue', models.PositiveIntegerField(default=0)),
+                ('sla_compliance_rate', models.FloatField(default=0)),
+                ('monthly_volume', models.JSONField(blank=True, default=list)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('refresh_duration_ms', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metrics_snapshot', to='tenants.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-total_complaints'], name='tenants_ten_total_c_34bfbe_idx'), models.Index(fields=['refreshed_at'], name='tenants_ten_refresh_b5a5c9_idx')],
+            },
+        ),
+    ]
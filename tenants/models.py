@@ -1,4 +1,5 @@
 import uuid
+from zoneinfo import ZoneInfo
 from django.db import models
 from django_tenants.models import TenantMixin, DomainMixin
 
@@ -10,6 +11,11 @@ class Tenant(TenantMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     is_premium = models.BooleanField(default=False)
+    timezone = models.CharField(
+        max_length=64,
+        default="UTC",
+        help_text="Fuseau IANA utilisé pour les statistiques (relancer rebuild_complaint_stats après modification)"
+    )
 
     # default true, schema will be automatically created and synced when it is saved
     auto_create_schema = True
@@ -17,6 +23,10 @@ class Tenant(TenantMixin):
     def __str__(self):
         return f"{self.name}"
     
+    def get_timezone(self):
+        """Retourne le fuseau horaire du tenant (ZoneInfo)"""
+        return ZoneInfo(self.timezone or "UTC")
+    
     def get_primary_domain(self):
         """Retourne le domaine principal du tenant"""
         try:
@@ -27,4 +37,36 @@ class Tenant(TenantMixin):
 
 
 class Domain(DomainMixin):
-    pass
\ No newline at end of file
+    pass
+
+class TenantMetricsSnapshot(models.Model):
+    """
+    Derniers agrégats de plaintes d'un tenant, stockés dans le schéma public
+    et rafraîchis par `manage.py refresh_tenant_metrics`.
+    Les vues plateforme (SUPER_ADMIN) ne lisent que cette table.
+    """
+    tenant = models.OneToOneField(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name="metrics_snapshot"
+    )
+    total_complaints = models.PositiveIntegerField(default=0)
+    active_complaints = models.PositiveIntegerField(default=0)
+    resolved_complaints = models.PositiveIntegerField(default=0)
+    sla_met = models.PositiveIntegerField(default=0)
+    overdue = models.PositiveIntegerField(default=0)
+    sla_compliance_rate = models.FloatField(default=0)
+    monthly_volume = models.JSONField(default=list, blank=True)
+    
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    refresh_duration_ms = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=["-total_complaints"]),
+            models.Index(fields=["refreshed_at"]),
+        ]
+    
+    def __str__(self):
+        return f"{self.tenant.name} - {self.refreshed_at}"
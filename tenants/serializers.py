@@ -1,3 +1,4 @@
+from zoneinfo import available_timezones
 from rest_framework import serializers
 from tenants.models import Tenant, Domain
 from users.models import CustomUser
@@ -49,7 +50,7 @@ class TenantDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tenant
         fields = [
-            'id', 'schema_name', 'name', 'zone', 'contact_info',
+            'id', 'schema_name', 'name', 'zone', 'timezone', 'contact_info',
             'is_active', 'is_premium', 'created_at',
             'domains', 'user_count', 'complaint_count', 'admin_users'
         ]
@@ -82,7 +83,12 @@ class TenantUpdateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Tenant
-        fields = ['name', 'zone', 'contact_info', 'is_active', 'is_premium']
+        fields = ['name', 'zone', 'timezone', 'contact_info', 'is_active', 'is_premium']
+    
+    def validate_timezone(self, value):
+        if value not in available_timezones():
+            raise serializers.ValidationError(f"Unknown timezone: {value}")
+        return value
     
     def update(self, instance, validated_data):
         for attr, value in validated_data.items():
@@ -176,35 +176,30 @@ class TenantStatsView(APIView):
         # Total utilisateurs tous tenants
         total_users = CustomUser.objects.exclude(role='SUPER_ADMIN').count()
         
-        # Total plaintes tous tenants
-        try:
-            from complaints.models import Complaint
-            total_complaints = Complaint.objects.count()
-            
-            # Plaintes ce mois
-            complaints_this_month = Complaint.objects.filter(
-                submitted_at__gte=month_start
-            ).count()
-        except:
-            total_complaints = 0
-            complaints_this_month = 0
+        # Plaintes : lues dans les snapshots de métriques (une seule requête)
+        from complaints.services.platform_snapshot import (
+            get_platform_snapshots, snapshot_freshness
+        )
+        snapshots, missing = get_platform_snapshots(active_only=False)
+        
+        total_complaints = sum(s.total_complaints for s in snapshots)
+        current_month = now.strftime('%Y-%m')
+        complaints_this_month = sum(
+            point['count']
+            for s in snapshots
+            for point in s.monthly_volume
+            if point['month'] == current_month
+        )
         
         # Top 5 tenants par nombre de plaintes
-        try:
-            from complaints.models import Complaint
-            top_tenants = []
-            for tenant in Tenant.objects.all():
-                count = Complaint.objects.filter(tenant=tenant).count()
-                if count > 0:
-                    top_tenants.append({
-                        'tenant_id': str(tenant.id),
-                        'tenant_name': tenant.name,
-                        'complaint_count': count
-                    })
-            top_tenants.sort(key=lambda x: x['complaint_count'], reverse=True)
-            top_tenants = top_tenants[:5]
-        except:
-            top_tenants = []
+        top_tenants = [
+            {
+                'tenant_id': str(s.tenant_id),
+                'tenant_name': s.tenant.name,
+                'complaint_count': s.total_complaints
+            }
+            for s in snapshots if s.total_complaints > 0
+        ][:5]
         
         return Response({
             'tenants': {
@@ -221,5 +216,6 @@ class TenantStatsView(APIView):
                 'total': total_complaints,
                 'this_month': complaints_this_month
             },
-            'top_tenants': top_tenants
+            'top_tenants': top_tenants,
+            'metrics_freshness': snapshot_freshness(snapshots, missing)
         })
\ No newline at end of file